@@ -7,6 +7,7 @@
 import os
 import sys
 import shutil
+import sqlite3
 import zipfile
 from datetime import datetime
 from pathlib import Path
@@ -21,6 +22,9 @@ import django
 django.setup()
 
 from django.conf import settings
+from django.core.management import call_command
+
+from core.backups import compress_type, discard_on_error, prune_backups, read_manifest, write_sqlite_backup
 
 def create_backup():
     """Создает бэкап базы данных и медиа файлов."""
@@ -36,13 +40,24 @@ def create_backup():
     
     print(f'Создание бэкапа: {backup_filename}')
     
-    # Создаем ZIP архив
-    with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+    # Создаем ZIP архив; при ошибке недописанный архив удаляется
+    with discard_on_error(backup_path), zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
         # Бэкап базы данных
         db_path = BASE_DIR / 'db.sqlite3'
         if db_path.exists():
-            zipf.write(db_path, 'db.sqlite3')
-            print(f'  ✓ База данных добавлена ({db_path.stat().st_size / 1024 / 1024:.2f} MB)')
+            # Копия через backup API: согласованная, без остановки записи в БД
+            try:
+                page_count, db_size, elapsed = write_sqlite_backup(
+                    zipf, db_path, 'db.sqlite3',
+                    pages=getattr(settings, 'BACKUP_SQLITE_PAGES', 1024),
+                    sleep=getattr(settings, 'BACKUP_SQLITE_SLEEP', 0.005),
+                    progress=lambda copied, total: print(f'    {copied}/{total} страниц'),
+                )
+            except sqlite3.Error as e:
+                print(f'  ✗ Ошибка копирования SQLite, бэкап не создан: {e}')
+                raise SystemExit(1)
+            print(f'  ✓ База данных добавлена ({db_size / 1024 / 1024:.2f} MB, '
+                  f'{page_count} страниц за {elapsed:.2f} с, integrity_check: ok)')
         else:
             print('  ⚠ База данных не найдена')
         
@@ -51,10 +66,14 @@ def create_backup():
         if media_dir.exists():
             media_count = 0
             for root, dirs, files in os.walk(media_dir):
+                if Path(root) == media_dir:
+                    # Файлы содержимого (core.storage) уже попадают в архив под путями-ссылками
+                    dirs[:] = [name for name in dirs if name != getattr(settings, 'MEDIA_BLOBS_DIR', 'blobs')]
                 for file in files:
                     file_path = Path(root) / file
                     arcname = file_path.relative_to(BASE_DIR)
-                    zipf.write(file_path, arcname)
+                    # Изображения и видео уже сжаты - кладем как есть
+                    zipf.write(file_path, arcname, compress_type=compress_type(file_path))
                     media_count += 1
             print(f'  ✓ Медиа файлы добавлены ({media_count} файлов)')
         else:
@@ -70,16 +89,13 @@ def create_backup():
     return backup_path
 
 def cleanup_old_backups(backups_dir, keep_count=30):
-    """Удаляет старые бэкапы, оставляя только последние N."""
-    backups = sorted(backups_dir.glob('backup_*.zip'), key=os.path.getmtime, reverse=True)
-    
-    if len(backups) > keep_count:
-        deleted_count = 0
-        for backup in backups[keep_count:]:
-            backup.unlink()
-            deleted_count += 1
-        if deleted_count > 0:
-            print(f'\n✓ Удалено старых бэкапов: {deleted_count}')
+    """
+    Удаляет старые бэкапы, оставляя последние N и архивы, нужные
+    инкрементальным бэкапам из этих N (как manage.py backup).
+    """
+    deleted_count = prune_backups(backups_dir, keep_count)
+    if deleted_count > 0:
+        print(f'\n✓ Удалено старых бэкапов: {deleted_count}')
 
 def restore_backup(backup_path):
     """Восстанавливает данные из бэкапа."""
@@ -87,6 +103,11 @@ def restore_backup(backup_path):
         print(f'Ошибка: Бэкап не найден: {backup_path}')
         return False
     
+    if read_manifest(backup_path) is not None:
+        # Инкрементальный бэкап: медиафайлы собираются из нескольких архивов
+        call_command('backup', restore=str(backup_path))
+        return True
+    
     print(f'Восстановление из бэкапа: {backup_path}')
     
     # Создаем резервную копию текущей БД перед восстановлением
@@ -109,11 +130,15 @@ if __name__ == '__main__':
     
     parser = argparse.ArgumentParser(description='Управление бэкапами БД и медиа файлов')
     parser.add_argument('--restore', type=str, help='Путь к файлу бэкапа для восстановления')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Сохранять только новые и измененные медиафайлы (manage.py backup --incremental)')
     
     args = parser.parse_args()
     
     if args.restore:
         restore_backup(Path(args.restore))
+    elif args.incremental:
+        call_command('backup', incremental=True)
     else:
         create_backup()
 
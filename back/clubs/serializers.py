@@ -1,37 +1,44 @@
 from rest_framework import serializers
 from .models import Club, Coach, ClubSeason, ClubApplication
+from core.dynamic_fields import DynamicFieldsMixin
+from core.absolute_urls import file_url
+from core.images import DerivativeURLField
 
 
-class ClubSerializer(serializers.ModelSerializer):
+class ClubSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для модели Club."""
     
+    field_dependencies = {'logo_url': ('logo',)}
+    
     logo_url = serializers.SerializerMethodField()
+    logo_thumb_url = DerivativeURLField('logo')
     
     class Meta:
         model = Club
         fields = '__all__'
     
     def get_logo_url(self, obj):
-        if obj.logo:
-            request = self.context.get('request')
-            try:
-                return request.build_absolute_uri(obj.logo.url) if request else obj.logo.url
-            except:
-                return obj.logo.url
-        return None
+        return file_url(obj.logo, self.context.get('request'))
 
 
-class ClubListSerializer(serializers.ModelSerializer):
+class ClubListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для списка клубов."""
     
+    field_dependencies = {
+        'logo_url': ('logo',),
+        'season_name': ('seasons',),
+        'group_name': ('seasons',),
+    }
+    
     logo_url = serializers.SerializerMethodField()
+    logo_thumb_url = DerivativeURLField('logo')
     season_name = serializers.SerializerMethodField()
     group_name = serializers.SerializerMethodField()
     
     class Meta:
         model = Club
         fields = [
-            'id', 'name', 'short_name', 'logo', 'logo_url', 'city', 'founded',
+            'id', 'name', 'short_name', 'logo', 'logo_url', 'logo_thumb_url', 'city', 'founded',
             'primary_kit_color', 'secondary_kit_color', 'coach_full_name',
             'assistant_full_name', 'captain_full_name', 'contact_phone',
             'contact_email', 'social_media', 'description', 'participation_fee',
@@ -39,13 +46,7 @@ class ClubListSerializer(serializers.ModelSerializer):
         ]
     
     def get_logo_url(self, obj):
-        if obj.logo:
-            request = self.context.get('request')
-            try:
-                return request.build_absolute_uri(obj.logo.url) if request else obj.logo.url
-            except:
-                return obj.logo.url
-        return None
+        return file_url(obj.logo, self.context.get('request'))
     
     def get_season_name(self, obj):
         """Получаем имя сезона из самой последней записи ClubSeason."""
@@ -88,11 +89,12 @@ class ClubSeasonSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ClubDetailSerializer(serializers.ModelSerializer):
+class ClubDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для детальной информации о клубе."""
     
     coaches = CoachSerializer(many=True, read_only=True)
     seasons = ClubSeasonSerializer(many=True, read_only=True)
+    logo_thumb_url = DerivativeURLField('logo')
     
     class Meta:
         model = Club
@@ -122,13 +124,8 @@ class TableRowSerializer(serializers.ModelSerializer):
         ] 
     
     def get_club_logo(self, obj):
-        if obj.club and obj.club.logo:
-            request = self.context.get('request')
-            url = obj.club.logo.url
-            try:
-                return request.build_absolute_uri(url) if request else url
-            except:
-                return url
+        if obj.club:
+            return file_url(obj.club.logo, self.context.get('request'))
         return None
     
     def get_goals_formatted(self, obj):
@@ -159,13 +156,7 @@ class ClubApplicationSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at', 'reviewed_at', 'reviewed_by', 'club']
     
     def get_logo_url(self, obj):
-        if obj.logo:
-            request = self.context.get('request')
-            try:
-                return request.build_absolute_uri(obj.logo.url) if request else obj.logo.url
-            except:
-                return obj.logo.url
-        return None
+        return file_url(obj.logo, self.context.get('request'))
 
 
 class ClubApplicationListSerializer(serializers.ModelSerializer):
@@ -183,13 +174,7 @@ class ClubApplicationListSerializer(serializers.ModelSerializer):
         ]
     
     def get_logo_url(self, obj):
-        if obj.logo:
-            request = self.context.get('request')
-            try:
-                return request.build_absolute_uri(obj.logo.url) if request else obj.logo.url
-            except:
-                return obj.logo.url
-        return None
+        return file_url(obj.logo, self.context.get('request'))
 
 
 class ClubApplicationDetailSerializer(serializers.ModelSerializer):
@@ -204,10 +189,4 @@ class ClubApplicationDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_logo_url(self, obj):
-        if obj.logo:
-            request = self.context.get('request')
-            try:
-                return request.build_absolute_uri(obj.logo.url) if request else obj.logo.url
-            except:
-                return obj.logo.url
-        return None
\ No newline at end of file
+        return file_url(obj.logo, self.context.get('request'))
\ No newline at end of file
@@ -3,26 +3,30 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q
 from django.core.cache import cache
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from .models import Club, Coach, ClubSeason, ClubApplication
 from .serializers import (
     ClubSerializer, ClubListSerializer, ClubDetailSerializer,
     CoachSerializer, ClubSeasonSerializer, TableRowSerializer,
     ClubApplicationSerializer, ClubApplicationListSerializer, ClubApplicationDetailSerializer
 )
+from core.conditional import ConditionalGetMixin
+from core.dynamic_fields import DynamicFieldsViewSetMixin
+from core.pagination import ActionPaginationMixin, MatchCursorPagination
+from core.search import filter_by_search
+from core.response_cache import cache_response
 import rest_framework.parsers
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class ClubViewSet(viewsets.ModelViewSet):
+class ClubViewSet(ConditionalGetMixin, DynamicFieldsViewSetMixin, ActionPaginationMixin, viewsets.ModelViewSet):
     """ViewSet для управления клубами."""
     
     queryset = Club.objects.select_related().prefetch_related('seasons', 'players', 'coaches')
     serializer_class = ClubSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    conditional_actions = ('list', 'retrieve', 'table')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -79,6 +83,32 @@ class ClubViewSet(viewsets.ModelViewSet):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
+
+    def get_conditional_querysets(self):
+        """Querysets, от которых зависят list/retrieve и турнирная таблица."""
+        from matches.models import Match
+        
+        if self.action == 'table':
+            season_id = (self.request.GET.get('season') or '').strip()
+            if not season_id:
+                # Таблица за все сезоны суммирует все записи ClubSeason
+                return [ClubSeason.objects.all(), Club.objects.all()]
+            if not season_id.isdigit():
+                return []
+            club_seasons = ClubSeason.objects.filter(season_id=season_id)
+            # last_5 в строках таблицы строится по матчам сезона
+            return [
+                club_seasons,
+                Club.objects.filter(pk__in=club_seasons.values('club_id')),
+                Match.objects.filter(season_id=season_id),
+            ]
+        
+        querysets = super().get_conditional_querysets()
+        if querysets:
+            # Сезон/группа клуба и тренеры попадают в ответ
+            clubs = querysets[0].values('pk')
+            querysets += [ClubSeason.objects.filter(club__in=clubs), Coach.objects.filter(club__in=clubs)]
+        return querysets
     
     def create(self, request, *args, **kwargs):
         """Создание клуба с обработкой ошибок."""
@@ -340,17 +370,22 @@ class ClubViewSet(viewsets.ModelViewSet):
         """Поиск клубов."""
         query = request.GET.get('q', '')
         if query:
-            clubs = self.queryset.filter(
-                Q(name__icontains=query) | 
-                Q(city__icontains=query) | 
-                Q(short_name__icontains=query)
-            )
+            clubs = filter_by_search(self.queryset, 'club', query)
         else:
             clubs = self.queryset
         serializer = self.get_serializer(clubs, many=True)
         return Response(serializer.data)
     
+    @staticmethod
+    def _set_table_position(club_season, position):
+        """Обновляет позицию строки таблицы, записывая в БД только изменения."""
+        if club_season.position != position:
+            club_season.position = position
+            if club_season.pk:
+                club_season.save(update_fields=['position', 'updated_at'])
+        
     @action(detail=False, methods=['get'])
+    @cache_response(timeout=60, stale_timeout=600)
     def table(self, request):
         """Получить турнирную таблицу."""
         try:
@@ -360,6 +395,11 @@ class ClubViewSet(viewsets.ModelViewSet):
             season_id = request.GET.get('season')
             group_id = request.GET.get('group')  # Новый параметр для фильтрации по группе
             
+            # Нечисловой id - ошибка клиента, а не 500 из Season.objects.get
+            for name, value in (('season', season_id), ('group', group_id)):
+                if value and value.strip() and not value.strip().isdigit():
+                    return Response({'error': f'Некорректный параметр {name}'}, status=status.HTTP_400_BAD_REQUEST)
+            
             # Проверяем, что season_id не пустой и не None
             if season_id and season_id.strip():
                 # Если сезон указан, фильтруем по нему
@@ -386,14 +426,14 @@ class ClubViewSet(viewsets.ModelViewSet):
                     else:
                         club_seasons = club_seasons.order_by('-points', '-goal_difference', '-goals_for')
                     
-                    # Устанавливаем позиции внутри каждой группы (если есть группы)
+                    # Устанавливаем позиции внутри каждой группы (если есть группы).
+                    # Сохраняем только изменившиеся позиции: лишние save() сдвигают
+                    # updated_at и ломают ETag таблицы
                     if season.has_groups and group_id:
                         # Позиции внутри конкретной группы
                         position = 1
                         for club_season in club_seasons:
-                            club_season.position = position
-                            if club_season.pk:
-                                club_season.save()
+                            self._set_table_position(club_season, position)
                             position += 1
                     elif season.has_groups:
                         # Позиции внутри каждой группы отдельно
@@ -403,16 +443,12 @@ class ClubViewSet(viewsets.ModelViewSet):
                             if current_group != club_season.group:
                                 current_group = club_season.group
                                 position = 1
-                            club_season.position = position
-                            if club_season.pk:
-                                club_season.save()
+                            self._set_table_position(club_season, position)
                             position += 1
                     else:
                         # Обычная таблица без групп
                         for i, club_season in enumerate(club_seasons, 1):
-                            club_season.position = i
-                            if club_season.pk:
-                                club_season.save()
+                            self._set_table_position(club_season, i)
                     
                     # Если сезон с группами и группа не указана - возвращаем структурированные данные
                     if season.has_groups and not group_id:
@@ -605,8 +641,15 @@ class ClubViewSet(viewsets.ModelViewSet):
             # Если сезон не указан, возвращаем всех игроков клуба (для обратной совместимости)
             players = club.players.all()
         
-        serializer = PlayerListSerializer(players, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.paginated_response(players.order_by('last_name', 'first_name', 'id'), serializer_class=PlayerListSerializer)
+    
+    @action(detail=True, methods=['get'])
+    def roster(self, request, pk=None):
+        """Краткий состав клуба (id, имя, номер) из кэша."""
+        from players.roster import get_roster
+        
+        club = self.get_object()
+        return Response(get_roster(club.id))
     
     @action(detail=True, methods=['get'])
     def matches(self, request, pk=None):
@@ -615,13 +658,14 @@ class ClubViewSet(viewsets.ModelViewSet):
         from matches.models import Match
         from core.models import Season
         from matches.serializers import MatchListSerializer
+        from matches.views import MATCH_LIST_RELATIONS
         
         # Получаем сезон из query параметров или используем активный
         season_id = request.GET.get('season')
         if season_id:
             try:
                 season = Season.objects.get(id=season_id)
-                matches = Match.objects.filter(
+                matches = Match.objects.select_related(*MATCH_LIST_RELATIONS).filter(
                     Q(home_team=club) | Q(away_team=club),
                     season=season
                 ).order_by('-date', '-time')
@@ -629,12 +673,13 @@ class ClubViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'Сезон не найден'}, status=status.HTTP_404_NOT_FOUND)
         else:
             # Если сезон не указан, возвращаем все матчи клуба (для обратной совместимости)
-            matches = Match.objects.filter(
+            matches = Match.objects.select_related(*MATCH_LIST_RELATIONS).filter(
                 Q(home_team=club) | Q(away_team=club)
             ).order_by('-date', '-time')
         
-        serializer = MatchListSerializer(matches, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.paginated_response(
+            matches, serializer_class=MatchListSerializer, pagination_class=MatchCursorPagination
+        )
 
 
 class CoachViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,81 @@
+"""
+Абсолютные URL файлов для сериализаторов.
+
+request.build_absolute_uri() на каждой строке списка заново разбирает Host
+(с проверкой ALLOWED_HOSTS), а file.url каждый раз обращается к хранилищу.
+URLBuilder вычисляет схему и хост один раз на запрос и запоминает URL
+каждого файла, поэтому логотип клуба, встречающийся в 300 строках таблицы
+и матчей, строится один раз.
+
+    from core.absolute_urls import file_url
+    def get_logo_url(self, obj):
+        return file_url(obj.logo, self.context.get('request'))
+"""
+from urllib.parse import urljoin
+
+from django.core.exceptions import DisallowedHost
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+
+
+def storage_url(storage, name):
+    """URL файла; для файловых хранилищ - без вызова storage.url()."""
+    if isinstance(storage, FileSystemStorage):
+        return storage.base_url + filepath_to_uri(name).lstrip('/')
+    return storage.url(name)
+
+
+class URLBuilder:
+    """Схема, хост и URL файлов одного запроса."""
+
+    def __init__(self, request=None):
+        self.path = request.path if request is not None else '/'
+        self.base = ''
+        if request is not None:
+            try:
+                self.base = f'{request.scheme}://{request.get_host()}'
+            except DisallowedHost:
+                # Как и раньше при ошибке: относительные URL
+                pass
+        self._files = {}
+
+    def absolute(self, url):
+        if not url or not self.base or url.startswith(('http://', 'https://', '//')):
+            return url
+        if url.startswith('/'):
+            return self.base + url
+        return urljoin(self.base + self.path, url)
+
+    def stored(self, storage, name):
+        """Абсолютный URL файла name в storage."""
+        url = self._files.get(name)
+        if url is None:
+            url = self._files[name] = self.absolute(storage_url(storage, name))
+        return url
+
+    def file(self, file):
+        """Абсолютный URL FieldFile; None, если файла нет."""
+        name = getattr(file, 'name', None)
+        if not name:
+            return None
+        return self.stored(file.storage, name)
+
+
+def url_builder(request):
+    """URLBuilder запроса (создается при первом обращении); без запроса - относительные URL."""
+    if request is None:
+        return URLBuilder()
+    # У DRF Request и исходного HttpRequest один построитель
+    http_request = getattr(request, '_request', request)
+    builder = getattr(http_request, '_url_builder', None)
+    if builder is None:
+        builder = http_request._url_builder = URLBuilder(http_request)
+    return builder
+
+
+def file_url(file, request=None):
+    return url_builder(request).file(file)
+
+
+def absolute_url(url, request=None):
+    return url_builder(request).absolute(url)
@@ -6,5 +6,6 @@ class CoreConfig(AppConfig):
     name = 'core'
     
     def ready(self):
-        """Импортируем сигналы при запуске приложения."""
+        """Импортируем сигналы и проверки настроек при запуске приложения."""
+        import core.checks
         import core.signals 
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Автодополнение поиска из индекса в памяти процесса.
+
+Каждый воркер при первом запросе загружает записи поиска (core.search.SearchEntry)
+одним запросом и строит отсортированный список пар (слово, запись). Поиск по
+префиксу - bisect по этому списку, без обращений к БД.
+
+Изменения приходят из сигналов: номер версии 'autocomplete' хранится в кэше,
+а для каждой версии - ключ с измененным объектом. Воркер, увидев новую версию,
+перечитывает только измененные записи; если журнал изменений вытеснен из кэша
+или отстал слишком сильно - перестраивает индекс целиком.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache_versions import bump_version, get_version
+from .search import normalize
+
+AUTOCOMPLETE_NAMESPACE = 'autocomplete'
+
+
+def _change_key(version):
+    return f'autocomplete:change:{version}'
+
+
+def notify_change(kind, object_id):
+    """
+    Сообщает воркерам, что запись поиска объекта изменилась (или удалена).
+
+    Версия публикуется после коммита транзакции: иначе другой воркер может
+    перечитать еще старые записи, запомнить новую версию и больше их не обновить.
+    При откате транзакции изменение не публикуется.
+    """
+    transaction.on_commit(lambda: _publish_change(kind, object_id))
+
+
+def _publish_change(kind, object_id):
+    version = bump_version(AUTOCOMPLETE_NAMESPACE)
+    cache.set(_change_key(version), (kind, object_id), getattr(settings, 'AUTOCOMPLETE_CHANGE_TTL', 86400))
+
+
+def _entry(kind, object_id, title, subtitle, text):
+    return {
+        'type': kind, 'id': object_id, 'title': title, 'subtitle': subtitle,
+        'words': sorted(set(text.split())),
+        # Для сортировки: совпадение с началом заголовка выше
+        'name': normalize(title),
+    }
+
+
+class PrefixIndex:
+    """Отсортированные слова записей поиска -> записи."""
+
+    def __init__(self):
+        self.version = None
+        self.entries = {}
+        self.tokens = []
+        self._lock = threading.Lock()
+
+    def _add(self, kind, object_id, title, subtitle, text):
+        key = (kind, object_id)
+        self.entries[key] = entry = _entry(kind, object_id, title, subtitle, text)
+        for word in entry['words']:
+            insort(self.tokens, (word, key))
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for word in entry['words']:
+            position = bisect_left(self.tokens, (word, key))
+            if position < len(self.tokens) and self.tokens[position] == (word, key):
+                del self.tokens[position]
+
+    def rebuild(self, version):
+        from .models import SearchEntry
+
+        entries, tokens = {}, []
+        for kind, object_id, title, subtitle, text in SearchEntry.objects.values_list(
+            'kind', 'object_id', 'title', 'subtitle', 'text'
+        ).iterator(chunk_size=2000):
+            key = (kind, object_id)
+            entries[key] = entry = _entry(kind, object_id, title, subtitle, text)
+            tokens.extend((word, key) for word in entry['words'])
+        tokens.sort()
+        self.entries, self.tokens, self.version = entries, tokens, version
+
+    def apply_changes(self, keys, version):
+        """Перечитывает записи измененных объектов одним запросом."""
+        from django.db.models import Q
+        from .models import SearchEntry
+
+        condition = Q()
+        for kind, object_id in keys:
+            condition |= Q(kind=kind, object_id=object_id)
+        rows = SearchEntry.objects.filter(condition).values_list('kind', 'object_id', 'title', 'subtitle', 'text')
+        for key in keys:
+            self._remove(key)
+        for row in rows:
+            self._add(*row)
+        self.version = version
+
+    def refresh(self):
+        """Сверяет версию с кэшем; при изменениях применяет журнал или перестраивает индекс."""
+        current = get_version(AUTOCOMPLETE_NAMESPACE)
+        if current == self.version:
+            return
+        with self._lock:
+            if current == self.version:
+                return
+            if self.version is None or not 0 < current - self.version <= getattr(settings, 'AUTOCOMPLETE_MAX_CHANGES', 500):
+                self.rebuild(current)
+                return
+            versions = range(self.version + 1, current + 1)
+            changes = cache.get_many([_change_key(version) for version in versions])
+            if len(changes) != len(versions):
+                self.rebuild(current)
+                return
+            self.apply_changes(set(changes.values()), current)
+
+    def _prefix_matches(self, prefix):
+        keys = set()
+        position = bisect_left(self.tokens, (prefix,))
+        while position < len(self.tokens) and self.tokens[position][0].startswith(prefix):
+            keys.add(self.tokens[position][1])
+            position += 1
+        return keys
+
+    def lookup(self, query, kinds=None, limit=10):
+        """Записи, у которых каждое слово запроса - начало одного из слов записи."""
+        words = normalize(query).split()
+        if not words:
+            return []
+        first_word = words[0]
+        self.refresh()
+        with self._lock:
+            # Сначала самое длинное слово запроса: у него меньше совпадений
+            words.sort(key=len, reverse=True)
+            keys = self._prefix_matches(words[0])
+            for word in words[1:]:
+                if not keys:
+                    break
+                keys &= self._prefix_matches(word)
+            entries = [self.entries[key] for key in keys if not kinds or key[0] in kinds]
+
+        entries.sort(key=lambda entry: (not entry['name'].startswith(first_word), len(entry['title']), entry['title']))
+        return [
+            {'type': entry['type'], 'id': entry['id'], 'title': entry['title'], 'subtitle': entry['subtitle']}
+            for entry in entries[:limit]
+        ]
+
+
+# Индекс текущего процесса
+index = PrefixIndex()
+
+
+def autocomplete(query, kinds=None, limit=10):
+    return index.lookup(query, kinds=kinds, limit=limit)
@@ -0,0 +1,251 @@
+"""
+Инкрементальные бэкапы медиафайлов (manage.py backup --incremental).
+
+Каждый архив backup_*.zip содержит БД и manifest.json - список всех
+медиафайлов на момент бэкапа: путь -> SHA-256, размер, mtime и имя архива,
+в котором лежит содержимое (objects/ab/<sha256>). В новый архив попадают
+только новые и измененные файлы; остальные ссылаются на архивы прошлых
+бэкапов. Файлы с тем же размером и mtime, что в прошлом манифесте, не
+перечитываются, а одинаковое содержимое под разными путями хранится один раз.
+
+Изображения, видео и архивы уже сжаты: они кладутся в zip без сжатия
+(ZIP_STORED), чтобы не тратить CPU впустую.
+
+SQLite копируется не как файл (во время записи получится испорченная копия),
+а через backup API: страницами по BACKUP_SQLITE_PAGES с паузой между шагами,
+чтобы приложение могло писать в БД, с проверкой копии PRAGMA integrity_check.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+COMPRESSED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif', '.heic',
+    '.mp4', '.m4v', '.mov', '.webm', '.mkv', '.avi', '.mp3', '.m4a', '.ogg',
+    '.zip', '.gz', '.br', '.bz2', '.xz', '.7z', '.rar',
+    '.docx', '.xlsx', '.pptx', '.woff', '.woff2',
+}
+
+
+def compress_type(path):
+    """ZIP_STORED для уже сжатых форматов, ZIP_DEFLATED для остальных."""
+    if os.path.splitext(str(path))[1].lower() in COMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def object_name(digest):
+    return f'objects/{digest[:2]}/{digest}'
+
+
+def read_manifest(archive_path):
+    """Манифест архива или None (полный бэкап старого формата)."""
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            return json.loads(archive.read(MANIFEST_NAME))
+    except (KeyError, zipfile.BadZipFile, OSError, ValueError):
+        return None
+
+
+def list_backups(backups_dir):
+    """Архивы бэкапов, новые первыми."""
+    return sorted(Path(backups_dir).glob('backup_*.zip'), key=lambda path: path.name, reverse=True)
+
+
+def latest_manifest(backups_dir):
+    for archive_path in list_backups(backups_dir):
+        manifest = read_manifest(archive_path)
+        if manifest is not None:
+            return manifest
+    return None
+
+
+def iter_media_files(media_dir, base_dir, exclude_dirs=()):
+    """(путь, имя в архиве) медиафайлов; exclude_dirs - папки первого уровня, которые пропускаются."""
+    media_dir = Path(media_dir)
+    for root, dirs, files in os.walk(media_dir):
+        if Path(root) == media_dir:
+            dirs[:] = [name for name in dirs if name not in exclude_dirs]
+        for file in files:
+            path = Path(root) / file
+            if path.is_file():
+                yield path, path.relative_to(base_dir).as_posix()
+
+
+def write_media_snapshot(zipf, archive_name, media_dir, base_dir, previous=None, exclude_dirs=()):
+    """
+    Пишет в открытый zipf новые и измененные медиафайлы и возвращает
+    (манифест, статистика).
+    """
+    previous_files = (previous or {}).get('files', {})
+    # Содержимое, которое уже лежит в каком-то архиве: sha256 -> архив
+    known_objects = {entry['sha256']: entry['archive'] for entry in previous_files.values()}
+    files = {}
+    stats = {'files': 0, 'stored': 0, 'stored_bytes': 0, 'reused': 0, 'hashed': 0}
+
+    for path, arcname in iter_media_files(media_dir, base_dir, exclude_dirs):
+        stat_result = path.stat()
+        old = previous_files.get(arcname)
+        stats['files'] += 1
+        if old and old['size'] == stat_result.st_size and old['mtime'] == stat_result.st_mtime_ns:
+            digest = old['sha256']
+        else:
+            digest = file_sha256(path)
+            stats['hashed'] += 1
+
+        archive = known_objects.get(digest)
+        if archive is None:
+            zipf.write(path, object_name(digest), compress_type=compress_type(path))
+            archive = known_objects[digest] = archive_name
+            stats['stored'] += 1
+            stats['stored_bytes'] += stat_result.st_size
+        else:
+            stats['reused'] += 1
+        files[arcname] = {
+            'sha256': digest, 'size': stat_result.st_size, 'mtime': stat_result.st_mtime_ns, 'archive': archive,
+        }
+
+    manifest = {'version': MANIFEST_VERSION, 'archive': archive_name, 'files': files}
+    zipf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False))
+    return manifest, stats
+
+
+def restore_media(archive_path, target_dir):
+    """
+    Восстанавливает медиафайлы снимка archive_path в target_dir (как BASE_DIR:
+    файлы пишутся по путям media/...). Архивы с содержимым ищутся рядом.
+
+    Returns:
+        число восстановленных файлов; None, если у архива нет манифеста.
+    """
+    archive_path = Path(archive_path)
+    manifest = read_manifest(archive_path)
+    if manifest is None:
+        return None
+
+    by_archive = {}
+    for arcname, entry in manifest['files'].items():
+        by_archive.setdefault(entry['archive'], []).append((arcname, entry))
+
+    restored = 0
+    for archive_name, entries in by_archive.items():
+        source = archive_path.parent / archive_name
+        if not source.exists():
+            raise FileNotFoundError(f'Для восстановления нужен архив {archive_name}')
+        with zipfile.ZipFile(source) as archive:
+            for arcname, entry in entries:
+                target = Path(target_dir) / arcname
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with archive.open(object_name(entry['sha256'])) as data, open(target, 'wb') as file:
+                    for chunk in iter(lambda: data.read(1024 * 1024), b''):
+                        file.write(chunk)
+                os.utime(target, ns=(entry['mtime'], entry['mtime']))
+                restored += 1
+    return restored
+
+
+def required_archives(archive_paths):
+    """Имена архивов, содержимое которых нужно для восстановления archive_paths."""
+    required = set()
+    for archive_path in archive_paths:
+        required.add(Path(archive_path).name)
+        manifest = read_manifest(archive_path)
+        if manifest is not None:
+            required.update(entry['archive'] for entry in manifest['files'].values())
+    return required
+
+
+@contextmanager
+def discard_on_error(archive_path):
+    """Удаляет недописанный архив, если при его создании возникло исключение."""
+    try:
+        yield
+    except BaseException:
+        Path(archive_path).unlink(missing_ok=True)
+        raise
+
+
+def prune_backups(backups_dir, keep_count=30):
+    """
+    Удаляет архивы старше последних keep_count, кроме тех, в которых лежат
+    медиафайлы, нужные инкрементальным бэкапам из этих keep_count.
+
+    Returns:
+        число удаленных архивов.
+    """
+    backups = list_backups(backups_dir)
+    if len(backups) <= keep_count:
+        return 0
+    required = required_archives(backups[:keep_count])
+    deleted_count = 0
+    for backup in backups[keep_count:]:
+        if backup.name in required:
+            continue
+        backup.unlink()
+        deleted_count += 1
+    return deleted_count
+
+
+def sqlite_snapshot(db_path, target_path, pages=1024, sleep=0.005, progress=None):
+    """
+    Согласованная копия SQLite db_path в target_path без остановки записи.
+
+    progress(скопировано страниц, всего страниц) вызывается после каждого шага.
+
+    Returns:
+        число страниц копии.
+    Raises:
+        sqlite3.DatabaseError: копия не прошла PRAGMA integrity_check.
+    """
+    source = sqlite3.connect(str(db_path), timeout=30)
+    target = sqlite3.connect(str(target_path))
+    try:
+        def step(status, remaining, total):
+            if progress is not None:
+                progress(total - remaining, total)
+
+        source.backup(target, pages=pages, progress=step, sleep=sleep)
+        problems = [row[0] for row in target.execute('PRAGMA integrity_check')]
+        if problems != ['ok']:
+            raise sqlite3.DatabaseError(f"integrity_check: {'; '.join(problems[:5])}")
+        return target.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+
+
+def write_sqlite_backup(zipf, db_path, arcname, pages=1024, sleep=0.005, progress=None):
+    """
+    Пишет в zipf согласованную копию SQLite (sqlite_snapshot) под именем arcname.
+
+    Returns:
+        (число страниц, размер копии в байтах, секунд на копирование).
+    """
+    started = time.monotonic()
+    fd, snapshot_path = tempfile.mkstemp(suffix='.sqlite3', dir=Path(zipf.filename).parent)
+    os.close(fd)
+    try:
+        page_count = sqlite_snapshot(db_path, snapshot_path, pages=pages, sleep=sleep, progress=progress)
+        elapsed = time.monotonic() - started
+        # zipfile читает копию блоками, в память она целиком не загружается
+        zipf.write(snapshot_path, arcname)
+        return page_count, os.path.getsize(snapshot_path), elapsed
+    finally:
+        os.remove(snapshot_path)
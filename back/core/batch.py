@@ -0,0 +1,153 @@
+"""
+Пакетные GET-запросы (/api/batch/).
+
+Клиент отправляет список относительных путей API, сервер выполняет их
+внутри одного HTTP-запроса через URL resolver и возвращает массив
+пар статус/тело. Подзапросы используют пользователя исходного запроса,
+а при "parallel": true независимые чтения выполняются в пуле потоков.
+
+Ошибка одного подзапроса (Http404, исключение view) дает статус этого
+элемента, а не 500 всего пакета. Потоковые ответы (SSE /api/matches/live/stream/)
+в пакете не выполняются: их чтение заняло бы worker на минуты.
+"""
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework import serializers
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH_PREFIX = '/api/'
+
+
+class BatchUserAuthentication(BaseAuthentication):
+    """
+    Передает подзапросу пользователя, уже аутентифицированного в /api/batch/,
+    чтобы JWT не проверялся заново для каждого пути.
+    """
+
+    def authenticate(self, request):
+        user = getattr(request._request, 'batch_user', None)
+        if user is None or not user.is_authenticated:
+            return None
+        return user, getattr(request._request, 'batch_auth', None)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """Тело запроса: {"requests": ["/api/clubs/", ...], "parallel": false}."""
+
+    requests = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, paths):
+        max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+        if len(paths) > max_requests:
+            raise serializers.ValidationError(f'Не больше {max_requests} запросов в пакете')
+        for path in paths:
+            parts = urlsplit(path)
+            if parts.scheme or parts.netloc or not parts.path.startswith(BATCH_PATH_PREFIX):
+                raise serializers.ValidationError(f'Допускаются только относительные пути {BATCH_PATH_PREFIX}: {path}')
+            if parts.path.rstrip('/') == f'{BATCH_PATH_PREFIX}batch':
+                raise serializers.ValidationError('Вложенные пакеты не поддерживаются')
+        return paths
+
+
+def build_subrequest(request, path):
+    """GET-подзапрос с заголовками исходного запроса, кроме условных (If-None-Match и т.п.)."""
+    parts = urlsplit(path)
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith(('wsgi.', 'HTTP_IF_')) and key not in ('CONTENT_TYPE', 'CONTENT_LENGTH')
+    }
+    environ.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.url_scheme': request.scheme,
+    })
+    subrequest = WSGIRequest(environ)
+    subrequest.batch_user = request.user
+    subrequest.batch_auth = request.auth
+    return subrequest
+
+
+def response_body(response):
+    """Тело ответа как JSON-значение (данные DRF без повторного кодирования)."""
+    data = getattr(response, 'data', None)
+    if data is not None:
+        return data
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        response.render()
+    content = response.content
+    if not content:
+        return None
+    if 'json' in response.get('Content-Type', ''):
+        return json.loads(content)
+    return content.decode(response.charset or 'utf-8', errors='replace')
+
+
+def dispatch(request, path):
+    """Выполняет один путь через URL resolver и возвращает {'path', 'status', 'body'}."""
+    subrequest = build_subrequest(request, path)
+    try:
+        match = resolve(subrequest.path_info)
+    except Resolver404:
+        return {'path': path, 'status': 404, 'body': {'detail': 'Не найдено'}}
+
+    try:
+        response = match.func(subrequest, *match.args, **match.kwargs)
+    except Http404:
+        return {'path': path, 'status': 404, 'body': {'detail': 'Не найдено'}}
+    except PermissionDenied:
+        return {'path': path, 'status': 403, 'body': {'detail': 'Доступ запрещен'}}
+    except Exception:
+        logger.exception(f'Ошибка подзапроса пакета {path}')
+        return {'path': path, 'status': 500, 'body': {'detail': 'Ошибка сервера'}}
+
+    if response.streaming:
+        # Генератор потока еще не запускался: закрываем его, не читая
+        response.close()
+        return {'path': path, 'status': 400, 'body': {'detail': 'Потоковые ответы не поддерживаются в пакете'}}
+    try:
+        body = response_body(response)
+    except Exception:
+        logger.exception(f'Ошибка подзапроса пакета {path}')
+        return {'path': path, 'status': 500, 'body': {'detail': 'Ошибка сервера'}}
+    return {'path': path, 'status': response.status_code, 'body': body}
+
+
+def dispatch_in_thread(request, path):
+    # У каждого потока свое соединение с БД - закрываем его после подзапроса
+    try:
+        return dispatch(request, path)
+    finally:
+        connection.close()
+
+
+def run_batch(request, paths, parallel=False):
+    """Выполняет подзапросы последовательно (одно соединение с БД) или в пуле потоков."""
+    if not parallel or len(paths) == 1:
+        return [dispatch(request, path) for path in paths]
+
+    workers = min(len(paths), getattr(settings, 'BATCH_MAX_WORKERS', 4))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda path: dispatch_in_thread(request, path), paths))
+
+
+def batch_response(request):
+    serializer = BatchRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    results = run_batch(request, serializer.validated_data['requests'], serializer.validated_data['parallel'])
+    return Response(results)
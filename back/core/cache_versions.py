@@ -0,0 +1,41 @@
+"""
+Версии пространств имен кэша.
+
+Вместо удаления множества ключей при изменении данных увеличиваем номер
+версии пространства имен: записи со старой версией считаются устаревшими.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _key(namespace):
+    return f'cache_version:{namespace}'
+
+
+def _initial_version():
+    # Версия от времени, а не 1: если ключ версии вытеснен из кэша,
+    # старые записи не станут снова "актуальными"
+    return int(time.time() * 1000)
+
+
+def get_version(namespace):
+    """Возвращает текущую версию пространства имен."""
+    key = _key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """Атомарно увеличивает версию пространства имен."""
+    key = _key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Ключа еще нет (или он вытеснен) - создаем заново
+        version = _initial_version()
+        cache.set(key, version, None)
+        return version
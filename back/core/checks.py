@@ -0,0 +1,19 @@
+"""
+Проверки настроек core (manage.py check, runserver, migrate).
+"""
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def check_image_processing_backend(app_configs, **kwargs):
+    """IMAGE_PROCESSING_BACKEND = 'celery' требует установленного celery."""
+    if getattr(settings, 'IMAGE_PROCESSING_BACKEND', 'thread') == 'celery' and find_spec('celery') is None:
+        return [Error(
+            "IMAGE_PROCESSING_BACKEND = 'celery', но пакет celery не установлен",
+            hint="Установите celery (requirements.txt) или выберите IMAGE_PROCESSING_BACKEND = 'thread'",
+            id='core.E001',
+        )]
+    return []
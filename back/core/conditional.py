@@ -0,0 +1,127 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для ViewSet'ов.
+
+Валидаторы считаются одним агрегатным запросом Max('updated_at') + Count('pk')
+по отфильтрованному queryset'у, поэтому ответ 304 Not Modified отдается
+без загрузки объектов и без сериализации.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+class NotModified(Exception):
+    """Внутреннее исключение для досрочного ответа из initial()."""
+
+    def __init__(self, response):
+        super().__init__('not modified')
+        self.response = response
+
+
+def validator_headers(view):
+    """
+    Заголовки ETag/Last-Modified, вычисленные view в initial().
+
+    Пустой словарь, если view не поддерживает условные запросы.
+    """
+    state = getattr(view, '_conditional_state', None)
+    if not state:
+        return {}
+    etag, last_modified = state
+    headers = {'ETag': etag}
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return headers
+
+
+class ConditionalGetMixin:
+    """
+    Миксин для ViewSet: добавляет ETag/Last-Modified к ответам на чтение
+    и отвечает 304, если клиент прислал актуальные If-None-Match/If-Modified-Since.
+
+    По умолчанию работает для list и retrieve. Для своих action'ов
+    достаточно добавить их в conditional_actions и переопределить
+    get_conditional_querysets().
+    """
+
+    conditional_actions = ('list', 'retrieve')
+    conditional_timestamp_field = 'updated_at'
+
+    def get_conditional_querysets(self):
+        """
+        Querysets, от которых зависит ответ текущего action.
+
+        Элемент списка - queryset или пара (queryset, поле_времени)
+        для моделей без updated_at.
+        """
+        if self.action == 'list':
+            return [self.filter_queryset(self.get_queryset())]
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            lookup_value = self.kwargs.get(lookup_url_kwarg)
+            return [self.get_queryset().filter(**{self.lookup_field: lookup_value})]
+        return []
+
+    def get_conditional_state(self):
+        """Вычисляет (etag, last_modified) или None, если action не поддерживается."""
+        querysets = self.get_conditional_querysets()
+        if not querysets:
+            return None
+
+        # Хост и полный путь входят в ETag: от них зависят абсолютные URL
+        # в ответе, номер страницы и фильтры
+        parts = [self.request.get_host(), self.request.get_full_path()]
+        last_modified = None
+        for item in querysets:
+            if isinstance(item, tuple):
+                queryset, field = item
+            else:
+                queryset, field = item, self.conditional_timestamp_field
+            values = queryset.order_by().aggregate(last=Max(field), total=Count('pk'))
+            last = values['last']
+            parts.append(f"{values['total']}:{last.isoformat() if last else '-'}")
+            if last and (last_modified is None or last > last_modified):
+                last_modified = last
+
+        etag = '"%s"' % hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._conditional_state = None
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return
+
+        try:
+            state = self.get_conditional_state()
+        except (ValueError, TypeError, ValidationError):
+            # Некорректный pk/фильтр: пусть ошибку вернет сам action
+            state = None
+        if state is None:
+            return
+        self._conditional_state = state
+
+        etag, last_modified = state
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if not_modified is not None:
+            raise NotModified(not_modified)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code in (200, 304) and not response.has_header('ETag'):
+            # Ответ из кэша (core.response_cache) уже несет валидаторы своего тела
+            for header, value in validator_headers(self).items():
+                response[header] = value
+        return response
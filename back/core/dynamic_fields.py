@@ -0,0 +1,123 @@
+"""
+Выборочные поля в ответах API (?fields= / ?omit=).
+
+Клиент перечисляет только нужные поля: /api/players/?fields=id,first_name,last_name
+или исключает лишние: /api/clubs/?omit=description,social_media.
+Сериализатор убирает невыбранные поля (их SerializerMethodField не вызываются),
+а ViewSet откладывает загрузку неиспользуемых колонок (defer) и убирает
+ненужные prefetch_related.
+"""
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_field_list(value):
+    """'id, name,,logo' -> {'id', 'name', 'logo'}; пустое значение -> None."""
+    if not value:
+        return None
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    return names or None
+
+
+def get_requested_fields(request):
+    """(запрошенные поля или None, исключенные поля или None) из query-параметров."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    params = getattr(request, 'query_params', request.GET)
+    return parse_field_list(params.get('fields')), parse_field_list(params.get('omit'))
+
+
+class DynamicFieldsMixin:
+    """
+    Миксин для сериализатора: оставляет только поля из ?fields= и убирает поля из ?omit=.
+
+    Применяется только к сериализатору верхнего уровня (или элементу списка
+    верхнего уровня) и только для запросов на чтение. Для ограничения queryset'а
+    во ViewSet сериализатор описывает, от каких атрибутов модели зависят
+    вычисляемые поля: field_dependencies = {'club_logo': ('club',)}.
+    """
+
+    field_dependencies = {}
+
+    def _is_top_level(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_top_level():
+            return fields
+
+        requested, omitted = get_requested_fields(self.context.get('request'))
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        if omitted:
+            fields = {name: field for name, field in fields.items() if name not in omitted}
+        return fields
+
+
+def _prefetch_root(lookup):
+    path = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+    return path.split('__')[0]
+
+
+def restrict_queryset(queryset, serializer):
+    """
+    Откладывает колонки и убирает prefetch'и, не нужные выбранным полям сериализатора.
+
+    Если для какого-то поля нельзя определить, какие атрибуты модели ему нужны
+    (source='*', свойство модели без field_dependencies), queryset не меняется.
+    """
+    model = queryset.model
+    model_fields = {field.name: field for field in model._meta.get_fields()}
+    dependencies = getattr(serializer, 'field_dependencies', {})
+
+    needed = set()
+    for name, field in serializer.fields.items():
+        if name in dependencies:
+            needed.update(dependencies[name])
+            continue
+        if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+            return queryset
+        root = field.source.split('.')[0]
+        if root not in model_fields:
+            return queryset
+        needed.add(root)
+
+    deferred = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and not field.is_relation and field.name not in needed
+    ]
+    if deferred:
+        queryset = queryset.defer(*deferred)
+
+    lookups = queryset._prefetch_related_lookups
+    kept = [lookup for lookup in lookups if _prefetch_root(lookup) in needed]
+    if len(kept) != len(lookups):
+        queryset = queryset.prefetch_related(None).prefetch_related(*kept)
+    return queryset
+
+
+class DynamicFieldsViewSetMixin:
+    """
+    Миксин для ViewSet: при ?fields= / ?omit= ограничивает queryset
+    полями, которые реально попадут в ответ.
+    """
+
+    dynamic_fields_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'action', None) not in self.dynamic_fields_actions:
+            return queryset
+
+        requested, omitted = get_requested_fields(self.request)
+        if not requested and not omitted:
+            return queryset
+
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, DynamicFieldsMixin):
+            return queryset
+        serializer = serializer_class(context=self.get_serializer_context())
+        return restrict_queryset(queryset, serializer)
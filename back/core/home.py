@@ -0,0 +1,138 @@
+"""
+Данные главной страницы одним запросом (/api/home/).
+
+Виджеты (активный сезон, последние и ближайшие матчи, таблица, бомбардиры,
+партнеры, медиа) строятся из общих querysets с одним определением активного
+сезона. Готовый ответ кэшируется по схеме stale-while-revalidate с версией
+из "поколений": поколение сезона растет при изменении его матчей, таблицы,
+статистики, а общее поколение - при изменении клубов, партнеров, медиа.
+Ключ кэша, как в core.response_cache, учитывает роль клиента: сериализаторы
+могут отдавать редакторам другие поля.
+"""
+import time
+
+from django.conf import settings
+
+from .cache_versions import bump_version, get_version
+from .response_cache import request_role
+from .stale_cache import get_or_refresh, register_metrics
+
+HOME_GLOBAL_GENERATION = 'home_generation'
+HOME_METRICS_NAME = 'home'
+
+register_metrics(HOME_METRICS_NAME)
+
+
+def season_generation_namespace(season_id):
+    return f'season_generation:{season_id}'
+
+
+def get_home_version(season_id):
+    """Версия данных главной: (поколение сезона, общее поколение)."""
+    season_version = get_version(season_generation_namespace(season_id)) if season_id else None
+    return season_version, get_version(HOME_GLOBAL_GENERATION)
+
+
+def instance_season_id(instance):
+    """Сезон, к которому относится объект (напрямую или через матч), или None."""
+    from .models import Season
+    
+    if isinstance(instance, Season):
+        return instance.pk
+    season_id = getattr(instance, 'season_id', None)
+    if season_id is None and getattr(instance, 'match_id', None):
+        from matches.models import Match
+        season_id = Match.objects.filter(pk=instance.match_id).values_list('season_id', flat=True).first()
+    return season_id
+
+
+def bump_home_generation(instance):
+    """Увеличивает поколение сезона объекта, а для объектов вне сезона - общее поколение."""
+    season_id = instance_season_id(instance)
+    if season_id:
+        bump_version(season_generation_namespace(season_id))
+    else:
+        bump_version(HOME_GLOBAL_GENERATION)
+
+
+def _timed(timings, name, builder):
+    start = time.perf_counter()
+    value = builder()
+    timings[name] = round((time.perf_counter() - start) * 1000, 2)
+    return value
+
+
+def build_table(season, request):
+    """Таблица активного сезона по сохраненным позициям (без пересчета)."""
+    from clubs.models import ClubSeason
+    from clubs.serializers import TableRowSerializer
+    
+    rows = ClubSeason.objects.filter(season=season, club__is_active=True).select_related('club', 'season', 'group')
+    if season.has_groups:
+        rows = rows.order_by('group__order', 'group__name', '-points', '-goal_difference', '-goals_for')
+    else:
+        rows = rows.order_by('-points', '-goal_difference', '-goals_for')
+    return TableRowSerializer(rows, many=True, context={'request': request}).data
+
+
+def build_home(request, season):
+    """Собирает все виджеты главной страницы. Возвращает (данные, время виджетов в мс)."""
+    from matches.serializers import MatchListSerializer
+    from matches.views import MATCH_LIST_RELATIONS, latest_matches, upcoming_matches
+    from matches.models import Match
+    from players.serializers import TopScorerSerializer
+    from players.views import top_scorers_queryset
+    from .models import Media, Partner
+    from .serializers import MediaSerializer, PartnerSerializer, SeasonSerializer
+    
+    context = {'request': request}
+    matches = Match.objects.select_related(*MATCH_LIST_RELATIONS)
+    season_filter = {'season': season} if season else {}
+    timings = {}
+    
+    data = {
+        'season': _timed(timings, 'season', lambda: SeasonSerializer(season, context=context).data if season else None),
+        'latest_matches': _timed(timings, 'latest_matches', lambda: MatchListSerializer(
+            latest_matches(matches), many=True, context=context).data),
+        'upcoming_matches': _timed(timings, 'upcoming_matches', lambda: MatchListSerializer(
+            upcoming_matches(matches), many=True, context=context).data),
+        'table': _timed(timings, 'table', lambda: build_table(season, request) if season else []),
+        'top_scorers': _timed(timings, 'top_scorers', lambda: TopScorerSerializer(
+            top_scorers_queryset(season_filter), many=True, context=context).data),
+        'partners': _timed(timings, 'partners', lambda: PartnerSerializer(
+            Partner.objects.filter(is_active=True), many=True, context=context).data),
+        'media': _timed(timings, 'media', lambda: MediaSerializer(
+            Media.objects.filter(is_active=True)[:getattr(settings, 'HOME_MEDIA_LIMIT', 12)],
+            many=True, context=context).data),
+    }
+    return data, timings
+
+
+def get_home_data(request):
+    """
+    Данные главной из кэша или собранные заново.
+
+    Returns:
+        (данные, время виджетов или None, статус кэша)
+    """
+    from .models import Season
+    
+    season = Season.objects.filter(is_active=True).first()
+    season_id = season.pk if season else None
+    timings = {}
+    
+    def produce():
+        data, widget_timings = build_home(request, season)
+        timings.update(widget_timings)
+        return data
+    
+    soft_ttl, hard_ttl = getattr(settings, 'HOME_CACHE_TIMEOUTS', (300, 3600))
+    data, cache_status = get_or_refresh(
+        f'home:{request_role(request)}:{request.get_host()}:{season_id}',
+        produce,
+        soft_ttl,
+        hard_ttl,
+        version=get_home_version(season_id),
+        metrics_name=HOME_METRICS_NAME,
+    )
+    return data, timings or None, cache_status
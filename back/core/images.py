@@ -0,0 +1,324 @@
+"""
+Производные изображения (миниатюры) для логотипов и фотографий.
+
+После загрузки изображения Pillow строит уменьшенные копии (thumb, card, full)
+в WebP (или JPEG, если Pillow собран без WebP). Файлы называются по SHA-256
+содержимого оригинала: derivatives/ab/ab12..._thumb.webp, поэтому одинаковые
+изображения не дублируются, а при замене файла меняется URL. Соответствие
+"оригинал -> производные" хранится в ImageDerivative и кэшируется; сериализаторы
+отдают его полями *_thumb_url (DerivativeURLField).
+
+Обработка не задерживает запрос загрузки: сигнал создает запись со статусом
+pending, а после коммита файл обрабатывается в ограниченном пуле потоков
+процесса (IMAGE_PROCESSING_BACKEND = 'thread'), задачей Celery ('celery') или
+сразу ('sync'). Пока статус pending, *_thumb_url отдает заглушку.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.templatetags.static import static
+from rest_framework import serializers
+
+from .absolute_urls import url_builder
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError, features
+except ImportError:  # pragma: no cover - Pillow есть в requirements
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+
+DEFAULT_SIZES = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'full': (1600, 1600),
+}
+
+# Модель -> поля с изображениями, для которых строятся производные
+IMAGE_FIELDS = {
+    'clubs.Club': ('logo',),
+    'players.Player': ('photo',),
+    'referees.Referee': ('photo',),
+    'management.Manager': ('photo',),
+    'core.User': ('avatar',),
+    'core.Media': ('preview', 'file'),
+}
+
+RASTER_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+
+
+def get_sizes():
+    return getattr(settings, 'IMAGE_DERIVATIVE_SIZES', DEFAULT_SIZES)
+
+
+def output_format():
+    """(формат Pillow, расширение) производных."""
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def is_raster(name):
+    """SVG, видео и документы не обрабатываются."""
+    return os.path.splitext(name or '')[1].lower() in RASTER_EXTENSIONS
+
+
+def _cache_key(name):
+    return 'images:derivatives:' + hashlib.md5(name.encode('utf-8')).hexdigest()
+
+
+def derivative_path(digest, size, extension):
+    return f'{DERIVATIVES_DIR}/{digest[:2]}/{digest[:16]}_{size}.{extension}'
+
+
+def render_derivative(image, box, image_format):
+    """Уменьшенная копия (без увеличения маленьких изображений) в байтах."""
+    copy = image.copy()
+    copy.thumbnail(box, Image.LANCZOS)
+    if image_format == 'JPEG' and copy.mode != 'RGB':
+        copy = copy.convert('RGB')
+    elif copy.mode not in ('RGB', 'RGBA'):
+        copy = copy.convert('RGBA')
+    buffer = BytesIO()
+    copy.save(buffer, image_format, quality=getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 82))
+    return buffer.getvalue()
+
+
+def generate_variants(name, storage=None, force=False):
+    """
+    Строит файлы производных для name, не обращаясь к БД (можно вызывать из потоков).
+
+    Returns:
+        поля ImageDerivative (content_hash, width, height, variants) или None,
+        если файл не изображение или недоступен.
+    """
+    storage = storage or default_storage
+    if Image is None or not is_raster(name):
+        return None
+    try:
+        with storage.open(name, 'rb') as source:
+            data = source.read()
+    except (FileNotFoundError, OSError) as exc:
+        logger.warning(f'Изображение {name} недоступно: {exc}')
+        return None
+    try:
+        image = Image.open(BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, OSError) as exc:
+        logger.warning(f'Не удалось декодировать {name}: {exc}')
+        return None
+    # Поворот по EXIF; сами EXIF-данные в производные не попадают
+    image = ImageOps.exif_transpose(image)
+
+    digest = hashlib.sha256(data).hexdigest()
+    image_format, extension = output_format()
+    variants = {}
+    for size, box in get_sizes().items():
+        path = derivative_path(digest, size, extension)
+        if force and storage.exists(path):
+            storage.delete(path)
+        # Имя по хешу: такое же изображение уже могло быть обработано
+        if not storage.exists(path):
+            path = storage.save(path, ContentFile(render_derivative(image, box, image_format)))
+        variants[size] = path
+    return {'content_hash': digest, 'width': image.width, 'height': image.height, 'variants': variants}
+
+
+def _cache_value(record):
+    return {'status': record.status, 'variants': record.variants}
+
+
+def _cache_record(record):
+    cache.set(_cache_key(record.source), _cache_value(record), getattr(settings, 'IMAGE_DERIVATIVE_CACHE_TIMEOUT', 86400))
+
+
+def store_variants(name, fields):
+    """Сохраняет результат generate_variants в ImageDerivative и кэш."""
+    from .models import ImageDerivative
+
+    defaults = dict(fields, status=ImageDerivative.Status.READY, error='')
+    record, _ = ImageDerivative.objects.update_or_create(source=name, defaults=defaults)
+    _cache_record(record)
+    return record
+
+
+def mark_failed(name, error):
+    from .models import ImageDerivative
+
+    record, _ = ImageDerivative.objects.update_or_create(
+        source=name, defaults={'status': ImageDerivative.Status.FAILED, 'error': str(error)[:1000]}
+    )
+    _cache_record(record)
+    return record
+
+
+def process_image(name, storage=None, force=False):
+    """Строит производные для файла name; ImageDerivative или None."""
+    fields = generate_variants(name, storage=storage, force=force)
+    if fields is None:
+        if is_raster(name):
+            mark_failed(name, 'Файл недоступен или не является изображением')
+        return None
+    return store_variants(name, fields)
+
+
+# Пул потоков процесса для обработки загрузок и число занятых в нем мест
+_executor = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+def _get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'IMAGE_PROCESSING_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='images')
+            _slots = threading.BoundedSemaphore(workers + getattr(settings, 'IMAGE_PROCESSING_QUEUE', 32))
+        return _executor
+
+
+def _process_in_thread(name):
+    try:
+        process_image(name)
+    except Exception:
+        logger.exception(f'Ошибка обработки изображения {name}')
+    finally:
+        _slots.release()
+        # У каждого потока свое соединение с БД
+        connection.close()
+
+
+def submit(name):
+    """Отправляет файл на обработку выбранным бэкендом."""
+    backend = getattr(settings, 'IMAGE_PROCESSING_BACKEND', 'thread')
+    if backend == 'sync':
+        process_image(name)
+    elif backend == 'celery':
+        try:
+            from .tasks import process_image_task
+        except ImportError:
+            # celery не установлен (проверка core.E001): запись остается pending,
+            # ее достроит process_images
+            logger.error(f"IMAGE_PROCESSING_BACKEND = 'celery', но celery не установлен; {name} отложен")
+            return
+        process_image_task.delay(name)
+    else:
+        executor = _get_executor()
+        if not _slots.acquire(blocking=False):
+            # Очередь заполнена: запись остается pending, ее достроит process_images
+            logger.warning(f'Очередь обработки изображений заполнена, {name} отложен')
+            return
+        executor.submit(_process_in_thread, name)
+
+
+def schedule(name):
+    """
+    Ставит файл в очередь на обработку, если для него еще нет производных.
+
+    Запись pending создается сразу, сама обработка запускается после коммита
+    транзакции, в которой сохранен файл.
+    """
+    from .models import ImageDerivative
+
+    if not is_raster(name):
+        return None
+    record, created = ImageDerivative.objects.get_or_create(source=name)
+    if not created:
+        return None
+    _cache_record(record)
+    transaction.on_commit(lambda: submit(name))
+    return record
+
+
+def get_derivative(name):
+    """{'status': ..., 'variants': {размер: путь}} файла или None, если записи нет."""
+    from .models import ImageDerivative
+
+    key = _cache_key(name)
+    value = cache.get(key)
+    if value is None:
+        record = ImageDerivative.objects.filter(source=name).first()
+        # Отсутствие записи тоже кэшируется, чтобы не спрашивать БД на каждой строке
+        value = _cache_value(record) if record else {}
+        cache.set(key, value, getattr(settings, 'IMAGE_DERIVATIVE_CACHE_TIMEOUT', 86400))
+    return value or None
+
+
+def get_variants(name):
+    """{размер: путь} готовых производных файла; пустой словарь, если их нет."""
+    derivative = get_derivative(name)
+    return derivative['variants'] if derivative else {}
+
+
+def placeholder_url():
+    return static(getattr(settings, 'IMAGE_PLACEHOLDER', 'images/player-silhouette.png'))
+
+
+def derivative_url(file, size='thumb', request=None):
+    """
+    URL производного изображения. Пока файл обрабатывается - заглушка,
+    если производных нет (не изображение, ошибка) - URL оригинала.
+    """
+    if not file:
+        return None
+    from .models import ImageDerivative
+
+    derivative = get_derivative(file.name) or {}
+    path = derivative.get('variants', {}).get(size)
+    builder = url_builder(request)
+    if path:
+        return builder.stored(default_storage, path)
+    if derivative.get('status') == ImageDerivative.Status.PENDING:
+        return builder.absolute(placeholder_url())
+    return builder.file(file)
+
+
+def image_field_names(instance):
+    """Имена файлов изображений объекта из IMAGE_FIELDS."""
+    names = []
+    for field in IMAGE_FIELDS.get(instance._meta.label, ()):
+        file = getattr(instance, field, None)
+        if file and file.name:
+            names.append(file.name)
+    return names
+
+
+class DerivativeURLField(serializers.ReadOnlyField):
+    """
+    Поле сериализатора с URL уменьшенной копии изображения:
+    logo_thumb_url = DerivativeURLField('logo'), photo_card_url = DerivativeURLField('photo', 'card').
+    """
+
+    def __init__(self, image_field, size='thumb', **kwargs):
+        kwargs['source'] = image_field
+        super().__init__(**kwargs)
+        self.size = size
+
+    def to_representation(self, value):
+        return derivative_url(value, self.size, self.context.get('request'))
+
+
+class DerivativeStatusField(serializers.ReadOnlyField):
+    """Статус обработки изображения: pending, ready, failed или None (нет файла или не изображение)."""
+
+    def __init__(self, image_field, **kwargs):
+        kwargs['source'] = image_field
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value or not is_raster(value.name):
+            return None
+        derivative = get_derivative(value.name)
+        return derivative['status'] if derivative else None
@@ -1,13 +1,18 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from django.db import connection
 import os
+import sqlite3
 import shutil
 import zipfile
 import subprocess
 from datetime import datetime
 from pathlib import Path
 
+from core.backups import (
+    compress_type, discard_on_error, latest_manifest, prune_backups, restore_media, write_media_snapshot, write_sqlite_backup,
+)
+
 
 class Command(BaseCommand):
     help = 'Создает бэкап базы данных и медиа файлов'
@@ -24,20 +29,31 @@ class Command(BaseCommand):
             default=30,
             help='Количество бэкапов для хранения (по умолчанию 30)',
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            default=None,
+            help='Сохранять только новые и измененные медиафайлы (по умолчанию BACKUP_INCREMENTAL)',
+        )
 
     def handle(self, *args, **options):
         if options['restore']:
             self.restore_backup(Path(options['restore']))
         else:
-            self.create_backup(options['keep'])
+            incremental = options['incremental']
+            if incremental is None:
+                incremental = getattr(settings, 'BACKUP_INCREMENTAL', False)
+            self.create_backup(options['keep'], incremental=incremental)
 
-    def create_backup(self, keep_count=30):
+    def create_backup(self, keep_count=30, incremental=False):
         """Создает бэкап базы данных и медиа файлов."""
         BASE_DIR = Path(settings.BASE_DIR)
         
         # Создаем папку для бэкапов если её нет
         backups_dir = BASE_DIR / 'backups'
         backups_dir.mkdir(exist_ok=True)
+        # Манифест прошлого инкрементального бэкапа: с ним сравниваются медиафайлы
+        previous_manifest = latest_manifest(backups_dir) if incremental else None
         
         # Имя файла бэкапа с датой и временем
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -51,8 +67,9 @@ class Command(BaseCommand):
         is_postgresql = 'postgresql' in db_engine or 'psycopg' in db_engine
         is_sqlite = 'sqlite' in db_engine
         
-        # Создаем ZIP архив
-        with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        # Создаем ZIP архив; при ошибке недописанный архив удаляется, чтобы
+        # ротация не считала его бэкапом
+        with discard_on_error(backup_path), zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             # Бэкап базы данных
             if is_postgresql:
                 # PostgreSQL бэкап через pg_dump
@@ -114,9 +131,20 @@ class Command(BaseCommand):
                 # SQLite бэкап
                 db_path = BASE_DIR / settings.DATABASES['default']['NAME']
                 if db_path.exists():
-                    zipf.write(db_path, 'db.sqlite3')
-                    db_size = db_path.stat().st_size / 1024 / 1024
-                    self.stdout.write(self.style.SUCCESS(f'  ✓ База данных SQLite добавлена ({db_size:.2f} MB)'))
+                    # Копия через backup API: согласованная, без остановки записи в БД
+                    try:
+                        page_count, db_size, elapsed = write_sqlite_backup(
+                            zipf, db_path, 'db.sqlite3',
+                            pages=getattr(settings, 'BACKUP_SQLITE_PAGES', 1024),
+                            sleep=getattr(settings, 'BACKUP_SQLITE_SLEEP', 0.005),
+                            progress=self.sqlite_progress(),
+                        )
+                        self.stdout.write(self.style.SUCCESS(
+                            f'  ✓ База данных SQLite добавлена ({db_size / 1024 / 1024:.2f} MB, '
+                            f'{page_count} страниц за {elapsed:.2f} с, integrity_check: ok)'
+                        ))
+                    except sqlite3.Error as e:
+                        raise CommandError(f'Ошибка копирования SQLite, бэкап не создан: {e}') from e
                 else:
                     self.stdout.write(self.style.WARNING('  ⚠ База данных SQLite не найдена'))
             else:
@@ -124,14 +152,28 @@ class Command(BaseCommand):
             
             # Бэкап медиа файлов
             media_dir = BASE_DIR / 'media'
-            if media_dir.exists():
+            blobs_dir = getattr(settings, 'MEDIA_BLOBS_DIR', 'blobs')
+            if media_dir.exists() and incremental:
+                _, stats = write_media_snapshot(
+                    zipf, backup_filename, media_dir, BASE_DIR,
+                    previous=previous_manifest, exclude_dirs=(blobs_dir,),
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f"  ✓ Медиа файлы: {stats['files']} всего, новых/измененных {stats['stored']} "
+                    f"({stats['stored_bytes'] / 1024 / 1024:.2f} MB), из прошлых бэкапов {stats['reused']}"
+                ))
+            elif media_dir.exists():
                 media_count = 0
                 total_size = 0
                 for root, dirs, files in os.walk(media_dir):
+                    if Path(root) == media_dir:
+                        # Файлы содержимого (core.storage) уже попадают в архив под путями-ссылками
+                        dirs[:] = [name for name in dirs if name != blobs_dir]
                     for file in files:
                         file_path = Path(root) / file
                         arcname = file_path.relative_to(BASE_DIR)
-                        zipf.write(file_path, arcname)
+                        # Изображения и видео уже сжаты - кладем как есть
+                        zipf.write(file_path, arcname, compress_type=compress_type(file_path))
                         media_count += 1
                         total_size += file_path.stat().st_size
                 media_size_mb = total_size / 1024 / 1024
@@ -148,17 +190,25 @@ class Command(BaseCommand):
         
         return backup_path
 
-    def cleanup_old_backups(self, backups_dir, keep_count=30):
-        """Удаляет старые бэкапы, оставляя только последние N."""
-        backups = sorted(backups_dir.glob('backup_*.zip'), key=os.path.getmtime, reverse=True)
+    def sqlite_progress(self):
+        """Колбэк sqlite_snapshot: печатает прогресс каждые 10%."""
+        reported = [-1]
         
-        if len(backups) > keep_count:
-            deleted_count = 0
-            for backup in backups[keep_count:]:
-                backup.unlink()
-                deleted_count += 1
-            if deleted_count > 0:
-                self.stdout.write(self.style.SUCCESS(f'\n✓ Удалено старых бэкапов: {deleted_count}'))
+        def progress(copied, total):
+            percent = copied * 100 // total if total else 100
+            if percent // 10 > reported[0]:
+                reported[0] = percent // 10
+                self.stdout.write(f'    SQLite: {copied}/{total} страниц ({percent}%)')
+        return progress
+
+    def cleanup_old_backups(self, backups_dir, keep_count=30):
+        """
+        Удаляет старые бэкапы, оставляя только последние N и архивы, в которых
+        лежат медиафайлы, нужные инкрементальным бэкапам из этих N.
+        """
+        deleted_count = prune_backups(backups_dir, keep_count)
+        if deleted_count > 0:
+            self.stdout.write(self.style.SUCCESS(f'\n✓ Удалено старых бэкапов: {deleted_count}'))
 
     def restore_backup(self, backup_path):
         """Восстанавливает данные из бэкапа."""
@@ -181,7 +231,16 @@ class Command(BaseCommand):
         
         try:
             with zipfile.ZipFile(backup_path, 'r') as zipf:
-                zipf.extractall(temp_dir)
+                # Содержимое медиафайлов инкрементального бэкапа (objects/) собирается ниже по манифесту
+                members = [name for name in zipf.namelist() if not name.startswith('objects/')]
+                zipf.extractall(temp_dir, members)
+            try:
+                restored = restore_media(backup_path, temp_dir)
+            except FileNotFoundError as e:
+                self.stdout.write(self.style.ERROR(f'  ✗ {e}'))
+                return False
+            if restored is not None:
+                self.stdout.write(self.style.SUCCESS(f'  ✓ Медиа файлы собраны из бэкапов ({restored} файлов)'))
             
             # Восстанавливаем БД
             if is_postgresql:
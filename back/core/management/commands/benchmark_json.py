@@ -0,0 +1,80 @@
+"""
+Management command для сравнения рендеринга и сжатия ответов API.
+
+Пример:
+    python manage.py benchmark_json --path /api/players/ --path /api/matches/ -n 50
+"""
+import gzip
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.urls import resolve
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.middleware import brotli
+from core.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает размер и CPU-время JSON рендереров и сжатия для endpoint\'ов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Путь endpoint\'а (можно указать несколько раз)')
+        parser.add_argument('-n', '--iterations', type=int, default=20,
+                            help='Количество повторов для каждого замера')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/players/', '/api/matches/', '/api/clubs/']
+        iterations = options['iterations']
+
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson не установлен: FastJSONRenderer работает как стандартный'))
+        if brotli is None:
+            self.stdout.write(self.style.WARNING('brotli не установлен: сравнение только с gzip'))
+
+        for path in paths:
+            data = self.fetch_data(path)
+            if data is None:
+                continue
+            self.stdout.write(self.style.SUCCESS(f'\n{path}'))
+
+            stdlib_body, stdlib_time = self.measure(lambda: JSONRenderer().render(data), iterations)
+            fast_body, fast_time = self.measure(lambda: FastJSONRenderer().render(data), iterations)
+            self.report('JSONRenderer', len(stdlib_body), stdlib_time)
+            self.report('FastJSONRenderer', len(fast_body), fast_time)
+
+            gzip_body, gzip_time = self.measure(lambda: gzip.compress(fast_body, 6), iterations)
+            self.report('gzip', len(gzip_body), gzip_time, len(fast_body))
+            if brotli is not None:
+                br_body, br_time = self.measure(lambda: brotli.compress(fast_body, quality=5), iterations)
+                self.report('brotli', len(br_body), br_time, len(fast_body))
+
+    def fetch_data(self, path):
+        """Вызывает view напрямую и возвращает response.data (без HTTP и middleware)."""
+        hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')]
+        request = APIRequestFactory().get(path, HTTP_HOST=hosts[0] if hosts else 'localhost')
+        try:
+            match = resolve(path.split('?')[0])
+        except Exception:
+            self.stdout.write(self.style.ERROR(f'{path}: endpoint не найден'))
+            return None
+        response = match.func(request, *match.args, **match.kwargs)
+        if response.status_code != 200:
+            self.stdout.write(self.style.ERROR(f'{path}: статус {response.status_code}'))
+            return None
+        return response.data
+
+    def measure(self, func, iterations):
+        """Возвращает (результат, среднее CPU-время в мс)."""
+        result = func()
+        start = time.process_time()
+        for _ in range(iterations):
+            func()
+        return result, (time.process_time() - start) * 1000 / iterations
+
+    def report(self, name, size, cpu_ms, original_size=None):
+        ratio = f' ({size * 100 / original_size:.1f}%)' if original_size else ''
+        self.stdout.write(f'  {name:<18} {size:>10} байт{ratio:<10} {cpu_ms:8.3f} мс')
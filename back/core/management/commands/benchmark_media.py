@@ -0,0 +1,77 @@
+"""
+Management command для сравнения отдачи файлов django.views.static.serve и core.media.
+
+Создает временный файл (или берет --path из MEDIA_ROOT) и замеряет скорость
+полной отдачи и запросов Range по 1 МБ, как при перемотке видео.
+
+Пример:
+    python manage.py benchmark_media --size 50 -n 20
+    python manage.py benchmark_media --path media/videos/final.mp4
+"""
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.views.static import serve
+
+from core.media import serve_file
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость отдачи медиафайлов django.views.static.serve и core.media'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Файл для замера (по умолчанию временный файл --size МБ)')
+        parser.add_argument('--size', type=int, default=20, help='Размер временного файла в МБ')
+        parser.add_argument('-n', '--iterations', type=int, default=10, help='Количество запросов для каждого замера')
+
+    def handle(self, *args, **options):
+        if options['path']:
+            self.run(os.path.abspath(options['path']), options['iterations'])
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'video.mp4')
+            with open(path, 'wb') as file:
+                for _ in range(options['size']):
+                    file.write(os.urandom(MB))
+            self.run(path, options['iterations'])
+
+    def run(self, path, iterations):
+        root, name = os.path.split(path)
+        size = os.path.getsize(path)
+        factory = RequestFactory()
+        self.stdout.write(self.style.SUCCESS(f'{name}: {size / MB:.1f} МБ, {iterations} запросов'))
+
+        views = {
+            'static.serve': lambda request: serve(request, name, root),
+            'core.media': lambda request: serve_file(request, name, root, '/media/'),
+        }
+        # Range по 1 МБ из середины файла: static.serve все равно отдает файл целиком
+        offset = max(size // 2 - MB, 0)
+        requests = {
+            'целиком': {},
+            'Range 1 МБ': {'HTTP_RANGE': f'bytes={offset}-{offset + MB - 1}'},
+        }
+        for request_label, headers in requests.items():
+            for view_label, view in views.items():
+                result = self.measure(lambda: view(factory.get('/media/' + name, **headers)), iterations)
+                self.report(f'{view_label}, {request_label}', result)
+
+    def measure(self, get_response, iterations):
+        """(отдано байт за запрос, среднее время запроса в мс)."""
+        sent = 0
+        start = time.perf_counter()
+        for _ in range(iterations):
+            response = get_response()
+            sent = sum(len(chunk) for chunk in response)
+            response.close()
+        return sent, (time.perf_counter() - start) * 1000 / iterations
+
+    def report(self, label, result):
+        sent, elapsed_ms = result
+        speed = sent / MB / (elapsed_ms / 1000) if elapsed_ms else 0
+        self.stdout.write(f'  {label:<26} {sent / MB:8.2f} МБ {elapsed_ms:9.2f} мс {speed:9.1f} МБ/с')
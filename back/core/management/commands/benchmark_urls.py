@@ -0,0 +1,71 @@
+"""
+Management command для сравнения построения абсолютных URL в сериализаторах.
+
+Сериализует список клубов (строки без запросов к БД) с URL логотипа через
+request.build_absolute_uri(file.url) на каждой строке и через core.absolute_urls.
+
+Пример:
+    python manage.py benchmark_urls --rows 1000 -n 20
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+
+from clubs.models import Club
+from core.absolute_urls import file_url
+
+
+class PerRowURLSerializer(serializers.ModelSerializer):
+    """Прежний способ: разбор Host и storage.url() на каждой строке."""
+
+    logo_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Club
+        fields = ['id', 'name', 'logo_url']
+
+    def get_logo_url(self, obj):
+        if obj.logo:
+            request = self.context.get('request')
+            return request.build_absolute_uri(obj.logo.url) if request else obj.logo.url
+        return None
+
+
+class BuilderURLSerializer(PerRowURLSerializer):
+    def get_logo_url(self, obj):
+        return file_url(obj.logo, self.context.get('request'))
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время построения абсолютных URL файлов в сериализаторах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Строк в списке')
+        parser.add_argument('--logos', type=int, default=20, help='Разных логотипов в списке')
+        parser.add_argument('-n', '--iterations', type=int, default=20, help='Количество повторов')
+
+    def handle(self, *args, **options):
+        rows, iterations = options['rows'], options['iterations']
+        clubs = [
+            Club(id=index + 1, name=f'Клуб {index}', logo=f'clubs/logos/logo_{index % options["logos"]}.png')
+            for index in range(rows)
+        ]
+        hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')]
+        factory = APIRequestFactory()
+        self.stdout.write(self.style.SUCCESS(f'{rows} строк, {options["logos"]} разных логотипов'))
+
+        for label, serializer_class in (
+            ('build_absolute_uri', PerRowURLSerializer),
+            ('core.absolute_urls', BuilderURLSerializer),
+        ):
+            elapsed = 0.0
+            for _ in range(iterations):
+                # Новый запрос на каждый повтор: кэш URL живет один запрос
+                request = factory.get('/api/clubs/', HTTP_HOST=hosts[0] if hosts else 'localhost')
+                start = time.perf_counter()
+                serializer_class(clubs, many=True, context={'request': request}).data
+                elapsed += time.perf_counter() - start
+            self.stdout.write(f'  {label:<20} {elapsed * 1000 / iterations:9.2f} мс')
@@ -0,0 +1,110 @@
+"""
+Management command для очистки хранилища медиафайлов с адресацией по содержимому (core.storage).
+
+1. Удаляет псевдонимы, на которые не ссылается ни одно FileField и ни одна
+   производная изображения (старше MEDIA_GC_GRACE_HOURS, чтобы не задеть
+   загрузки, транзакция которых еще не завершилась).
+2. Пересчитывает счетчики ссылок по таблице псевдонимов.
+3. Удаляет файлы содержимого без ссылок.
+
+С --adopt сначала переносит в хранилище файлы, загруженные до его включения
+(одинаковые файлы становятся ссылками на один).
+
+Пример:
+    python manage.py gc_media --dry-run
+    python manage.py gc_media --adopt
+"""
+import os
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import ImageDerivative, MediaAlias, MediaBlob
+from core.storage import ContentAddressedStorage, blobs_dir
+
+
+def referenced_names():
+    """Пути файлов, на которые ссылаются объекты в БД."""
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                names.update(model._default_manager.exclude(**{field.name: ''}).exclude(
+                    **{f'{field.name}__isnull': True}
+                ).values_list(field.name, flat=True))
+    for variants in ImageDerivative.objects.values_list('variants', flat=True):
+        names.update((variants or {}).values())
+    return names
+
+
+class Command(BaseCommand):
+    help = 'Удаляет неиспользуемые медиафайлы из хранилища с адресацией по содержимому'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет удалено')
+        parser.add_argument('--adopt', action='store_true', help='Перенести в хранилище файлы, загруженные раньше')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('Хранилище по умолчанию не ContentAddressedStorage (MEDIA_CONTENT_ADDRESSED)')
+        dry_run = options['dry_run']
+        if options['adopt']:
+            self.adopt(dry_run)
+
+        referenced = referenced_names()
+        grace = timezone.now() - timedelta(hours=getattr(settings, 'MEDIA_GC_GRACE_HOURS', 24))
+        stale = [
+            name for name in MediaAlias.objects.filter(created_at__lt=grace).values_list('name', flat=True)
+            if name not in referenced
+        ]
+        for name in stale:
+            self.stdout.write(f'Псевдоним без ссылок: {name}')
+            if not dry_run:
+                default_storage.delete(name)
+
+        if not dry_run:
+            # Счетчики могли разойтись с псевдонимами (удаление вне хранилища, сбой)
+            for blob_id, count in MediaBlob.objects.annotate(count=Count('aliases')).values_list('id', 'count'):
+                MediaBlob.objects.filter(pk=blob_id).exclude(references=count).update(references=count)
+
+        remaining = MediaAlias.objects.exclude(name__in=stale).values('blob_id')
+        unused = MediaBlob.objects.exclude(pk__in=remaining)
+        freed = 0
+        deleted = 0
+        for blob in unused:
+            freed += blob.size
+            deleted += 1
+            if not dry_run:
+                if default_storage.exists(blob.name):
+                    os.remove(default_storage.path(blob.name))
+                blob.delete()
+
+        action = 'Будет удалено' if dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action}: псевдонимов {len(stale)}, файлов содержимого {deleted} ({freed / 1024 / 1024:.2f} MB)'
+        ))
+
+    def adopt(self, dry_run):
+        media_root = os.path.abspath(default_storage.location)
+        known = set(MediaAlias.objects.values_list('name', flat=True))
+        adopted = 0
+        for root, dirs, files in os.walk(media_root):
+            relative_root = os.path.relpath(root, media_root)
+            if relative_root == blobs_dir() or relative_root.startswith(blobs_dir() + os.sep):
+                dirs[:] = []
+                continue
+            for file in files:
+                path = os.path.join(root, file)
+                name = os.path.relpath(path, media_root).replace(os.sep, '/')
+                if name in known or os.path.islink(path):
+                    continue
+                adopted += 1
+                if not dry_run:
+                    default_storage.adopt(name)
+        self.stdout.write(f'Перенесено в хранилище файлов: {adopted}')
@@ -0,0 +1,63 @@
+"""
+Management command для построения уменьшенных копий изображений (core.images).
+
+Обрабатывает логотипы клубов, фото игроков, судей, руководителей, аватары
+и медиафайлы, у которых еще нет готовых производных (в том числе отложенные
+при заполненной очереди и завершившиеся ошибкой; с --force - все), в
+несколько потоков: Pillow освобождает GIL при декодировании и сжатии.
+Потоки только пишут файлы, записи ImageDerivative сохраняет основной поток.
+
+Пример:
+    python manage.py process_images --workers 8
+    python manage.py process_images --force
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.images import IMAGE_FIELDS, generate_variants, is_raster, mark_failed, store_variants
+from core.models import ImageDerivative
+
+
+class Command(BaseCommand):
+    help = 'Строит уменьшенные копии логотипов и фотографий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Число потоков (по умолчанию 4)')
+        parser.add_argument('--force', action='store_true', help='Пересоздать производные для всех изображений')
+
+    def collect_names(self, force):
+        names = set()
+        for label, fields in IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            for field in fields:
+                values = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                names.update(name for name in values.values_list(field, flat=True) if is_raster(name))
+        if not force:
+            ready = ImageDerivative.objects.filter(source__in=names, status=ImageDerivative.Status.READY)
+            names -= set(ready.values_list('source', flat=True))
+        return sorted(names)
+
+    def handle(self, *args, **options):
+        force = options['force']
+        names = self.collect_names(force)
+        if not names:
+            self.stdout.write('Все изображения уже обработаны')
+            return
+
+        processed, failed = 0, []
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = {executor.submit(generate_variants, name, force=force): name for name in names}
+            for future in as_completed(futures):
+                fields = future.result()
+                if fields is None:
+                    failed.append(futures[future])
+                    mark_failed(futures[future], 'Файл недоступен или не является изображением')
+                    continue
+                store_variants(futures[future], fields)
+                processed += 1
+
+        for name in failed:
+            self.stdout.write(self.style.WARNING(f'Не удалось обработать {name}'))
+        self.stdout.write(self.style.SUCCESS(f'Обработано изображений: {processed}, ошибок: {len(failed)}'))
@@ -0,0 +1,20 @@
+"""
+Management command для полной перестройки поискового индекса (core.search).
+
+Нужна после массового импорта через update()/bulk_create, которые не вызывают сигналы.
+
+Пример:
+    python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import SearchEntry
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс игроков, клубов, судей и руководителей'
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Записей в индексе: {SearchEntry.objects.count()}'))
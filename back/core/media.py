@@ -0,0 +1,218 @@
+"""
+Отдача медиа- и статических файлов приложением (SERVE_MEDIA).
+
+В отличие от django.views.static.serve:
+- поддерживаются запросы Range (206 Partial Content), поэтому видео из Media
+  можно перематывать, а браузер не скачивает файл целиком;
+- полный файл отдается FileResponse: WSGI-сервер передает его через
+  wsgi.file_wrapper (sendfile), без чтения в память;
+- сильный ETag и Last-Modified, 304 на If-None-Match / If-Modified-Since;
+- файлы, имя которых зависит от содержимого (производные изображений, blobs
+  core.storage, статика с хешем в имени), отдаются с
+  Cache-Control: public, max-age=31536000, immutable;
+- для статики отдается заранее сжатая копия (.br / .gz, см. core.staticfiles),
+  если клиент ее принимает;
+- при MEDIA_SERVE_OFFLOAD = 'x-accel' (nginx) или 'sendfile' (Apache,
+  lighttpd) приложение только проверяет путь и заголовки, а сам файл
+  отдает веб-сервер (он же обрабатывает Range).
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from .middleware import parse_accept_encoding
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# app.3f2a1b9c4d5e.css - имена ManifestStaticFilesStorage
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[\w.]+$')
+
+
+def is_immutable(path):
+    """Меняется ли содержимое файла без смены имени (нет - можно кэшировать навсегда)."""
+    prefixes = getattr(settings, 'MEDIA_IMMUTABLE_PREFIXES', ('derivatives/', 'blobs/'))
+    return path.startswith(tuple(prefixes)) or bool(HASHED_NAME_RE.search(path))
+
+
+def file_etag(stat_result):
+    return quote_etag(f'{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}')
+
+
+def parse_range(header, size):
+    """
+    (начало, конец включительно) из заголовка Range.
+
+    Returns:
+        None - заголовка нет или несколько диапазонов (отдается файл целиком),
+        False - диапазон не пересекается с файлом (416).
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if size == 0:
+        # В пустом файле нет ни одного байта для диапазона
+        return False
+    if not start:
+        # bytes=-500: последние 500 байт
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def set_cache_headers(response, path, etag, mtime, vary_encoding=False):
+    response['ETag'] = etag
+    if vary_encoding:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response['Last-Modified'] = http_date(mtime)
+    if is_immutable(path):
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+
+
+# Расширение сжатой копии -> Content-Encoding, в порядке предпочтения
+PRECOMPRESSED = (('br', 'br'), ('gz', 'gzip'))
+
+
+def precompressed_variant(request, full_path):
+    """(путь к сжатой копии, кодировка) или (None, None)."""
+    accepted = parse_accept_encoding(request.headers.get('Accept-Encoding', ''))
+    for extension, encoding in PRECOMPRESSED:
+        if encoding in accepted and os.path.isfile(f'{full_path}.{extension}'):
+            return f'{full_path}.{extension}', encoding
+    return None, None
+
+
+def offload_response(path, full_path, url_prefix):
+    """Пустой ответ с заголовком, по которому файл отдаст веб-сервер."""
+    mode = getattr(settings, 'MEDIA_SERVE_OFFLOAD', '')
+    if mode == 'x-accel':
+        # location /protected/media/ { internal; alias /app/media/; }
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected')
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = f"{prefix.rstrip('/')}{url_prefix}{path}"
+        return response
+    if mode == 'sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+        return response
+    return None
+
+
+def serve_file(request, path, document_root, url_prefix, precompressed=False):
+    """
+    Отдает файл path из document_root с учетом Range, ETag и кэширования.
+
+    precompressed - искать рядом с файлом сжатые копии path.br / path.gz.
+    """
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    try:
+        stat_result = os.stat(full_path)
+    except OSError:
+        raise Http404('Файл не найден')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('Файл не найден')
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if precompressed and not encoding:
+        compressed_path, encoding = precompressed_variant(request, full_path)
+        if compressed_path:
+            path += os.path.splitext(compressed_path)[1]
+            full_path = compressed_path
+            stat_result = os.stat(full_path)
+
+    etag = file_etag(stat_result)
+    mtime = stat_result.st_mtime
+    if not_modified(request, etag, mtime):
+        response = HttpResponseNotModified()
+        set_cache_headers(response, path, etag, mtime, precompressed)
+        return response
+
+    response = offload_response(path, full_path, url_prefix)
+    if response is not None:
+        response['Content-Type'] = content_type
+        if encoding:
+            response['Content-Encoding'] = encoding
+        set_cache_headers(response, path, etag, mtime, precompressed)
+        return response
+
+    size = stat_result.st_size
+    # If-Range: диапазон действует, только если файл не изменился
+    if_range = request.headers.get('If-Range')
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if if_range and if_range.strip() != etag and parse_http_date_safe(if_range) != int(mtime):
+        byte_range = None
+    if encoding:
+        # Диапазоны сжатого представления браузерам не нужны
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is not None:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(full_path, start, end - start + 1), status=206,
+                                         content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(size)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'none' if encoding else 'bytes'
+    set_cache_headers(response, path, etag, mtime, precompressed)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    return serve_file(request, path, settings.MEDIA_ROOT, settings.MEDIA_URL)
+
+
+@require_safe
+def serve_static(request, path):
+    return serve_file(request, path, settings.STATIC_ROOT, settings.STATIC_URL, precompressed=True)
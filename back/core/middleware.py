@@ -0,0 +1,92 @@
+"""
+Сжатие ответов API (brotli / gzip) с учетом Accept-Encoding.
+"""
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli опционален
+    brotli = None
+
+_accept_encoding_re = re.compile(r'([a-z*]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+# Сжимаем только данные API и статику: HTML с CSRF-токеном не трогаем (BREACH),
+# изображения и архивы уже сжаты
+COMPRESSIBLE_TYPES = ('application/json', 'text/css', 'text/javascript', 'application/javascript', 'text/csv')
+
+
+def parse_accept_encoding(header):
+    """Кодировки из Accept-Encoding, которые клиент принимает (q > 0)."""
+    accepted = set()
+    for name, quality in _accept_encoding_re.findall(header.lower()):
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name)
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """Выбирает лучшую доступную кодировку: br, затем gzip."""
+    accepted = parse_accept_encoding(accept_encoding)
+    if brotli is not None and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5))
+    return compress_string(content)
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы больше COMPRESSION_MIN_SIZE байт.
+
+    Аналог django.middleware.gzip.GZipMiddleware с поддержкой brotli
+    и порогом размера. Должен стоять в MIDDLEWARE раньше всех, кто читает
+    или меняет тело ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # Сжатое тело отличается побайтно - ETag становится слабым (как в GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
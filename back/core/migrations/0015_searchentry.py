@@ -0,0 +1,139 @@
+# Generated by Django 5.0.7 on 2026-10-19 12:23
+
+import logging
+import re
+
+from django.db import OperationalError, migrations, models
+
+logger = logging.getLogger(__name__)
+
+# Код миграции не импортирует core.search: его последующие правки не должны
+# менять уже примененную миграцию
+FTS_TABLE = 'core_search_fts'
+TRIGRAM_INDEX = 'core_searchentry_text_trgm'
+
+SEARCH_MODELS = {
+    'player': ('players', 'Player'),
+    'club': ('clubs', 'Club'),
+    'referee': ('referees', 'Referee'),
+    'manager': ('management', 'Manager'),
+}
+
+TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'iu',
+    'я': 'ia', 'ң': 'n', 'ө': 'o', 'ү': 'u',
+}
+LATIN_SKELETON = (
+    ('kh', 'h'), ('ph', 'f'), ('w', 'v'), ('q', 'k'), ('x', 'ks'),
+    ('y', 'i'), ('j', 'i'), ('c', 'k'),
+)
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    text = ''.join(TRANSLIT.get(char, char) for char in (text or '').lower())
+    for source, target in LATIN_SKELETON:
+        text = text.replace(source, target)
+    return NON_WORD_RE.sub(' ', text).strip()
+
+
+def build_document(kind, obj):
+    """(заголовок, подзаголовок, поля для поиска) объекта."""
+    full_name = f'{obj.first_name} {obj.last_name}'.strip() if kind != 'club' else ''
+    if kind == 'player':
+        club = obj.club.name if obj.club_id else ''
+        return full_name, club, [obj.first_name, obj.last_name, club]
+    if kind == 'club':
+        return obj.name, obj.city, [obj.name, obj.short_name, obj.city]
+    if kind == 'referee':
+        return full_name, obj.nationality, [obj.first_name, obj.last_name, obj.nationality]
+    position = obj.get_position_display() if obj.position else ''
+    return full_name, position, [obj.first_name, obj.last_name, obj.position, position]
+
+
+def create_search_index(apps, schema_editor):
+    """GIN-индекс pg_trgm на PostgreSQL, FTS5-таблица на SQLite."""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON core_searchentry USING gin (text gin_trgm_ops)'
+        )
+    elif connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(text, kind UNINDEXED, tokenize='unicode61', prefix='2 3')"
+            )
+        except OperationalError as e:
+            # sqlite3.OperationalError в обертке Django: SQLite собран без FTS5 -
+            # поиск работает по таблице записей
+            logger.warning(f'FTS5-таблица поиска не создана: {e}')
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def populate_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    entry_model = apps.get_model('core', 'SearchEntry')
+    uses_fts = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    for kind, label in SEARCH_MODELS.items():
+        queryset = apps.get_model(*label).objects.all()
+        if kind == 'player':
+            queryset = queryset.select_related('club')
+        entries = []
+        for obj in queryset.iterator(chunk_size=500):
+            title, subtitle, fields = build_document(kind, obj)
+            entries.append(entry_model(
+                kind=kind, object_id=obj.pk, title=title[:255], subtitle=(subtitle or '')[:255],
+                text=normalize(' '.join(field for field in fields if field)),
+            ))
+        entry_model.objects.bulk_create(entries, batch_size=500)
+        if uses_fts and entries:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, text, kind) '
+                    f'SELECT id, text, kind FROM core_searchentry WHERE kind = %s',
+                    [kind],
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_season_format_group'),
+        ('clubs', '0016_alter_club_assistant_full_name_and_more'),
+        ('management', '0006_remove_manager_bio'),
+        ('players', '0012_alter_player_photo'),
+        ('referees', '0006_alter_referee_photo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20, verbose_name='Тип объекта')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('title', models.CharField(max_length=255, verbose_name='Заголовок')),
+                ('subtitle', models.CharField(blank=True, max_length=255, verbose_name='Подзаголовок')),
+                ('text', models.TextField(verbose_name='Текст для поиска')),
+            ],
+            options={
+                'verbose_name': 'Запись поиска',
+                'verbose_name_plural': 'Записи поиска',
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
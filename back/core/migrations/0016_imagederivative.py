@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_searchentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='Исходный файл')),
+                ('content_hash', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256 содержимого')),
+                ('width', models.PositiveIntegerField(blank=True, null=True, verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(blank=True, null=True, verbose_name='Высота')),
+                ('variants', models.JSONField(blank=True, default=dict, verbose_name='Производные файлы')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Производное изображение',
+                'verbose_name_plural': 'Производные изображения',
+            },
+        ),
+    ]
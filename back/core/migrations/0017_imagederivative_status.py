@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    """Записи, созданные до появления статуса, уже обработаны."""
+    ImageDerivative = apps.get_model('core', 'ImageDerivative')
+    ImageDerivative.objects.all().update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_imagederivative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagederivative',
+            name='error',
+            field=models.TextField(blank=True, verbose_name='Ошибка обработки'),
+        ),
+        migrations.AddField(
+            model_name='imagederivative',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=10, verbose_name='Статус обработки'),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='imagederivative',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='SHA-256 содержимого'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-19 12:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_imagederivative_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, verbose_name='Путь')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Размер (байт)')),
+                ('references', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Число ссылок')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Файл содержимого',
+                'verbose_name_plural': 'Файлы содержимого',
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Путь')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='core.mediablob', verbose_name='Файл содержимого')),
+            ],
+            options={
+                'verbose_name': 'Псевдоним файла',
+                'verbose_name_plural': 'Псевдонимы файлов',
+            },
+        ),
+    ]
@@ -337,4 +337,182 @@ class Media(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class SearchEntry(models.Model):
+    """
+    Запись поискового индекса (core.search): нормализованный текст объекта
+    для поиска по игрокам, клубам, судьям и руководителям.
+    """
+    
+    kind = models.CharField(
+        max_length=20,
+        verbose_name=_('Тип объекта')
+    )
+    
+    object_id = models.PositiveIntegerField(
+        verbose_name=_('ID объекта')
+    )
+    
+    title = models.CharField(
+        max_length=255,
+        verbose_name=_('Заголовок')
+    )
+    
+    subtitle = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('Подзаголовок')
+    )
+    
+    text = models.TextField(
+        verbose_name=_('Текст для поиска')
+    )
+    
+    class Meta:
+        verbose_name = _('Запись поиска')
+        verbose_name_plural = _('Записи поиска')
+        unique_together = ['kind', 'object_id']
+    
+    def __str__(self):
+        return f"{self.kind}: {self.title}"
+
+
+class ImageDerivative(models.Model):
+    """Уменьшенные копии загруженного изображения (core.images)."""
+    
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Обрабатывается')
+        READY = 'ready', _('Готово')
+        FAILED = 'failed', _('Ошибка')
+    
+    source = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name=_('Исходный файл')
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+        verbose_name=_('Статус обработки')
+    )
+    
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name=_('SHA-256 содержимого')
+    )
+    
+    width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Ширина')
+    )
+    
+    height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Высота')
+    )
+    
+    # {'thumb': 'derivatives/ab/ab12..._thumb.webp', ...}
+    variants = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_('Производные файлы')
+    )
+    
+    error = models.TextField(
+        blank=True,
+        verbose_name=_('Ошибка обработки')
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Дата создания')
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('Дата обновления')
+    )
+    
+    class Meta:
+        verbose_name = _('Производное изображение')
+        verbose_name_plural = _('Производные изображения')
+    
+    def __str__(self):
+        return self.source
+
+
+class MediaBlob(models.Model):
+    """Файл содержимого в хранилище с адресацией по SHA-256 (core.storage)."""
+    
+    digest = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name=_('SHA-256')
+    )
+    
+    # blobs/ab/cd/<sha256>.png относительно MEDIA_ROOT
+    name = models.CharField(
+        max_length=255,
+        verbose_name=_('Путь')
+    )
+    
+    size = models.BigIntegerField(
+        default=0,
+        verbose_name=_('Размер (байт)')
+    )
+    
+    references = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name=_('Число ссылок')
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Дата создания')
+    )
+    
+    class Meta:
+        verbose_name = _('Файл содержимого')
+        verbose_name_plural = _('Файлы содержимого')
+    
+    def __str__(self):
+        return self.name
+
+
+class MediaAlias(models.Model):
+    """Путь медиафайла (как в FileField), ссылающийся на MediaBlob."""
+    
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name=_('Путь')
+    )
+    
+    blob = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.CASCADE,
+        related_name='aliases',
+        verbose_name=_('Файл содержимого')
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Дата создания')
+    )
+    
+    class Meta:
+        verbose_name = _('Псевдоним файла')
+        verbose_name_plural = _('Псевдонимы файлов')
+    
+    def __str__(self):
+        return self.name
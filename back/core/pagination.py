@@ -0,0 +1,197 @@
+"""
+Пагинация для списков и пользовательских action'ов API.
+
+Пользовательские action'ы (by_club, search, /clubs/{id}/players/ и т.д.)
+исторически отдают простой массив, и фронтенд на это рассчитывает. Поэтому
+пагинация в них включается по запросу: если клиент передал page/page_size
+(или cursor для лент матчей), ответ будет страницей, иначе - массивом,
+ограниченным API_UNPAGINATED_LIMIT записей.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class StandardPageNumberPagination(PageNumberPagination):
+    """Постраничная пагинация с размером страницы от клиента (?page_size=), но не больше API_MAX_PAGE_SIZE."""
+
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset-пагинация по составному ключу.
+
+    В отличие от CursorPagination DRF (позиция по первому полю + OFFSET)
+    курсор хранит значения всех полей ordering, а страница выбирается
+    условием "строго после ключа" по индексу: время выборки не зависит от
+    глубины, а вставка новых записей не сдвигает уже загруженные страницы.
+    Последнее поле ordering должно быть уникальным (обычно id).
+    """
+
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def __init__(self):
+        self.page_size = api_settings.PAGE_SIZE
+        self.max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+
+    def get_page_size(self, request):
+        try:
+            value = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(value, self.max_page_size))
+
+    def _fields(self):
+        """[(имя поля, по убыванию)] из ordering."""
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for name, _ in self._fields():
+            value = getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, queryset, encoded):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            fields = self._fields()
+            if len(data['v']) != len(fields):
+                raise ValueError
+            values = [
+                queryset.model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(fields, data['v'])
+            ]
+            return values, bool(data.get('r'))
+        except (ValueError, KeyError, TypeError, DjangoValidationError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, values, reverse):
+        """Q-условие "строго после ключа" в порядке выборки."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        encoded = request.query_params.get(self.cursor_query_param)
+        values, reverse = self.decode_cursor(queryset, encoded) if encoded else (None, False)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        # Для обратного листания "еще" означает наличие предыдущей страницы
+        if reverse:
+            self.has_next = values is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+        self.page = results
+        return results
+
+    def _link(self, obj, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(obj, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class MatchCursorPagination(KeysetCursorPagination):
+    """
+    Курсорная пагинация лент матчей по ключу (date, time, id).
+
+    Использует составной индекс match_date_time_id_idx.
+    """
+
+    ordering = ('-date', '-time', '-id')
+
+
+def wants_pagination(request, paginator):
+    """Клиент явно запросил страницу (page, page_size или cursor)."""
+    params = request.query_params
+    names = [
+        getattr(paginator, 'page_query_param', None),
+        getattr(paginator, 'cursor_query_param', None),
+        getattr(paginator, 'page_size_query_param', None),
+    ]
+    return any(name and name in params for name in names)
+
+
+class ActionPaginationMixin:
+    """
+    Миксин для ViewSet: paginated_response() для пользовательских action'ов.
+
+    Пример:
+        return self.paginated_response(matches, pagination_class=MatchCursorPagination)
+    """
+
+    action_pagination_class = StandardPageNumberPagination
+
+    def paginated_response(self, queryset, serializer_class=None, pagination_class=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        context = self.get_serializer_context()
+        paginator = (pagination_class or self.action_pagination_class)()
+
+        if wants_pagination(self.request, paginator):
+            page = paginator.paginate_queryset(queryset, self.request, view=self)
+            serializer = serializer_class(page, many=True, context=context)
+            return paginator.get_paginated_response(serializer.data)
+
+        # Обратная совместимость: простой массив, но не больше лимита
+        limit = getattr(settings, 'API_UNPAGINATED_LIMIT', 1000)
+        items = list(queryset[:limit + 1])
+        truncated = len(items) > limit
+        serializer = serializer_class(items[:limit], many=True, context=context)
+        response = Response(serializer.data)
+        if truncated:
+            response['X-Result-Truncated'] = str(limit)
+        return response
@@ -1,18 +1,189 @@
 """
-Простое rate limiting для защиты от злоупотреблений.
+Rate limiting для защиты от злоупотреблений.
+
+Счетчики атомарные: скользящее окно из двух фиксированных корзин на
+cache.add/cache.incr, а при django_redis - точное окно на sorted set.
+С LocMemCache счетчики живут в памяти процесса, поэтому при нескольких
+воркерах gunicorn лимит честно работает только с Redis (CACHE_BACKEND=redis).
 """
+import logging
+import re
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
 from django.core.cache import cache
 from django.http import JsonResponse
-from django.utils import timezone
-from functools import wraps
-import time
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_client_ip(request):
+    """
+    IP клиента с учетом доверенных прокси.
+
+    RATE_LIMIT_TRUSTED_PROXIES - сколько прокси перед приложением дописывают
+    X-Forwarded-For. Клиентом считается адрес, который добавил самый внешний
+    доверенный прокси; все, что левее, клиент мог подделать.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', 'unknown')
+    trusted_hops = getattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', 0)
+    if not trusted_hops:
+        return remote_addr
+
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    addresses = [addr.strip() for addr in forwarded.split(',') if addr.strip()]
+    if not addresses:
+        return remote_addr
+    return addresses[-min(trusted_hops, len(addresses))]
+
+
+def get_request_ident(request):
+    """Идентификатор клиента: пользователь для вошедших, иначе IP."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{get_client_ip(request)}'
+
+
+def _uses_redis():
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    return backend.startswith('django_redis')
+
+
+def _hit_redis(key, max_requests, window, now):
+    """Точное скользящее окно: sorted set с временем каждого запроса."""
+    from django_redis import get_redis_connection
+
+    connection = get_redis_connection('default')
+    pipe = connection.pipeline()
+    pipe.zremrangebyscore(key, 0, now - window)
+    pipe.zadd(key, {f'{now}:{uuid.uuid4().hex}': now})
+    pipe.zcard(key)
+    pipe.zrange(key, 0, 0, withscores=True)
+    pipe.expire(key, int(window) + 1)
+    _, _, count, oldest, _ = pipe.execute()
+
+    if count <= max_requests:
+        return True, 0
+    oldest_time = oldest[0][1] if oldest else now
+    return False, max(1, int(oldest_time + window - now))
+
+
+def _hit_cache(key, max_requests, window, now):
+    """
+    Приближенное скользящее окно на двух корзинах.
+
+    Запросы прошлой корзины учитываются с весом доли окна, которая
+    еще не прошла. Все изменения счетчиков - атомарные add/incr.
+    """
+    bucket = int(now // window)
+    current_key = f'{key}:{bucket}'
+    previous_key = f'{key}:{bucket - 1}'
+
+    cache.add(current_key, 0, window * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Ключ вытеснен между add и incr
+        cache.add(current_key, 1, window * 2)
+        current = 1
+    previous = cache.get(previous_key, 0)
+
+    elapsed = (now % window) / window
+    estimated = previous * (1 - elapsed) + current
+    if estimated <= max_requests:
+        return True, 0
+    return False, max(1, int(window - now % window))
+
+
+def hit(key, max_requests, window):
+    """
+    Регистрирует запрос и проверяет лимит.
+
+    Returns:
+        (разрешен, через сколько секунд повторить)
+    """
+    now = time.time()
+    if _uses_redis():
+        try:
+            return _hit_redis(key, max_requests, window, now)
+        except Exception as exc:
+            # Redis недоступен - переходим на обычный кэш (с IGNORE_EXCEPTIONS он не упадет)
+            logger.warning(f'Rate limiting через Redis недоступен: {exc}')
+    return _hit_cache(key, max_requests, window, now)
+
+
+def parse_rate(rate):
+    """
+    Разбирает лимит вида '5/5m', '100/h', '10/30s'.
+
+    Returns:
+        (количество запросов, окно в секундах) или (None, None)
+    """
+    if rate is None:
+        return None, None
+    num, period = rate.split('/')
+    match = re.match(r'\s*(\d*)\s*([smhd])', period)
+    if not match:
+        raise ValueError(f'Некорректный лимит: {rate}')
+    multiplier, unit = match.groups()
+    return int(num), int(multiplier or 1) * PERIODS[unit]
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    DRF throttle на атомарном скользящем окне.
+
+    Лимит берется из DEFAULT_THROTTLE_RATES по scope (например '5/5m').
+    Подключение: throttle_classes = [SlidingWindowThrottle] и throttle_scope
+    во ViewSet, либо подкласс с собственным scope.
+    """
+
+    scope_attr = 'throttle_scope'
+
+    def __init__(self):
+        # scope известен только после получения view, см. allow_request
+        pass
+
+    def parse_rate(self, rate):
+        return parse_rate(rate)
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.scope}:{get_request_ident(request)}'
+
+    def allow_request(self, request, view):
+        if not getattr(self, 'scope', None):
+            self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.num_requests is None:
+            return True
+
+        allowed, self._wait = hit(self.get_cache_key(request, view), self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class LoginRateThrottle(SlidingWindowThrottle):
+    """Ограничение попыток входа."""
+
+    scope = 'login'
 
 
 def rate_limit(max_requests=60, window=60, key_func=None):
     """
     Декоратор для ограничения частоты запросов.
     Работает как с обычными view функциями, так и с методами ViewSet.
-    
+
     Args:
         max_requests: Максимальное количество запросов за окно времени
         window: Окно времени в секундах
@@ -24,50 +195,34 @@ def rate_limit(max_requests=60, window=60, key_func=None):
             # Определяем request: для ViewSet методов это второй аргумент (self, request)
             # для обычных view функций это первый аргумент (request)
             request = None
-            
-            # Пробуем найти request в аргументах
             for arg in args:
                 if hasattr(arg, 'META') and hasattr(arg, 'method'):
-                    # Это request объект
                     request = arg
                     break
-            
             if not request:
-                # Если не нашли в args, пробуем kwargs
                 request = kwargs.get('request')
-            
             if not request:
-                # Если все еще не нашли, вызываем функцию без rate limiting
+                # Если не нашли request, вызываем функцию без rate limiting
                 return view_func(*args, **kwargs)
-            
-            # Генерируем ключ для rate limiting
+
             if key_func:
                 key = key_func(request)
             else:
-                # Используем IP адрес и путь
-                ip = request.META.get('REMOTE_ADDR', 'unknown')
-                path = request.path
-                key = f'rate_limit:{ip}:{path}'
-            
-            # Получаем текущее количество запросов
-            current = cache.get(key, 0)
-            
-            if current >= max_requests:
-                # Превышен лимит
-                return JsonResponse(
+                key = f'rate_limit:{get_request_ident(request)}:{request.path}'
+
+            allowed, retry_after = hit(key, max_requests, window)
+            if not allowed:
+                response = JsonResponse(
                     {
                         'error': 'Слишком много запросов. Пожалуйста, попробуйте позже.',
-                        'retry_after': window
+                        'retry_after': retry_after
                     },
                     status=429
                 )
-            
-            # Увеличиваем счетчик
-            cache.set(key, current + 1, window)
-            
-            # Вызываем оригинальную view функцию
+                response['Retry-After'] = str(retry_after)
+                return response
+
             return view_func(*args, **kwargs)
-        
+
         return wrapper
     return decorator
-
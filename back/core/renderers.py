@@ -0,0 +1,44 @@
+"""
+Быстрый JSON рендерер для DRF.
+
+Использует orjson, если он установлен, иначе стандартный JSONRenderer DRF.
+orjson сам кодирует datetime/date/time/UUID и подклассы dict/list/str
+(ReturnDict, ErrorDetail), поэтому обычный ответ сериализатора кодируется
+без вызовов default. Для редких типов (Decimal, ленивые строки перевода)
+используется кодировщик DRF.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson опционален
+    orjson = None
+
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Типы, которые orjson не знает, кодируем так же, как DRF."""
+    return _fallback_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с откатом на стандартную реализацию."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        # Отступы (browsable API, ?indent=) orjson поддерживает только по 2 пробела
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        option = orjson.OPT_NON_STR_KEYS
+        if not self.ensure_ascii:
+            return orjson.dumps(data, default=_default, option=option)
+        # ensure_ascii (UNICODE_JSON=False) - редкий режим, отдаем стандартному рендереру
+        return super().render(data, accepted_media_type, renderer_context)
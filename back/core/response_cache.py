@@ -0,0 +1,137 @@
+"""
+Кэширование ответов DRF action'ов с учетом аутентификации.
+
+В отличие от кэша страниц (UpdateCacheMiddleware/FetchFromCacheMiddleware)
+ключ учитывает роль клиента, авторизованные редакторы (JWT) всегда получают
+свежие данные, а в кэше хранятся готовые байты ответа, а не pickle HttpResponse.
+Истекшие записи обновляются по схеме stale-while-revalidate (core.stale_cache).
+
+Вместе с телом хранятся ETag и Last-Modified, посчитанные при его рендеринге:
+устаревшее тело нельзя отдавать с валидаторами текущего состояния БД, иначе
+клиент получит 304 на старые данные.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from .cache_versions import get_version
+from .conditional import validator_headers
+from .stale_cache import HIT, MISS, REFRESH, STALE, get_or_refresh, register_metrics
+
+# Пространство имен версий, которое сбрасывается при любом изменении данных API
+RESPONSE_CACHE_NAMESPACE = 'api'
+
+# Значение заголовка X-Cache для статусов stale_cache
+CACHE_HEADER_VALUES = {HIT: 'HIT', MISS: 'MISS', REFRESH: 'MISS', STALE: 'STALE'}
+
+
+def request_role(request):
+    """
+    Роль клиента для ключа кэша: 'anon' или '<класс аутентификации>:<роль>'.
+    """
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return 'anon'
+    authenticator = getattr(request, 'successful_authenticator', None)
+    auth_name = type(authenticator).__name__ if authenticator else 'session'
+    role = 'writer' if is_writer(user) else 'reader'
+    return f'{auth_name}:{role}'
+
+
+def is_writer(user):
+    """Пользователь может изменять данные (в KGFL - любой вошедший администратор)."""
+    return bool(user and user.is_authenticated and (user.is_staff or getattr(user, 'is_admin', False)))
+
+
+def build_cache_key(request, key_prefix):
+    """Ключ ответа: префикс endpoint'а, роль и хэш хоста + полного пути."""
+    raw = f'{request.get_host()}{request.get_full_path()}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'response_cache:{key_prefix}:{request_role(request)}:{digest}'
+
+
+def get_timeouts(key_prefix, timeout, stale_timeout):
+    """
+    (soft_ttl, hard_ttl) endpoint'а.
+
+    RESPONSE_CACHE_TIMEOUTS из settings переопределяет значения декоратора:
+    число задает soft TTL, пара (soft, hard) - оба срока.
+    """
+    override = getattr(settings, 'RESPONSE_CACHE_TIMEOUTS', {}).get(key_prefix)
+    if isinstance(override, (tuple, list)):
+        return override[0], override[1]
+    if override is not None:
+        timeout = override
+    return timeout, timeout + stale_timeout
+
+
+def render_response(view, request, response):
+    """
+    Рендерит DRF Response в (status, content_type, bytes, заголовки-валидаторы)
+    согласованным рендерером.
+    """
+    renderer = request.accepted_renderer
+    body = renderer.render(response.data, request.accepted_media_type, view.get_renderer_context())
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    return response.status_code, content_type, body, validator_headers(view)
+
+
+def build_http_response(status_code, content_type, body, headers, cache_status):
+    response = HttpResponse(body, status=status_code, content_type=content_type)
+    for header, value in headers.items():
+        response[header] = value
+    response['X-Cache'] = cache_status
+    return response
+
+
+def cache_response(timeout=60, stale_timeout=0, key_prefix=None):
+    """
+    Декоратор для методов ViewSet (list, @action и т.д.).
+
+    Args:
+        timeout: сколько секунд ответ считается свежим (soft TTL)
+        stale_timeout: сколько секунд после этого можно отдавать устаревший
+            ответ, пока один запрос пересчитывает его (stale-while-revalidate)
+        key_prefix: имя endpoint'а в ключе и метриках, по умолчанию '<ViewSet>.<метод>'
+    """
+    def decorator(view_method):
+        prefix = key_prefix or view_method.__qualname__
+        register_metrics(prefix)
+
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            # Только чтение и только для тех, кто не редактирует данные
+            if request.method not in ('GET', 'HEAD') or is_writer(getattr(request, 'user', None)):
+                return view_method(self, request, *args, **kwargs)
+
+            fresh = {}
+
+            def produce():
+                response = view_method(self, request, *args, **kwargs)
+                fresh['response'] = response
+                if not isinstance(response, Response) or response.status_code != 200:
+                    return None
+                return render_response(self, request, response)
+
+            soft_ttl, hard_ttl = get_timeouts(prefix, timeout, stale_timeout)
+            value, cache_status = get_or_refresh(
+                build_cache_key(request, prefix),
+                produce,
+                soft_ttl,
+                hard_ttl,
+                version=get_version(RESPONSE_CACHE_NAMESPACE),
+                metrics_name=prefix,
+            )
+            if value is None:
+                # Ответ не кэшируется (ошибка, редирект и т.п.)
+                return fresh['response']
+            status_code, content_type, body, headers = value
+            return build_http_response(status_code, content_type, body, headers, CACHE_HEADER_VALUES[cache_status])
+        return wrapper
+    return decorator
@@ -0,0 +1,236 @@
+"""
+Поиск по игрокам, клубам, судьям и руководителям.
+
+Для каждого объекта в таблице SearchEntry хранится нормализованный текст:
+нижний регистр, кириллица переведена в латиницу и приведена к упрощенной
+фонетике, поэтому "Дордой", "dordoi" и "dordoy" находят одно и то же.
+Записи обновляются сигналами (core.signals) при сохранении и удалении объектов.
+
+Индексы зависят от БД:
+- PostgreSQL: GIN-индекс pg_trgm по тексту, ранжирование по TrigramWordSimilarity;
+- SQLite: FTS5-таблица core_search_fts (rowid = SearchEntry.id) с поиском
+  по префиксам слов и ранжированием bm25.
+Если индекса нет (FTS5 не собран), используется icontains по SearchEntry.
+"""
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+FTS_TABLE = 'core_search_fts'
+TRIGRAM_INDEX = 'core_searchentry_text_trgm'
+
+# Тип результата -> модель
+SEARCH_MODELS = {
+    'player': 'players.Player',
+    'club': 'clubs.Club',
+    'referee': 'referees.Referee',
+    'manager': 'management.Manager',
+}
+
+TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'iu',
+    'я': 'ia',
+    # Кыргызские буквы
+    'ң': 'n', 'ө': 'o', 'ү': 'u',
+}
+
+# Латинские варианты одного звука сводятся к одному написанию
+LATIN_SKELETON = (
+    ('kh', 'h'), ('ph', 'f'), ('w', 'v'), ('q', 'k'), ('x', 'ks'),
+    ('y', 'i'), ('j', 'i'), ('c', 'k'),
+)
+
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    """'Дордой-Бишкек' -> 'dordoi bishkek': транслитерация и упрощенная фонетика."""
+    text = ''.join(TRANSLIT.get(char, char) for char in (text or '').lower())
+    for source, target in LATIN_SKELETON:
+        text = text.replace(source, target)
+    return NON_WORD_RE.sub(' ', text).strip()
+
+
+def _full_name(obj):
+    return f'{obj.first_name} {obj.last_name}'.strip()
+
+
+def build_document(kind, obj):
+    """(заголовок, подзаголовок, поля для поиска) объекта."""
+    if kind == 'player':
+        club = obj.club.name if obj.club_id else ''
+        return _full_name(obj), club, [obj.first_name, obj.last_name, club]
+    if kind == 'club':
+        return obj.name, obj.city, [obj.name, obj.short_name, obj.city]
+    if kind == 'referee':
+        return _full_name(obj), obj.nationality, [obj.first_name, obj.last_name, obj.nationality]
+    position = obj.get_position_display() if obj.position else ''
+    return _full_name(obj), position, [obj.first_name, obj.last_name, obj.position, position]
+
+
+def kind_for_model(model):
+    label = model._meta.label
+    for kind, model_label in SEARCH_MODELS.items():
+        if model_label == label:
+            return kind
+    return None
+
+
+_fts_tables = {}
+
+
+def uses_fts(using=connection):
+    """Есть ли FTS5-таблица (только SQLite); проверяется один раз на файл БД."""
+    if using.vendor != 'sqlite':
+        return False
+    name = using.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = FTS_TABLE in using.introspection.table_names()
+    return _fts_tables[name]
+
+
+def reset_fts_cache():
+    """Сбрасывает запомненный ответ uses_fts (после миграций таблица может появиться)."""
+    _fts_tables.clear()
+
+
+def _fts_delete(cursor, entry_ids):
+    cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(entry_id,) for entry_id in entry_ids])
+
+
+def index_objects(kind, objects, entry_model=None, using=connection):
+    """Создает или обновляет записи поиска для объектов одного типа (без сигналов)."""
+    entry_model = entry_model or apps.get_model('core', 'SearchEntry')
+    objects = list(objects)
+    if not objects:
+        return
+    existing = dict(
+        entry_model.objects.filter(kind=kind, object_id__in=[obj.pk for obj in objects])
+        .values_list('object_id', 'id')
+    )
+    created, updated = [], []
+    for obj in objects:
+        title, subtitle, fields = build_document(kind, obj)
+        entry = entry_model(
+            id=existing.get(obj.pk), kind=kind, object_id=obj.pk,
+            title=title[:255], subtitle=(subtitle or '')[:255],
+            text=normalize(' '.join(field for field in fields if field)),
+        )
+        (updated if entry.id else created).append(entry)
+
+    if updated:
+        entry_model.objects.bulk_update(updated, ['title', 'subtitle', 'text'])
+    if created:
+        entry_model.objects.bulk_create(created)
+        if any(entry.id is None for entry in created):
+            # Бэкенд не вернул id после bulk_create - перечитываем
+            ids = dict(entry_model.objects.filter(kind=kind, object_id__in=[e.object_id for e in created])
+                       .values_list('object_id', 'id'))
+            for entry in created:
+                entry.id = ids[entry.object_id]
+
+    if uses_fts(using):
+        entries = updated + created
+        with using.cursor() as cursor:
+            _fts_delete(cursor, [entry.id for entry in entries])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, kind) VALUES (%s, %s, %s)',
+                [(entry.id, entry.text, entry.kind) for entry in entries],
+            )
+
+
+def remove_objects(kind, object_ids, using=connection):
+    from .models import SearchEntry
+
+    entries = SearchEntry.objects.filter(kind=kind, object_id__in=object_ids)
+    if uses_fts(using):
+        with using.cursor() as cursor:
+            _fts_delete(cursor, list(entries.values_list('id', flat=True)))
+    entries.delete()
+
+
+def rebuild_index(get_model=apps.get_model, using=connection):
+    """Полностью перестраивает записи поиска (миграция, команда rebuild_search_index)."""
+    entry_model = get_model('core', 'SearchEntry')
+    entry_model.objects.all().delete()
+    if uses_fts(using):
+        with using.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    for kind, label in SEARCH_MODELS.items():
+        model = get_model(*label.split('.'))
+        queryset = model.objects.all()
+        if kind == 'player':
+            queryset = queryset.select_related('club')
+        index_objects(kind, queryset.iterator(chunk_size=500), entry_model=entry_model, using=using)
+
+
+def _fts_ids(tokens, kinds, limit):
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    params = [match]
+    if kinds:
+        sql += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+        params += list(kinds)
+    sql += f' ORDER BY bm25({FTS_TABLE}) LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _preserve_order(ids, field='id'):
+    return Case(*[When(**{field: pk}, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+
+
+def search(query, kinds=None, limit=20):
+    """Записи поиска, лучшие совпадения первыми."""
+    from .models import SearchEntry
+
+    text = normalize(query)
+    tokens = text.split()
+    if not tokens:
+        return []
+    entries = SearchEntry.objects.all()
+    if kinds:
+        entries = entries.filter(kind__in=kinds)
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        threshold = getattr(settings, 'SEARCH_TRIGRAM_THRESHOLD', 0.3)
+        return list(
+            entries.annotate(rank=TrigramWordSimilarity(text, 'text'))
+            .filter(Q(text__contains=text) | Q(rank__gte=threshold))
+            .order_by('-rank', 'title')[:limit]
+        )
+
+    if uses_fts():
+        ids = _fts_ids(tokens, kinds, limit)
+        if ids:
+            return list(entries.filter(id__in=ids).order_by(_preserve_order(ids)))
+
+    # Без индекса или совпадение в середине слова: подстроки по таблице записей
+    condition = Q()
+    for token in tokens:
+        condition &= Q(text__contains=token)
+    return list(entries.filter(condition).order_by('title')[:limit])
+
+
+def search_ids(kind, query, limit=None):
+    """id объектов одного типа, найденных по запросу, в порядке релевантности."""
+    limit = limit or getattr(settings, 'API_UNPAGINATED_LIMIT', 1000)
+    return [entry.object_id for entry in search(query, kinds=[kind], limit=limit)]
+
+
+def filter_by_search(queryset, kind, query):
+    """Queryset объектов, найденных по запросу, отсортированный по релевантности."""
+    ids = search_ids(kind, query)
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(_preserve_order(ids, 'pk'))
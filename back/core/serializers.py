@@ -3,6 +3,8 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from .absolute_urls import file_url
+from .images import DerivativeStatusField, DerivativeURLField
 from .models import User, Season, Group, Partner, Media
 
 
@@ -10,22 +12,19 @@ class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для модели User."""
     
     avatar_url = serializers.SerializerMethodField()
+    avatar_thumb_url = DerivativeURLField('avatar')
 
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name',
-            'phone', 'avatar', 'avatar_url', 'bio', 'is_active',
+            'phone', 'avatar', 'avatar_url', 'avatar_thumb_url', 'bio', 'is_active',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_avatar_url(self, obj):
-        if obj.avatar:
-            request = self.context.get('request')
-            url = obj.avatar.url
-            return request.build_absolute_uri(url) if request else url
-        return None
+        return file_url(obj.avatar, self.context.get('request'))
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -143,24 +142,17 @@ class MediaSerializer(serializers.ModelSerializer):
     
     file_url = serializers.SerializerMethodField()
     preview_url = serializers.SerializerMethodField()
+    preview_thumb_url = DerivativeURLField('preview')
+    file_thumb_url = DerivativeURLField('file')
+    file_status = DerivativeStatusField('file')
     
     class Meta:
         model = Media
         fields = '__all__'
     
     def get_file_url(self, obj):
-        if obj.file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
-        return None
+        return file_url(obj.file, self.context.get('request'))
     
     def get_preview_url(self, obj):
-        if obj.preview:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.preview.url)
-            return obj.preview.url
-        return None
+        return file_url(obj.preview, self.context.get('request'))
 
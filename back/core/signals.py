@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
+from . import images, search
+from .autocomplete import notify_change
+from .cache_versions import bump_version
+from .home import bump_home_generation
 from .models import Season
+from .response_cache import RESPONSE_CACHE_NAMESPACE
 from clubs.models import Club, ClubSeason
 
 
@@ -50,3 +55,84 @@ def deactivate_other_seasons(sender, instance, created, **kwargs):
 # Убираем автоматическое создание ClubSeason записей
 # Клубы должны существовать независимо от сезонов
 # ClubSeason записи будут создаваться только при создании матчей
+
+
+# Модели, данные которых выводятся в ответах API. Служебные таблицы
+# (SearchEntry, ImageDerivative, MediaBlob, MediaAlias) сюда не входят:
+# фоновая обработка изображений и запись файлов не должны сбрасывать кэш
+RESPONSE_CACHE_MODELS = {
+    'core.User', 'core.Season', 'core.Group', 'core.Partner', 'core.Media',
+    'clubs.Club', 'clubs.Coach', 'clubs.ClubSeason', 'clubs.ClubApplication',
+    'matches.Stadium', 'matches.Match', 'matches.Goal', 'matches.Card', 'matches.Substitution', 'matches.Assist',
+    'players.Player', 'players.PlayerStats', 'players.PlayerTransfer',
+    'referees.Referee', 'management.Manager',
+    'stats.SeasonStats', 'stats.ClubStats',
+}
+# Пользователи на главной не выводятся
+HOME_CACHE_MODELS = RESPONSE_CACHE_MODELS - {'core.User'}
+
+
+@receiver([post_save, post_delete])
+def invalidate_response_cache(sender, **kwargs):
+    """
+    Сбрасывает кэш ответов API (core.response_cache) при изменении выводимых данных.
+    Записи не удаляются: увеличивается версия, и старые записи перестают совпадать.
+    """
+    if sender._meta.label in RESPONSE_CACHE_MODELS:
+        bump_version(RESPONSE_CACHE_NAMESPACE)
+
+
+@receiver([post_save, post_delete])
+def invalidate_home_cache(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш главной страницы (/api/home/): поколение сезона объекта
+    или общее поколение для данных вне сезона.
+    """
+    if sender._meta.label in HOME_CACHE_MODELS:
+        bump_home_generation(instance)
+
+
+@receiver(post_migrate)
+def reset_search_backend(sender, **kwargs):
+    """Миграции могли создать или удалить FTS5-таблицу поиска."""
+    search.reset_fts_cache()
+
+
+@receiver(post_save, sender='players.Player')
+@receiver(post_save, sender='clubs.Club')
+@receiver(post_save, sender='referees.Referee')
+@receiver(post_save, sender='management.Manager')
+def update_search_index(sender, instance, **kwargs):
+    """Обновляет запись поиска (core.search) и индекс автодополнения после сохранения объекта."""
+    kind = search.kind_for_model(sender)
+    search.index_objects(kind, [instance])
+    notify_change(kind, instance.pk)
+    if kind == 'club':
+        # Название клуба входит в записи его игроков
+        players = list(instance.players.select_related('club'))
+        search.index_objects('player', players)
+        for player in players:
+            notify_change('player', player.pk)
+
+
+@receiver(post_delete, sender='players.Player')
+@receiver(post_delete, sender='clubs.Club')
+@receiver(post_delete, sender='referees.Referee')
+@receiver(post_delete, sender='management.Manager')
+def remove_from_search_index(sender, instance, **kwargs):
+    """Удаляет запись поиска удаленного объекта."""
+    kind = search.kind_for_model(sender)
+    search.remove_objects(kind, [instance.pk])
+    notify_change(kind, instance.pk)
+
+
+@receiver(post_save, sender='clubs.Club')
+@receiver(post_save, sender='players.Player')
+@receiver(post_save, sender='referees.Referee')
+@receiver(post_save, sender='management.Manager')
+@receiver(post_save, sender='core.User')
+@receiver(post_save, sender='core.Media')
+def generate_image_derivatives(sender, instance, **kwargs):
+    """Ставит новые изображения объекта в очередь на обработку (core.images)."""
+    for name in images.image_field_names(instance):
+        images.schedule(name)
@@ -0,0 +1,144 @@
+"""
+Кэш со стратегией stale-while-revalidate и single-flight регенерацией.
+
+Запись хранится в кэше hard_ttl секунд, но считается свежей только soft_ttl
+секунд. После мягкого срока (или смены версии) значение пересчитывает ровно
+один процесс - тот, кто захватил блокировку через атомарный cache.add,
+остальные в это время получают устаревшее значение, а не идут в БД.
+
+Если записи нет совсем (холодный старт, вытеснение, истек hard_ttl), значение
+тоже считает только владелец блокировки, а остальные недолго ждут его
+результат (STALE_CACHE_MISS_WAIT) и лишь потом считают сами, без записи в кэш.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Статусы, которые возвращает get_or_refresh и которые считаются в метриках
+HIT = 'hit'
+MISS = 'miss'
+STALE = 'stale'
+REFRESH = 'refresh'
+METRIC_NAMES = (HIT, MISS, STALE, REFRESH)
+
+# Имена, для которых собираются метрики (заполняется при регистрации endpoint'ов)
+_registered_names = set()
+
+
+def register_metrics(name):
+    """Регистрирует имя для отчета get_metrics()."""
+    _registered_names.add(name)
+
+
+def _metric_key(name, metric):
+    return f'stale_cache:metrics:{name}:{metric}'
+
+
+def incr_metric(name, metric):
+    """Атомарно увеличивает счетчик метрики."""
+    key = _metric_key(name, metric)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_metrics():
+    """Счетчики по всем зарегистрированным именам: {имя: {метрика: значение}}."""
+    keys = {
+        _metric_key(name, metric): (name, metric)
+        for name in _registered_names
+        for metric in METRIC_NAMES
+    }
+    values = cache.get_many(list(keys))
+    metrics = {}
+    for key, (name, metric) in keys.items():
+        metrics.setdefault(name, {})[metric] = values.get(key, 0)
+    return metrics
+
+
+def get_lock_timeout():
+    return getattr(settings, 'STALE_CACHE_LOCK_TIMEOUT', 30)
+
+
+def get_miss_wait():
+    return getattr(settings, 'STALE_CACHE_MISS_WAIT', 2.0)
+
+
+# Интервал опроса кэша, пока значение считает другой процесс
+MISS_POLL_INTERVAL = 0.05
+
+
+def get_or_refresh(key, producer, soft_ttl, hard_ttl, version=None, metrics_name=None):
+    """
+    Возвращает (значение, статус) для ключа.
+
+    Args:
+        key: ключ кэша
+        producer: функция без аргументов, вычисляющая значение;
+            None означает "не кэшировать" и возвращается как есть
+        soft_ttl: сколько секунд значение считается свежим
+        hard_ttl: сколько секунд значение хранится (и может отдаваться устаревшим)
+        version: версия данных; запись с другой версией считается устаревшей
+        metrics_name: имя для счетчиков метрик
+    """
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is not None:
+        entry_version, soft_expires, value = entry
+        if entry_version == version and now < soft_expires:
+            status = HIT
+        elif cache.add(f'{key}:lock', 1, get_lock_timeout()):
+            # Мы единственный, кто пересчитывает значение
+            try:
+                value = _store(key, producer, soft_ttl, hard_ttl, version)
+            finally:
+                cache.delete(f'{key}:lock')
+            status = REFRESH
+        else:
+            # Пересчет уже идет в другом процессе - отдаем устаревшее значение
+            status = STALE
+    elif cache.add(f'{key}:lock', 1, get_lock_timeout()):
+        try:
+            value = _store(key, producer, soft_ttl, hard_ttl, version)
+        finally:
+            cache.delete(f'{key}:lock')
+        status = MISS
+    else:
+        entry = _wait_for_entry(key)
+        if entry is not None:
+            value = entry[2]
+            status = HIT
+        else:
+            # Владелец блокировки не успел - считаем сами, но в кэш не пишем
+            value = producer()
+            status = MISS
+
+    if metrics_name:
+        incr_metric(metrics_name, status)
+    return value, status
+
+
+def _wait_for_entry(key):
+    """Ждет запись, которую пишет владелец блокировки, не дольше STALE_CACHE_MISS_WAIT."""
+    deadline = time.monotonic() + get_miss_wait()
+    while time.monotonic() < deadline:
+        time.sleep(MISS_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(f'{key}:lock') is None:
+            # Блокировка снята: запись могла появиться между двумя чтениями,
+            # иначе producer вернул None или упал
+            return cache.get(key)
+    return None
+
+
+def _store(key, producer, soft_ttl, hard_ttl, version):
+    value = producer()
+    if value is not None:
+        cache.set(key, (version, time.time() + soft_ttl, value), max(hard_ttl, soft_ttl))
+    return value
@@ -0,0 +1,73 @@
+"""
+Хранилище статики с хешем содержимого в именах и заранее сжатыми копиями.
+
+collectstatic записывает app.css и app.3f2a1b9c4d5e.css (ManifestStaticFilesStorage),
+а для текстовых файлов еще app.3f2a1b9c4d5e.css.gz и .br (если установлен brotli).
+Шаблоны и {% static %} ссылаются на имена с хешем, поэтому их можно кэшировать
+навсегда; core.media.serve_static отдает сжатую копию по Accept-Encoding, а
+nginx - через gzip_static / brotli_static.
+"""
+import gzip
+import logging
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from .middleware import brotli
+
+logger = logging.getLogger(__name__)
+
+PRECOMPRESSED_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.ttf', '.eot')
+# Сжатая копия сохраняется, только если она меньше оригинала хотя бы на 5%
+MIN_COMPRESSION_RATIO = 0.95
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, который после collectstatic пишет .gz и .br копии."""
+
+    # Файлы, отсутствующие в манифесте (collectstatic еще не запускали),
+    # отдаются под исходным именем вместо ошибки шаблона
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            logger.warning(f'Статический файл {name} отсутствует в манифесте, выполните collectstatic')
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run=dry_run, **options):
+            if not isinstance(processed, Exception):
+                processed_names.update(n for n in (name, hashed_name) if n)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(processed_names):
+            if name.lower().endswith(PRECOMPRESSED_EXTENSIONS):
+                compressed = self.compress_file(name)
+                if compressed:
+                    yield name, ', '.join(compressed), True
+
+    def compress_file(self, name):
+        """Пишет name.gz и name.br рядом с файлом; возвращает имена записанных копий."""
+        with self.open(name) as file:
+            content = file.read()
+        written = []
+        variants = [('gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            quality = getattr(settings, 'STATIC_BROTLI_QUALITY', 11)
+            variants.append(('br', lambda data: brotli.compress(data, quality=quality)))
+        for extension, compress in variants:
+            compressed_name = f'{name}.{extension}'
+            data = compress(content)
+            if len(data) >= len(content) * MIN_COMPRESSION_RATIO:
+                continue
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(data))
+            written.append(compressed_name)
+        return written
+
@@ -0,0 +1,126 @@
+"""
+Хранилище медиафайлов с адресацией по содержимому.
+
+Каждый загруженный файл один раз записывается в blobs/ab/cd/<sha256>,
+а по обычному пути (clubs/logos/logo.png) создается жесткая ссылка на него
+(символическая, если жесткую создать нельзя, или копия). Один и тот же логотип,
+загруженный для заявки, клуба и сезона, занимает место на диске один раз, а
+код, URL и nginx продолжают работать со старыми путями.
+
+Пути-псевдонимы хранятся в MediaAlias, файлы содержимого - в MediaBlob со
+счетчиком ссылок. delete() удаляет только псевдоним; файлы без ссылок удаляет
+команда gc_media.
+"""
+import hashlib
+import os
+import shutil
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+
+
+def blobs_dir():
+    return getattr(settings, 'MEDIA_BLOBS_DIR', 'blobs')
+
+
+def content_digest(content):
+    """SHA-256 файла (File/UploadedFile) по частям; позиция возвращается в начало."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(digest):
+    # Без расширения: одно содержимое под разными именами - один файл
+    return f'{blobs_dir()}/{digest[:2]}/{digest[2:4]}/{digest}'
+
+
+def link_file(source, target):
+    """Жесткая ссылка target -> source; если нельзя - символическая, затем копия."""
+    try:
+        os.link(source, target)
+        return 'hardlink'
+    except FileExistsError:
+        raise
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.relpath(source, os.path.dirname(target)), target)
+        return 'symlink'
+    except FileExistsError:
+        raise
+    except (OSError, NotImplementedError):
+        shutil.copy2(source, target)
+        return 'copy'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, хранящий одинаковое содержимое в одном файле."""
+
+    def _save_blob(self, digest, content):
+        """Путь файла содержимого; записывает его, если такого содержимого еще нет."""
+        from .models import MediaBlob
+
+        path = blob_name(digest)
+        if not self.exists(path):
+            saved = super()._save(path, content)
+            if saved != path:
+                # Такой же файл параллельно записал другой процесс
+                super().delete(saved)
+        blob, _ = MediaBlob.objects.get_or_create(digest=digest, defaults={'name': path, 'size': self.size(path)})
+        return blob
+
+    def _link_alias(self, name, blob):
+        """Записывает псевдоним name -> blob и переносит ссылку со старого содержимого."""
+        from .models import MediaAlias, MediaBlob
+
+        previous = MediaAlias.objects.filter(name=name).values_list('blob_id', flat=True).first()
+        if previous == blob.pk:
+            return
+        if previous is not None:
+            MediaBlob.objects.filter(pk=previous, references__gt=0).update(references=F('references') - 1)
+        MediaAlias.objects.update_or_create(name=name, defaults={'blob': blob})
+        MediaBlob.objects.filter(pk=blob.pk).update(references=F('references') + 1)
+
+    def _save(self, name, content):
+        blob = self._save_blob(content_digest(content), content)
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        while True:
+            try:
+                link_file(self.path(blob.name), self.path(name))
+                break
+            except FileExistsError:
+                # Путь заняли между get_available_name и созданием ссылки
+                name = self.get_available_name(name)
+
+        self._link_alias(name, blob)
+        return name
+
+    def delete(self, name):
+        from .models import MediaAlias, MediaBlob
+
+        alias = MediaAlias.objects.filter(name=name).first()
+        super().delete(name)
+        if alias is not None:
+            alias.delete()
+            MediaBlob.objects.filter(pk=alias.blob_id, references__gt=0).update(references=F('references') - 1)
+
+    def adopt(self, name):
+        """
+        Переносит уже лежащий в MEDIA_ROOT файл в хранилище содержимого
+        и заменяет его ссылкой (команда gc_media --adopt).
+        """
+        with self.open(name, 'rb') as content:
+            blob = self._save_blob(content_digest(content), content)
+        temporary = self.path(name) + '.adopt'
+        link_file(self.path(blob.name), temporary)
+        os.replace(temporary, self.path(name))
+        self._link_alias(name, blob)
+        return blob
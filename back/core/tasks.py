@@ -0,0 +1,11 @@
+"""
+Задачи Celery для core (используются при IMAGE_PROCESSING_BACKEND = 'celery').
+"""
+from celery import shared_task
+
+from .images import process_image
+
+
+@shared_task(ignore_result=True)
+def process_image_task(name):
+    process_image(name)
@@ -5,7 +5,7 @@
 ВАЖНО: Тесты не влияют на работу приложения и могут быть запущены отдельно.
 """
 import pytest
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -81,3 +81,1223 @@ class RateLimitingTestCase(TestCase):
         # Последний запрос должен вернуть 429
         self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
 
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class ConditionalGetTestCase(TestCase):
+    """Тесты для ETag / Last-Modified на endpoint'ах чтения."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        from core.models import Season
+        self.season = Season.objects.create(name='2025', is_active=True)
+    
+    def test_list_returns_validators(self):
+        """Список сезонов отдает ETag и Last-Modified."""
+        response = self.client.get('/api/seasons/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+    
+    def test_not_modified_with_matching_etag(self):
+        """Повторный запрос с If-None-Match получает 304 без тела."""
+        etag = self.client.get('/api/seasons/')['ETag']
+        response = self.client.get('/api/seasons/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+    
+    def test_etag_changes_after_update(self):
+        """После изменения данных ETag меняется и клиент получает 200."""
+        etag = self.client.get('/api/seasons/active/')['ETag']
+        self.season.name = '2025/26'
+        self.season.save()
+        response = self.client.get('/api/seasons/active/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_read_endpoints_answer_not_modified(self):
+        """Все endpoint'ы чтения отдают ETag и 304 на повторный запрос с ним."""
+        from clubs.models import Club, ClubSeason
+        from matches.models import Goal, Match
+        from players.models import Player
+        home = Club.objects.create(name='A', city='X')
+        away = Club.objects.create(name='B', city='Y')
+        ClubSeason.objects.create(club=home, season=self.season)
+        ClubSeason.objects.create(club=away, season=self.season)
+        player = Player.objects.create(first_name='Ivan', last_name='Petrov', club=home, season=self.season,
+                                       position='forward', date_of_birth='2000-01-01', number=9)
+        match = Match.objects.create(home_team=home, away_team=away, season=self.season, status='finished',
+                                     home_score=1, away_score=0, date='2025-05-01')
+        Goal.objects.create(match=match, scorer=player, team=home, minute=10)
+        
+        urls = [
+            '/api/clubs/', f'/api/clubs/{home.id}/', '/api/clubs/table/', f'/api/clubs/table/?season={self.season.id}',
+            '/api/players/', f'/api/players/{player.id}/', '/api/players/top_scorers/',
+            '/api/matches/', f'/api/matches/{match.id}/', '/api/seasons/', '/api/partners/', '/api/media/',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_second_goal_changes_top_scorers_etag(self):
+        """Атомарное увеличение голов игрока меняет ETag бомбардиров."""
+        from clubs.models import Club
+        from matches.models import Goal, Match
+        from players.models import Player
+        home = Club.objects.create(name='A', city='X')
+        away = Club.objects.create(name='B', city='Y')
+        player = Player.objects.create(first_name='Ivan', last_name='Petrov', club=home, season=self.season,
+                                       position='forward', date_of_birth='2000-01-01', number=9)
+        match = Match.objects.create(home_team=home, away_team=away, season=self.season, date='2025-05-01')
+        Goal.objects.create(match=match, scorer=player, team=home, minute=10)
+        etag = self.client.get('/api/players/top_scorers/')['ETag']
+        
+        Goal.objects.create(match=match, scorer=player, team=home, minute=20)
+        response = self.client.get('/api/players/top_scorers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['goals_scored'], '2')
+    
+    def test_top_scorers_etag_without_active_season(self):
+        """Без активного сезона бомбардиры и их ETag берутся по всем сезонам."""
+        from core.models import Season
+        from players.models import Player, PlayerStats
+        Season.objects.update(is_active=False)
+        player = Player.objects.create(first_name='Ivan', last_name='Petrov', season=self.season,
+                                       position='forward', date_of_birth='2000-01-01', number=9)
+        stats, _ = PlayerStats.objects.get_or_create(player=player, season=self.season)
+        stats.goals = 1
+        stats.save()
+        etag = self.client.get('/api/players/top_scorers/')['ETag']
+        
+        stats.goals = 2
+        stats.save()
+        response = self.client.get('/api/players/top_scorers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]['goals_scored'], '2')
+    
+    def test_validators_scoped_to_served_rows(self):
+        """Изменения строк, не попавших в ответ, не меняют ETag списка."""
+        from core.models import Season
+        from players.models import Player, PlayerStats
+        other_season = Season.objects.create(name='2024')
+        served = Player.objects.create(first_name='Ivan', last_name='Petrov', season=self.season,
+                                       position='forward', date_of_birth='2000-01-01', number=9)
+        other = Player.objects.create(first_name='Oleg', last_name='Sidorov', season=other_season,
+                                      position='forward', date_of_birth='2000-01-01', number=10)
+        url = f'/api/players/?season={self.season.id}'
+        etag = self.client.get(url)['ETag']
+        
+        stats, _ = PlayerStats.objects.get_or_create(player=other, season=other_season)
+        stats.goals = 3
+        stats.save()
+        self.assertEqual(self.client.get(url)['ETag'], etag)
+        
+        stats, _ = PlayerStats.objects.get_or_create(player=served, season=self.season)
+        stats.goals = 1
+        stats.save()
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+    
+    def test_error_responses_have_no_etag(self):
+        """Ответы с ошибкой не получают ETag: тело ответа не хешируется."""
+        response = self.client.get('/api/seasons/999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(response.has_header('ETag'))
+        
+        response = self.client.get('/api/clubs/table/?season=zz')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class ResponseCacheTestCase(TestCase):
+    """Тесты для кэша ответов API с учетом аутентификации."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from core.models import Season
+        cache.clear()
+        self.client = APIClient()
+        self.season = Season.objects.create(name='2025', is_active=True)
+        self.user = User.objects.create_user(username='editor', password='testpass123')
+    
+    def test_anonymous_response_cached(self):
+        """Повторный анонимный запрос отдается из кэша."""
+        first = self.client.get('/api/seasons/active/')
+        second = self.client.get('/api/seasons/active/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+    
+    def test_authenticated_bypasses_cache(self):
+        """Авторизованный редактор всегда получает свежий ответ."""
+        self.client.get('/api/seasons/active/')
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/seasons/active/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Cache', response)
+    
+    def test_cache_invalidated_on_save(self):
+        """Изменение модели сбрасывает закэшированный ответ."""
+        self.client.get('/api/seasons/active/')
+        self.season.name = '2025/26'
+        self.season.save()
+        response = self.client.get('/api/seasons/active/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['name'], '2025/26')
+    
+    def test_bookkeeping_models_keep_cache(self):
+        """Служебные таблицы (хранилище медиа, поиск) не сбрасывают кэш ответов."""
+        from core.models import MediaBlob
+        self.client.get('/api/seasons/active/')
+        MediaBlob.objects.create(digest='0' * 64, name='blobs/00/00/' + '0' * 64, size=1)
+        response = self.client.get('/api/seasons/active/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    
+    def test_cached_body_keeps_its_validators(self):
+        """Устаревшее тело из кэша отдается со своим ETag, а не с ETag текущих данных."""
+        from unittest import mock
+        from django.core.cache import cache
+        from clubs.models import Club, ClubSeason
+        club = Club.objects.create(name='A', city='X')
+        club_season = ClubSeason.objects.create(club=club, season=self.season, points=1)
+        url = f'/api/clubs/table/?season={self.season.id}'
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        
+        club_season.points = 4
+        club_season.save()
+        # Пересчет держит другой процесс - этот запрос получает устаревшее тело
+        add = cache.add
+        lock_held = mock.patch.object(
+            cache, 'add', side_effect=lambda key, *args, **kwargs: (
+                False if key.endswith(':lock') else add(key, *args, **kwargs)
+            ),
+        )
+        with lock_held:
+            stale = self.client.get(url)
+        self.assertEqual(stale['X-Cache'], 'STALE')
+        self.assertEqual(stale.content, first.content)
+        self.assertEqual(stale['ETag'], first['ETag'])
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertNotEqual(response.content, first.content)
+
+class StaleCacheTestCase(TestCase):
+    """Тесты для stale-while-revalidate кэша."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.cache = cache
+    
+    def test_stale_value_served_while_refreshing(self):
+        """Пока другой процесс пересчитывает значение, отдается устаревшее."""
+        from core.stale_cache import get_or_refresh
+        get_or_refresh('swr-test', lambda: 'old', 60, 600, version=1)
+        self.cache.add('swr-test:lock', 1, 30)
+        producer_calls = []
+        value, cache_status = get_or_refresh(
+            'swr-test', lambda: producer_calls.append(1) or 'new', 60, 600, version=2
+        )
+        self.assertEqual((value, cache_status), ('old', 'stale'))
+        self.assertEqual(producer_calls, [])
+    
+    def test_single_refresh_releases_lock(self):
+        """Первый запрос после устаревания пересчитывает значение и снимает блокировку."""
+        from core.stale_cache import get_or_refresh
+        get_or_refresh('swr-test', lambda: 'old', 60, 600, version=1)
+        value, cache_status = get_or_refresh('swr-test', lambda: 'new', 60, 600, version=2)
+        self.assertEqual((value, cache_status), ('new', 'refresh'))
+        self.assertIsNone(self.cache.get('swr-test:lock'))
+        self.assertEqual(get_or_refresh('swr-test', lambda: 'other', 60, 600, version=2), ('new', 'hit'))
+    
+    def test_miss_waits_for_lock_owner(self):
+        """При пустом кэше значение считает владелец блокировки, остальные ждут его результат."""
+        from unittest import mock
+        from core import stale_cache
+        self.cache.add('swr-test:lock', 1, 30)
+        
+        def owner_stores(seconds):
+            # Пока мы ждем, владелец блокировки записывает значение
+            self.cache.set('swr-test', (1, 10 ** 10, 'owner'), 600)
+        
+        producer_calls = []
+        with mock.patch.object(stale_cache.time, 'sleep', side_effect=owner_stores):
+            value, cache_status = stale_cache.get_or_refresh(
+                'swr-test', lambda: producer_calls.append(1) or 'mine', 60, 600, version=1
+            )
+        self.assertEqual((value, cache_status), ('owner', 'hit'))
+        self.assertEqual(producer_calls, [])
+    
+    @override_settings(STALE_CACHE_MISS_WAIT=0.1)
+    def test_miss_without_owner_result_not_stored(self):
+        """Не дождавшись владельца блокировки, запрос считает значение сам и не пишет его в кэш."""
+        from core.stale_cache import get_or_refresh
+        self.cache.add('swr-test:lock', 1, 30)
+        value, cache_status = get_or_refresh('swr-test', lambda: 'mine', 60, 600, version=1)
+        self.assertEqual((value, cache_status), ('mine', 'miss'))
+        self.assertIsNone(self.cache.get('swr-test'))
+    
+    def test_metrics_endpoint(self):
+        """Метрики кэша доступны через health endpoint."""
+        self.client.get('/api/seasons/active/')
+        response = self.client.get('/api/health/cache/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['endpoints']['SeasonViewSet.active']['miss'], 1)
+
+
+class SlidingWindowRateLimitTestCase(TestCase):
+    """Тесты для атомарного rate limiting."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+    
+    def test_hit_blocks_after_limit(self):
+        """После исчерпания лимита запрос отклоняется с временем ожидания."""
+        from core.rate_limiting import hit
+        results = [hit('rl-test', 3, 60) for _ in range(4)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertGreater(results[-1][1], 0)
+    
+    def test_parse_rate(self):
+        """Поддерживаются лимиты с множителем периода."""
+        from core.rate_limiting import parse_rate
+        self.assertEqual(parse_rate('5/5m'), (5, 300))
+        self.assertEqual(parse_rate('100/hour'), (100, 3600))
+    
+    @override_settings(RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_client_ip_from_trusted_proxy(self):
+        """За доверенным прокси клиентом считается последний адрес X-Forwarded-For."""
+        from django.test import RequestFactory
+        from core.rate_limiting import get_client_ip
+        request = RequestFactory().get(
+            '/', HTTP_X_FORWARDED_FOR='6.6.6.6, 10.0.0.5', REMOTE_ADDR='127.0.0.1'
+        )
+        self.assertEqual(get_client_ip(request), '10.0.0.5')
+    
+    def test_client_ip_without_trusted_proxy(self):
+        """Без доверенных прокси X-Forwarded-For игнорируется."""
+        from django.test import RequestFactory
+        from core.rate_limiting import get_client_ip
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='6.6.6.6', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(get_client_ip(request), '127.0.0.1')
+
+
+class RenderingAndCompressionTestCase(TestCase):
+    """Тесты для быстрого JSON рендерера и сжатия ответов."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from core.models import Season
+        cache.clear()
+        self.client = APIClient()
+        for year in range(2015, 2026):
+            Season.objects.create(name=f'Сезон {year}', description='Описание сезона ' * 10)
+    
+    def test_fast_renderer_matches_stdlib(self):
+        """FastJSONRenderer выдает тот же JSON, что и стандартный рендерер."""
+        import datetime
+        import decimal
+        import json
+        from rest_framework.renderers import JSONRenderer
+        from core.renderers import FastJSONRenderer
+        data = {
+            'date': datetime.date(2025, 5, 1),
+            'amount': decimal.Decimal('1.50'),
+            'name': 'Дордой',
+            'items': [1, 2, None],
+        }
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
+    
+    @override_settings(COMPRESSION_MIN_SIZE=200)
+    def test_gzip_when_accepted(self):
+        """Большой ответ сжимается, если клиент принимает gzip."""
+        import gzip
+        import json
+        response = self.client.get('/api/seasons/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertIn('results', json.loads(gzip.decompress(response.content)))
+    
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_response_not_compressed(self):
+        """Ответы меньше порога отдаются без сжатия."""
+        response = self.client.get('/api/seasons/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class DynamicFieldsTestCase(TestCase):
+    """Тесты для выборочных полей ?fields= / ?omit=."""
+    
+    def setUp(self):
+        from core.models import Season
+        from clubs.models import Club
+        from players.models import Player
+        self.client = APIClient()
+        season = Season.objects.create(name='2025', is_active=True)
+        club = Club.objects.create(name='Дордой', city='Бишкек')
+        for number in range(1, 4):
+            Player.objects.create(
+                first_name=f'Игрок{number}', last_name='Тестов', club=club, season=season,
+                position='forward', date_of_birth='2000-01-01', number=number
+            )
+    
+    def _items(self, response):
+        data = response.json()
+        return data['results'] if isinstance(data, dict) else data
+    
+    def test_fields_whitelist(self):
+        """В ответе остаются только запрошенные поля."""
+        response = self.client.get('/api/players/?fields=id,first_name')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for item in self._items(response):
+            self.assertEqual(set(item), {'id', 'first_name'})
+    
+    def test_omit_fields(self):
+        """Поля из ?omit= убираются из ответа."""
+        response = self.client.get('/api/clubs/?omit=description,social_media')
+        item = self._items(response)[0]
+        self.assertNotIn('description', item)
+        self.assertNotIn('social_media', item)
+        self.assertIn('name', item)
+    
+    def test_unrequested_method_fields_skip_queries(self):
+        """Невыбранные вычисляемые поля не выполняют запросов."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as full:
+            self.client.get('/api/players/')
+        with CaptureQueriesContext(connection) as sparse:
+            self.client.get('/api/players/?fields=id,first_name,last_name')
+        self.assertLess(len(sparse), len(full))
+        player_query = next(q['sql'] for q in sparse.captured_queries if 'players_player' in q['sql'] and 'LIMIT' in q['sql'])
+        self.assertNotIn('"notes"', player_query)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class ActionPaginationTestCase(TestCase):
+    """Тесты для пагинации пользовательских action'ов."""
+    
+    def setUp(self):
+        from core.models import Season
+        from clubs.models import Club
+        from matches.models import Match
+        self.client = APIClient()
+        season = Season.objects.create(name='2025', is_active=True)
+        self.home = Club.objects.create(name='Дордой', city='Бишкек')
+        away = Club.objects.create(name='Абдыш-Ата', city='Кант')
+        for day in range(1, 4):
+            Match.objects.create(home_team=self.home, away_team=away, season=season, date=f'2025-05-0{day}')
+    
+    def test_plain_array_without_page_params(self):
+        """Без page/page_size/cursor action отдает массив, как раньше."""
+        response = self.client.get(f'/api/matches/by_club/?club_id={self.home.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 3)
+    
+    def test_cursor_pagination_for_match_feed(self):
+        """Лента матчей клуба листается курсором от новых к старым."""
+        response = self.client.get(f'/api/clubs/{self.home.id}/matches/?page_size=2')
+        data = response.json()
+        self.assertEqual([m['date'] for m in data['results']], ['2025-05-03', '2025-05-02'])
+        next_page = self.client.get(data['next']).json()
+        self.assertEqual([m['date'] for m in next_page['results']], ['2025-05-01'])
+        self.assertIsNone(next_page['next'])
+    
+    @override_settings(API_UNPAGINATED_LIMIT=2)
+    def test_unpaginated_limit(self):
+        """Массив без пагинации ограничен API_UNPAGINATED_LIMIT."""
+        response = self.client.get(f'/api/matches/by_club/?club_id={self.home.id}')
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(response['X-Result-Truncated'], '2')
+    
+    def test_keyset_pages_stable_after_insert(self):
+        """Новый матч, добавленный между запросами, не сдвигает следующую страницу."""
+        from matches.models import Match
+        first = self.client.get('/api/matches/?cursor=&page_size=2').json()
+        self.assertEqual([m['date'] for m in first['results']], ['2025-05-03', '2025-05-02'])
+        Match.objects.create(
+            home_team=self.home, away_team=Match.objects.first().away_team,
+            season=Match.objects.first().season, date='2025-06-01'
+        )
+        second = self.client.get(first['next']).json()
+        self.assertEqual([m['date'] for m in second['results']], ['2025-05-01'])
+        previous = self.client.get(second['previous']).json()
+        self.assertEqual([m['date'] for m in previous['results']], ['2025-05-03', '2025-05-02'])
+    
+    def test_match_list_page_numbers_by_default(self):
+        """Список матчей по умолчанию постраничный: count и ?ordering= работают."""
+        data = self.client.get('/api/matches/?ordering=date').json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([m['date'] for m in data['results']], ['2025-05-01', '2025-05-02', '2025-05-03'])
+    
+    def test_invalid_cursor(self):
+        """Поврежденный курсор дает 404, а не 500."""
+        response = self.client.get('/api/matches/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class HomeBundleTestCase(TestCase):
+    """Тесты для составного endpoint'а главной страницы."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from core.models import Season
+        from clubs.models import Club, ClubSeason
+        from matches.models import Match
+        cache.clear()
+        self.client = APIClient()
+        self.season = Season.objects.create(name='2025', is_active=True)
+        self.home = Club.objects.create(name='Дордой', city='Бишкек')
+        self.away = Club.objects.create(name='Абдыш-Ата', city='Кант')
+        ClubSeason.objects.create(club=self.home, season=self.season)
+        ClubSeason.objects.create(club=self.away, season=self.season)
+        self.match = Match.objects.create(
+            home_team=self.home, away_team=self.away, season=self.season,
+            date='2025-05-01', status='finished', home_score=2, away_score=1
+        )
+    
+    def test_home_contains_all_widgets(self):
+        """Ответ содержит все виджеты главной страницы."""
+        response = self.client.get('/api/home/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for widget in ('season', 'latest_matches', 'upcoming_matches', 'table', 'top_scorers', 'partners', 'media'):
+            self.assertIn(widget, response.data)
+        self.assertEqual(response.data['season']['id'], self.season.id)
+        self.assertEqual(len(response.data['table']), 2)
+    
+    def test_home_cached_until_season_changes(self):
+        """Повторный запрос берется из кэша, изменение матча сезона его сбрасывает."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.get('/api/home/')
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get('/api/home/')
+        # Остается только определение активного сезона
+        self.assertEqual(len(cached), 1)
+        
+        self.match.home_score = 3
+        self.match.save()
+        response = self.client.get('/api/home/')
+        self.assertEqual(response.data['latest_matches'][0]['home_score'], 3)
+    
+    @override_settings(DEBUG=True)
+    def test_home_cached_per_role(self):
+        """Редактор и аноним не получают закэшированный ответ друг друга."""
+        editor = User.objects.create_user(username='editor', password='testpass123', is_staff=True)
+        self.client.get('/api/home/')
+        self.client.force_authenticate(user=editor)
+        self.assertEqual(self.client.get('/api/home/').data['_debug']['cache'], 'miss')
+        self.assertEqual(self.client.get('/api/home/').data['_debug']['cache'], 'hit')
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get('/api/home/').data['_debug']['cache'], 'hit')
+    
+    @override_settings(DEBUG=True)
+    def test_debug_timings(self):
+        """В режиме отладки ответ содержит время построения каждого виджета."""
+        response = self.client.get('/api/home/')
+        self.assertEqual(response.data['_debug']['cache'], 'miss')
+        self.assertIn('table', response.data['_debug']['timings_ms'])
+
+
+class BatchRequestTestCase(TestCase):
+    """Тесты для пакетного endpoint'а /api/batch/."""
+    
+    def setUp(self):
+        from core.models import Season
+        self.client = APIClient()
+        self.season = Season.objects.create(name='2025', is_active=True)
+        self.user = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+    
+    def test_batch_returns_status_and_body_in_order(self):
+        """Каждый путь возвращает свой статус и тело в порядке запроса."""
+        response = self.client.post('/api/batch/', {
+            'requests': ['/api/seasons/active/', '/api/seasons/999/', '/api/unknown/'],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = [item['status'] for item in response.data]
+        self.assertEqual(statuses, [200, 404, 404])
+        self.assertEqual(response.data[0]['body']['id'], self.season.id)
+    
+    def test_batch_shares_authenticated_user(self):
+        """Подзапросы выполняются от имени пользователя пакетного запроса."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/batch/', {'requests': ['/api/users/me/']}, format='json')
+        self.assertEqual(response.data[0]['status'], 200)
+        self.assertEqual(response.data[0]['body']['username'], 'admin')
+        
+        anonymous = APIClient().post('/api/batch/', {'requests': ['/api/users/me/']}, format='json')
+        self.assertIn(anonymous.data[0]['status'], (401, 403))
+    
+    def test_batch_rejects_invalid_paths(self):
+        """Абсолютные URL, пути вне /api/ и вложенные пакеты отклоняются."""
+        for path in ('https://example.com/api/clubs/', '/admin/', '/api/batch/'):
+            response = self.client.post('/api/batch/', {'requests': [path]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_batch_size_limit(self):
+        """Количество путей в пакете ограничено настройкой."""
+        response = self.client.post('/api/batch/', {
+            'requests': ['/api/health/health/'] * 3,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_batch_parallel(self):
+        """В режиме parallel ответы возвращаются в порядке запросов."""
+        response = self.client.post('/api/batch/', {
+            'requests': ['/api/health/health/', '/api/unknown/'],
+            'parallel': True,
+        }, format='json')
+        self.assertEqual([item['status'] for item in response.data][1], 404)
+        self.assertEqual(response.data[0]['path'], '/api/health/health/')
+    
+    @override_settings(LIVE_STREAM_REQUIRE_REDIS=False, LIVE_STREAM_WSGI_MAX_STREAMS=1)
+    def test_batch_item_errors_are_isolated(self):
+        """Потоковый ответ и исключение view дают статус элемента, а не 500 пакета."""
+        from unittest import mock
+        from matches import live
+        with mock.patch('matches.views.MatchViewSet.latest', side_effect=RuntimeError('boom')):
+            response = self.client.post('/api/batch/', {
+                'requests': ['/api/matches/live/stream/', '/api/matches/latest/', '/api/seasons/active/'],
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in response.data], [400, 500, 200])
+        # Непрочитанный поток закрыт, его слот освобожден
+        self.assertEqual(live._wsgi_streams, 0)
+
+
+class SearchTestCase(TestCase):
+    """Тесты для поискового индекса и /api/search/."""
+    
+    def setUp(self):
+        from clubs.models import Club
+        from core.models import Season
+        from players.models import Player
+        from referees.models import Referee
+        self.client = APIClient()
+        season = Season.objects.create(name='2025', is_active=True)
+        self.club = Club.objects.create(name='Дордой', city='Бишкек')
+        self.other = Club.objects.create(name='Абдыш-Ата', city='Кант')
+        self.player = Player.objects.create(
+            first_name='Айбек', last_name='Жумабаев', club=self.club, season=season,
+            position='forward', date_of_birth='2000-01-01', number=9
+        )
+        self.referee = Referee.objects.create(first_name='Эрлан', last_name='Осмонов')
+    
+    def test_normalize_transliteration(self):
+        """Кириллица и разные латинские написания приводятся к одному виду."""
+        from core.search import normalize
+        self.assertEqual(normalize('Дордой'), normalize('Dordoy'))
+        self.assertEqual(normalize('Дордой'), normalize('dordoi'))
+        self.assertEqual(normalize('Жумабаев'), normalize('Zhumabaev'))
+    
+    def test_unified_search(self):
+        """Поиск находит объекты разных типов по префиксу и латинице."""
+        response = self.client.get('/api/search/', {'q': 'дорд'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        found = {(item['type'], item['id']) for item in response.data['results']}
+        # Клуб по названию и игрок по названию своего клуба
+        self.assertEqual(found, {('club', self.club.id), ('player', self.player.id)})
+        
+        response = self.client.get('/api/search/', {'q': 'zhumabaev', 'type': 'player'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.player.id])
+        self.assertEqual(response.data['results'][0]['subtitle'], 'Дордой')
+    
+    def test_index_follows_changes(self):
+        """Переименование клуба и удаление объектов обновляют индекс."""
+        from core.search import search_ids
+        self.club.name = 'Алга'
+        self.club.save()
+        self.assertEqual(search_ids('player', 'алга'), [self.player.id])
+        self.assertEqual(search_ids('club', 'дордой'), [])
+        
+        self.referee.delete()
+        self.assertEqual(search_ids('referee', 'осмонов'), [])
+    
+    def test_model_search_actions_use_index(self):
+        """Старые search-action'ы моделей работают через индекс."""
+        response = self.client.get('/api/players/search/', {'q': 'aibek'})
+        self.assertEqual([item['id'] for item in response.data], [self.player.id])
+        response = self.client.get('/api/referees/search/', {'q': 'Эрл'})
+        self.assertEqual([item['id'] for item in response.data], [self.referee.id])
+
+    
+    def test_missing_fts_table_checked_once(self):
+        """Отсутствие FTS5-таблицы запоминается: список таблиц читается один раз."""
+        from unittest import mock
+        from django.db import connection
+        from core import search
+        search.reset_fts_cache()
+        self.addCleanup(search.reset_fts_cache)
+        with mock.patch.object(connection.introspection, 'table_names', return_value=[]) as table_names:
+            self.assertFalse(search.uses_fts())
+            self.assertFalse(search.uses_fts())
+        table_names.assert_called_once()
+
+class AutocompleteTestCase(TestCase):
+    """Тесты для автодополнения из индекса в памяти."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from clubs.models import Club
+        from core.models import Season
+        from players.models import Player
+        cache.clear()
+        self.client = APIClient()
+        self.season = Season.objects.create(name='2025', is_active=True)
+        self.club = Club.objects.create(name='Дордой', city='Бишкек')
+        self.player = Player.objects.create(
+            first_name='Айбек', last_name='Жумабаев', club=self.club, season=self.season,
+            position='forward', date_of_birth='2000-01-01', number=9
+        )
+    
+    def _player(self, first_name, last_name):
+        from players.models import Player
+        return Player.objects.create(
+            first_name=first_name, last_name=last_name, club=self.club, season=self.season,
+            position='forward', date_of_birth='2000-01-01', number=10
+        )
+    
+    def test_prefix_lookup_without_database(self):
+        """Повторные подсказки отвечают без запросов к БД, латиница находит кириллицу."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.autocomplete import autocomplete
+        autocomplete('ай')
+        with CaptureQueriesContext(connection) as context:
+            results = autocomplete('zhum ai', kinds=['player'])
+        self.assertEqual(len(context), 0)
+        self.assertEqual([item['id'] for item in results], [self.player.id])
+    
+    def test_incremental_refresh(self):
+        """Новый и удаленный игрок попадают в индекс по журналу изменений, без перестройки."""
+        from unittest import mock
+        from core.autocomplete import PrefixIndex
+        index = PrefixIndex()
+        index.lookup('ай')
+        with self.captureOnCommitCallbacks(execute=True):
+            other = self._player('Айдар', 'Исаев')
+            self.player.delete()
+        with mock.patch.object(PrefixIndex, 'rebuild') as rebuild:
+            results = index.lookup('ай', kinds=['player'])
+        rebuild.assert_not_called()
+        self.assertEqual([item['id'] for item in results], [other.id])
+    
+    def test_change_published_after_commit(self):
+        """Версия автодополнения меняется только после коммита транзакции."""
+        from core.autocomplete import AUTOCOMPLETE_NAMESPACE
+        from core.cache_versions import get_version
+        version = get_version(AUTOCOMPLETE_NAMESPACE)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._player('Айдар', 'Исаев')
+            self.assertEqual(get_version(AUTOCOMPLETE_NAMESPACE), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version(AUTOCOMPLETE_NAMESPACE), version)
+    
+    def test_ranking_and_endpoint(self):
+        """Совпадение с началом имени выше, endpoint возвращает подсказки."""
+        other = self._player('Бакыт', 'Айбеков')
+        response = self.client.get('/api/search/autocomplete/', {'q': 'айбек', 'type': 'player'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.player.id, other.id])
+
+
+class ImageDerivativeTestCase(TestCase):
+    """Тесты для уменьшенных копий логотипов и фотографий."""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_PROCESSING_BACKEND='sync')
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.client = APIClient()
+    
+    def _image(self, name='logo.png', size=(800, 600)):
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+    
+    def test_derivatives_created_on_upload(self):
+        """После загрузки логотипа строятся уменьшенные копии, API отдает logo_thumb_url."""
+        import os
+        from PIL import Image
+        from clubs.models import Club
+        from core.models import ImageDerivative
+        with self.captureOnCommitCallbacks(execute=True):
+            club = Club.objects.create(name='Дордой', city='Бишкек', logo=self._image())
+        record = ImageDerivative.objects.get(source=club.logo.name)
+        self.assertEqual(record.status, ImageDerivative.Status.READY)
+        self.assertEqual(set(record.variants), {'thumb', 'card', 'full'})
+        with Image.open(os.path.join(self.media_root, record.variants['thumb'])) as thumb:
+            self.assertEqual(max(thumb.size), 160)
+        # Маленький оригинал не увеличивается
+        with Image.open(os.path.join(self.media_root, record.variants['full'])) as full:
+            self.assertEqual(full.size, (800, 600))
+        
+        response = self.client.get(f'/api/clubs/{club.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['logo_thumb_url'].endswith(record.variants['thumb']))
+        self.assertIn(record.content_hash[:16], response.data['logo_thumb_url'])
+    
+    def test_fallback_and_backfill_command(self):
+        """Без производных отдается оригинал; команда process_images достраивает их."""
+        from io import StringIO
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from core.images import derivative_url
+        from core.models import ImageDerivative
+        from clubs.models import Club
+        with self.captureOnCommitCallbacks(execute=True):
+            club = Club.objects.create(name='Алга', city='Бишкек', logo=self._image('alga.png'))
+        ImageDerivative.objects.all().delete()
+        cache.clear()
+        self.assertEqual(derivative_url(club.logo), club.logo.url)
+        
+        out = StringIO()
+        call_command('process_images', workers=2, stdout=out)
+        self.assertIn('Обработано изображений: 1', out.getvalue())
+        self.assertTrue(derivative_url(club.logo).endswith('_thumb.' + ImageDerivative.objects.get().variants['thumb'].rsplit('.', 1)[1]))
+    
+    def test_processing_after_commit_with_placeholder(self):
+        """Загрузка не ждет обработки: до коммита статус pending и заглушка вместо миниатюры."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from core.images import placeholder_url
+        from core.models import ImageDerivative, Season
+        from players.models import Player
+        season = Season.objects.create(name='2025', is_active=True)
+        with self.captureOnCommitCallbacks() as callbacks:
+            player = Player.objects.create(
+                first_name='Айбек', last_name='Жумабаев', season=season, position='forward',
+                date_of_birth='2000-01-01', number=9, photo=self._image('photo.png', (1200, 1600)),
+            )
+            broken = Player.objects.create(
+                first_name='Бакыт', last_name='Асанов', season=season, position='forward',
+                date_of_birth='2000-01-01', number=10,
+                photo=SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg'),
+            )
+            response = self.client.get(f'/api/players/{player.id}/')
+            self.assertEqual(response.data['photo_status'], ImageDerivative.Status.PENDING)
+            self.assertTrue(response.data['photo_thumb_url'].endswith(placeholder_url()))
+        
+        # На каждого игрока: обработка фото и публикация изменения автодополнения
+        self.assertEqual(len(callbacks), 4)
+        for callback in callbacks:
+            callback()
+        response = self.client.get(f'/api/players/{player.id}/')
+        self.assertEqual(response.data['photo_status'], ImageDerivative.Status.READY)
+        self.assertIn('_thumb.', response.data['photo_thumb_url'])
+        # Битый файл помечается ошибкой, вместо миниатюры отдается оригинал
+        response = self.client.get(f'/api/players/{broken.id}/')
+        self.assertEqual(response.data['photo_status'], ImageDerivative.Status.FAILED)
+        self.assertTrue(response.data['photo_thumb_url'].endswith(broken.photo.url))
+    
+    def test_full_queue_leaves_pending(self):
+        """При заполненной очереди пула файл остается pending и не блокирует запрос."""
+        import threading
+        from unittest import mock
+        from core import images
+        from core.models import ImageDerivative
+        images._get_executor()
+        with override_settings(IMAGE_PROCESSING_BACKEND='thread'), \
+                mock.patch.object(images, '_slots', threading.BoundedSemaphore(1)) as slots, \
+                mock.patch.object(images._executor, 'submit') as submit:
+            slots.acquire()
+            ImageDerivative.objects.create(source='clubs/logos/queued.png')
+            images.submit('clubs/logos/queued.png')
+        submit.assert_not_called()
+        self.assertEqual(ImageDerivative.objects.get().status, ImageDerivative.Status.PENDING)
+    
+    @override_settings(IMAGE_PROCESSING_BACKEND='celery')
+    def test_celery_backend_without_celery(self):
+        """Без пакета celery проверка настроек сообщает об ошибке, а загрузка остается pending."""
+        import sys
+        from unittest import mock
+        from core import images
+        from core.checks import check_image_processing_backend
+        from core.models import ImageDerivative
+        with mock.patch('core.checks.find_spec', return_value=None):
+            self.assertEqual([error.id for error in check_image_processing_backend(None)], ['core.E001'])
+        
+        ImageDerivative.objects.create(source='clubs/logos/queued.png')
+        with mock.patch.dict(sys.modules, {'celery': None, 'core.tasks': None}), \
+                self.assertLogs('core.images', 'ERROR'):
+            images.submit('clubs/logos/queued.png')
+        self.assertEqual(ImageDerivative.objects.get().status, ImageDerivative.Status.PENDING)
+
+
+class ContentAddressedStorageTestCase(TestCase):
+    """Тесты для хранилища медиафайлов с адресацией по содержимому."""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from core.storage import ContentAddressedStorage
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.media_root)
+    
+    def _path(self, name):
+        import os
+        return os.path.join(self.media_root, name)
+    
+    def test_duplicates_share_one_blob(self):
+        """Одинаковое содержимое хранится один раз, пути остаются прежними."""
+        import os
+        from django.core.files.base import ContentFile
+        from core.models import MediaAlias, MediaBlob
+        first = self.storage.save('clubs/logos/logo.png', ContentFile(b'logo bytes'))
+        second = self.storage.save('applications/logos/logo.png', ContentFile(b'logo bytes'))
+        third = self.storage.save('clubs/logos/logo.png', ContentFile(b'other logo'))
+        
+        self.assertNotEqual(first, third)
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        blob = MediaBlob.objects.get(aliases__name=first)
+        self.assertEqual(blob.references, 2)
+        self.assertTrue(os.path.samefile(self._path(first), self._path(second)))
+        with self.storage.open(second) as file:
+            self.assertEqual(file.read(), b'logo bytes')
+        
+        # Удаление пути не трогает содержимое, пока на него есть ссылки
+        self.storage.delete(first)
+        blob.refresh_from_db()
+        self.assertEqual(blob.references, 1)
+        self.assertFalse(self.storage.exists(first))
+        self.assertTrue(self.storage.exists(blob.name))
+        self.assertEqual(set(MediaAlias.objects.values_list('name', flat=True)), {second, third})
+    
+    def test_gc_and_adopt(self):
+        """gc_media удаляет файлы без ссылок из БД, --adopt объединяет старые дубликаты."""
+        import os
+        from io import StringIO
+        from unittest import mock
+        from django.core.files.base import ContentFile
+        from django.core.management import call_command
+        from clubs.models import Club
+        from core.models import MediaAlias, MediaBlob
+        os.makedirs(self._path('clubs/logos'))
+        for name in ('clubs/logos/a.png', 'clubs/logos/b.png'):
+            with open(self._path(name), 'wb') as file:
+                file.write(b'legacy logo')
+        self.storage.save('clubs/logos/orphan.png', ContentFile(b'orphan'))
+        Club.objects.create(name='Дордой', city='Бишкек', logo='clubs/logos/a.png')
+        Club.objects.create(name='Алга', city='Бишкек', logo='clubs/logos/b.png')
+        
+        command_storage = mock.patch('core.management.commands.gc_media.default_storage', self.storage)
+        with command_storage, override_settings(MEDIA_GC_GRACE_HOURS=0):
+            call_command('gc_media', adopt=True, stdout=StringIO())
+        
+        self.assertTrue(os.path.samefile(self._path('clubs/logos/a.png'), self._path('clubs/logos/b.png')))
+        self.assertEqual(list(MediaBlob.objects.values_list('references', flat=True)), [2])
+        self.assertFalse(MediaAlias.objects.filter(name='clubs/logos/orphan.png').exists())
+        self.assertFalse(os.path.exists(self._path('clubs/logos/orphan.png')))
+
+
+class MediaServingTestCase(TestCase):
+    """Тесты для отдачи медиафайлов с поддержкой Range и кэширования."""
+    
+    def setUp(self):
+        import os
+        import shutil
+        import tempfile
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.content = bytes(range(256)) * 40
+        for name in ('videos/match.mp4', 'derivatives/ab/ab12_thumb.webp'):
+            os.makedirs(os.path.join(self.media_root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.media_root, name), 'wb') as file:
+                file.write(self.content)
+    
+    def test_range_requests(self):
+        """Range отдает 206 с нужными байтами, недопустимый диапазон - 416."""
+        response = self.client.get('/media/videos/match.mp4', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        
+        response = self.client.get('/media/videos/match.mp4', HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-10:])
+        
+        response = self.client.get('/media/videos/match.mp4', HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        
+        response = self.client.get('/media/videos/match.mp4')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+    
+    def test_range_on_empty_file(self):
+        """Любой диапазон пустого файла, в том числе bytes=-N, - 416."""
+        import os
+        open(os.path.join(self.media_root, 'videos/empty.mp4'), 'wb').close()
+        for header in ('bytes=-10', 'bytes=0-', 'bytes=0-0'):
+            response = self.client.get('/media/videos/empty.mp4', HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416)
+            self.assertEqual(response['Content-Range'], 'bytes */0')
+        
+        response = self.client.get('/media/videos/empty.mp4')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'')
+    
+    def test_etag_and_cache_headers(self):
+        """ETag дает 304, файлы с хешем в имени кэшируются как immutable."""
+        response = self.client.get('/media/videos/match.mp4')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.client.get('/media/videos/match.mp4', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        
+        response = self.client.get('/media/derivatives/ab/ab12_thumb.webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+    
+    @override_settings(MEDIA_SERVE_OFFLOAD='x-accel')
+    def test_x_accel_redirect(self):
+        """При отдаче через nginx приложение возвращает только заголовки."""
+        response = self.client.get('/media/videos/match.mp4')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/media/videos/match.mp4')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+
+
+class PrecompressedStaticTestCase(TestCase):
+    """Тесты для статики с хешем в именах и сжатыми копиями."""
+    
+    def setUp(self):
+        import os
+        import shutil
+        import tempfile
+        self.source = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        for directory in (self.source, self.static_root):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.css = ('body { color: #123456; }\n' * 200).encode()
+        with open(os.path.join(self.source, 'app.css'), 'wb') as file:
+            file.write(self.css)
+        static_override = override_settings(
+            STATICFILES_DIRS=[self.source],
+            STATIC_ROOT=self.static_root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage'},
+            },
+        )
+        static_override.enable()
+        self.addCleanup(static_override.disable)
+    
+    def test_collectstatic_and_serving(self):
+        """collectstatic пишет имя с хешем и .gz; view отдает сжатую копию по Accept-Encoding."""
+        import gzip
+        import os
+        from django.core.management import call_command
+        from django.templatetags.static import static
+        call_command('collectstatic', interactive=False, verbosity=0)
+        url = static('app.css')
+        hashed_name = url[len('/static/'):]
+        self.assertRegex(hashed_name, r'^app\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, hashed_name + '.gz')))
+        
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.css)
+        
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.css)
+    
+    def test_missing_manifest_entry_falls_back(self):
+        """До collectstatic {% static %} не падает, а возвращает исходное имя."""
+        from django.templatetags.static import static
+        self.assertEqual(static('images/new.png'), '/static/images/new.png')
+
+
+class AbsoluteURLTestCase(TestCase):
+    """Тесты для построения абсолютных URL файлов в сериализаторах."""
+    
+    def test_matches_build_absolute_uri(self):
+        """URL совпадает с request.build_absolute_uri(file.url) и строится один раз на файл."""
+        from unittest import mock
+        from django.test import RequestFactory
+        from clubs.models import Club
+        from core.absolute_urls import file_url, url_builder
+        request = RequestFactory().get('/api/clubs/')
+        club = Club(name='Дордой', logo='clubs/logos/дордой логотип.png')
+        self.assertEqual(file_url(club.logo, request), request.build_absolute_uri(club.logo.url))
+        self.assertIsNone(file_url(Club(name='Без логотипа').logo, request))
+        self.assertEqual(file_url(club.logo), club.logo.url)
+        
+        with mock.patch('core.absolute_urls.storage_url') as storage_url:
+            for _ in range(3):
+                file_url(club.logo, request)
+        storage_url.assert_not_called()
+        self.assertIs(url_builder(request), url_builder(request))
+    
+    def test_disallowed_host_gives_relative_urls(self):
+        """Недопустимый Host не ломает сериализацию: URL остаются относительными."""
+        from django.test import RequestFactory
+        from clubs.models import Club
+        from core.absolute_urls import file_url
+        request = RequestFactory().get('/api/clubs/', HTTP_HOST='evil.example')
+        club = Club(name='Дордой', logo='clubs/logos/logo.png')
+        self.assertEqual(file_url(club.logo, request), '/media/clubs/logos/logo.png')
+
+
+class IncrementalBackupTestCase(TestCase):
+    """Тесты для инкрементальных бэкапов медиафайлов."""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from pathlib import Path
+        self.base_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.base_dir, ignore_errors=True)
+        self.media_dir = self.base_dir / 'media'
+        self.backups_dir = self.base_dir / 'backups'
+        self.backups_dir.mkdir()
+        (self.media_dir / 'clubs').mkdir(parents=True)
+        (self.media_dir / 'blobs').mkdir()
+        (self.media_dir / 'clubs' / 'logo.png').write_bytes(b'png' * 100)
+        (self.media_dir / 'clubs' / 'copy.png').write_bytes(b'png' * 100)
+        (self.media_dir / 'rules.txt').write_text('правила ' * 100)
+        (self.media_dir / 'blobs' / 'blob').write_bytes(b'blob')
+    
+    def snapshot(self, name):
+        import zipfile
+        from core.backups import latest_manifest, write_media_snapshot
+        previous = latest_manifest(self.backups_dir)
+        with zipfile.ZipFile(self.backups_dir / name, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            return write_media_snapshot(zipf, name, self.media_dir, self.base_dir, previous=previous,
+                                        exclude_dirs=('blobs',))
+    
+    def test_only_changed_files_are_stored(self):
+        """Второй бэкап хранит только измененные файлы, одинаковые файлы хранятся один раз."""
+        import zipfile
+        manifest, stats = self.snapshot('backup_1.zip')
+        self.assertEqual(set(manifest['files']), {'media/clubs/logo.png', 'media/clubs/copy.png', 'media/rules.txt'})
+        self.assertEqual((stats['files'], stats['stored']), (3, 2))
+        with zipfile.ZipFile(self.backups_dir / 'backup_1.zip') as archive:
+            digest = manifest['files']['media/clubs/logo.png']['sha256']
+            self.assertEqual(archive.getinfo(f'objects/{digest[:2]}/{digest}').compress_type, zipfile.ZIP_STORED)
+        
+        (self.media_dir / 'rules.txt').write_text('новые правила')
+        manifest, stats = self.snapshot('backup_2.zip')
+        self.assertEqual((stats['stored'], stats['reused'], stats['hashed']), (1, 2, 1))
+        self.assertEqual(manifest['files']['media/clubs/logo.png']['archive'], 'backup_1.zip')
+        self.assertEqual(manifest['files']['media/rules.txt']['archive'], 'backup_2.zip')
+    
+    def test_restore_and_retention(self):
+        """Снимок восстанавливается из нескольких архивов; нужные ему архивы не удаляются."""
+        from core.backups import required_archives, restore_media
+        from core.management.commands.backup import Command
+        self.snapshot('backup_1.zip')
+        (self.media_dir / 'rules.txt').write_text('новые правила')
+        self.snapshot('backup_2.zip')
+        
+        target = self.base_dir / 'restore'
+        self.assertEqual(restore_media(self.backups_dir / 'backup_2.zip', target), 3)
+        self.assertEqual((target / 'media' / 'clubs' / 'logo.png').read_bytes(), b'png' * 100)
+        self.assertEqual((target / 'media' / 'rules.txt').read_text(), 'новые правила')
+        self.assertEqual(required_archives([self.backups_dir / 'backup_2.zip']), {'backup_1.zip', 'backup_2.zip'})
+        
+        Command().cleanup_old_backups(self.backups_dir, keep_count=1)
+        self.assertTrue((self.backups_dir / 'backup_1.zip').exists())
+    
+    def test_script_retention_keeps_referenced_archives(self):
+        """backup_db.py удаляет старые архивы с учетом манифестов, как manage.py backup."""
+        from unittest import mock
+        import backup_db
+        self.snapshot('backup_1.zip')
+        (self.media_dir / 'rules.txt').write_text('новые правила')
+        self.snapshot('backup_2.zip')
+        (self.media_dir / 'rules.txt').write_text('еще правила')
+        self.snapshot('backup_3.zip')
+        (self.media_dir / 'clubs' / 'logo.png').write_bytes(b'new logo')
+        (self.media_dir / 'clubs' / 'copy.png').write_bytes(b'new logo')
+        self.snapshot('backup_4.zip')
+        
+        with mock.patch('builtins.print'):
+            backup_db.cleanup_old_backups(self.backups_dir, keep_count=1)
+        # backup_4 хранит rules.txt в backup_3, backup_1 и backup_2 больше не нужны
+        self.assertEqual(
+            sorted(path.name for path in self.backups_dir.iterdir()), ['backup_3.zip', 'backup_4.zip']
+        )
+    
+    def test_failed_sqlite_copy_leaves_no_archive(self):
+        """Если копия SQLite не прошла проверку, недописанный архив удаляется."""
+        import sqlite3
+        from io import StringIO
+        from unittest import mock
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        import backup_db
+        broken = mock.Mock(side_effect=sqlite3.DatabaseError('integrity_check: malformed'))
+        
+        with override_settings(BASE_DIR=self.base_dir):
+            (self.base_dir / settings.DATABASES['default']['NAME']).touch()
+            with mock.patch('core.management.commands.backup.write_sqlite_backup', broken):
+                with self.assertRaises(CommandError):
+                    call_command('backup', stdout=StringIO())
+        self.assertEqual(list(self.backups_dir.iterdir()), [])
+        
+        (self.base_dir / 'db.sqlite3').touch()
+        with mock.patch.object(backup_db, 'BASE_DIR', self.base_dir), \
+                mock.patch.object(backup_db, 'write_sqlite_backup', broken), \
+                mock.patch('builtins.print'):
+            with self.assertRaises(SystemExit):
+                backup_db.create_backup()
+        self.assertEqual(list(self.backups_dir.iterdir()), [])
+    
+    def test_sqlite_online_backup(self):
+        """SQLite копируется через backup API по страницам и проверяется integrity_check."""
+        import sqlite3
+        import zipfile
+        from core.backups import write_sqlite_backup
+        db_path = self.base_dir / 'db.sqlite3'
+        with sqlite3.connect(db_path) as db:
+            db.execute('CREATE TABLE t (value TEXT)')
+            db.executemany('INSERT INTO t VALUES (?)', [('x' * 500,)] * 200)
+        db.close()
+        
+        steps = []
+        with zipfile.ZipFile(self.backups_dir / 'backup_1.zip', 'w', zipfile.ZIP_DEFLATED) as zipf:
+            page_count, size, _ = write_sqlite_backup(zipf, db_path, 'db.sqlite3', pages=5, sleep=0,
+                                                      progress=lambda copied, total: steps.append(copied))
+        self.assertGreater(len(steps), 1)
+        self.assertEqual(steps[-1], page_count)
+        self.assertEqual(list(self.backups_dir.iterdir()), [self.backups_dir / 'backup_1.zip'])
+        
+        restored = self.base_dir / 'restored.sqlite3'
+        with zipfile.ZipFile(self.backups_dir / 'backup_1.zip') as archive:
+            restored.write_bytes(archive.read('db.sqlite3'))
+        self.assertEqual(restored.stat().st_size, size)
+        db = sqlite3.connect(restored)
+        self.assertEqual(db.execute('SELECT COUNT(*) FROM t').fetchone()[0], 200)
+        db.close()
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet, SeasonViewSet, GroupViewSet, PartnerViewSet, MediaViewSet, HealthCheckViewSet
+from .views import UserViewSet, SeasonViewSet, GroupViewSet, PartnerViewSet, MediaViewSet, HealthCheckViewSet, HomeViewSet, BatchViewSet, SearchViewSet
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -9,6 +9,9 @@ router.register(r'groups', GroupViewSet)
 router.register(r'partners', PartnerViewSet)
 router.register(r'media', MediaViewSet)
 router.register(r'health', HealthCheckViewSet, basename='health')
+router.register(r'home', HomeViewSet, basename='home')
+router.register(r'batch', BatchViewSet, basename='batch')
+router.register(r'search', SearchViewSet, basename='search')
 
 
 urlpatterns = [
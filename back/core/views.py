@@ -5,13 +5,21 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.db.models import Q
 from django.db import connection
+from django.conf import settings
 from django.core.cache import cache
 from .models import User, Season, Group, Partner, Media
 from .serializers import (
     UserSerializer, UserCreateSerializer, LoginSerializer,
     SeasonSerializer, GroupSerializer, PartnerSerializer, MediaSerializer
 )
-from .rate_limiting import rate_limit
+from .rate_limiting import LoginRateThrottle
+from .conditional import ConditionalGetMixin
+from .response_cache import cache_response
+from .stale_cache import get_metrics as get_cache_metrics
+from .home import get_home_data
+from .batch import batch_response
+from .search import SEARCH_MODELS, search
+from .autocomplete import autocomplete
 import rest_framework.parsers
 import django.utils.timezone
 
@@ -33,8 +41,7 @@ class UserViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         return super().get_permissions()
     
-    @action(detail=False, methods=['post'])
-    @rate_limit(max_requests=5, window=300)  # 5 попыток входа за 5 минут
+    @action(detail=False, methods=['post'], throttle_classes=[LoginRateThrottle])  # DEFAULT_THROTTLE_RATES['login']
     def login(self, request):
         """Вход в систему."""
         serializer = LoginSerializer(data=request.data)
@@ -71,16 +78,26 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SeasonViewSet(viewsets.ModelViewSet):
+class SeasonViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet для управления сезонами."""
     
     queryset = Season.objects.all()
     serializer_class = SeasonSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    conditional_actions = ('list', 'retrieve', 'active')
     
     def get_permissions(self):
         return super().get_permissions()
 
+    def get_conditional_querysets(self):
+        # Группы вложены в ответ сезона, поэтому их изменения тоже учитываем
+        if self.action == 'active':
+            return [Season.objects.filter(is_active=True), Group.objects.filter(season__is_active=True)]
+        querysets = super().get_conditional_querysets()
+        if querysets:
+            querysets.append(Group.objects.filter(season__in=querysets[0].values('pk')))
+        return querysets
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
@@ -89,6 +106,7 @@ class SeasonViewSet(viewsets.ModelViewSet):
         return Response({'message': 'Ошибка валидации', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
+    @cache_response(timeout=300)
     def active(self, request):
         """Получить активный сезон."""
         try:
@@ -128,12 +146,13 @@ class GroupViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class PartnerViewSet(viewsets.ModelViewSet):
+class PartnerViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet для управления партнерами."""
     
     queryset = Partner.objects.filter(is_active=True)
     serializer_class = PartnerSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    conditional_actions = ('list', 'retrieve', 'by_category')
     
     def get_permissions(self):
         return super().get_permissions()
@@ -146,6 +165,17 @@ class PartnerViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
+    def get_conditional_querysets(self):
+        if self.action == 'by_category':
+            category = self.request.query_params.get('category')
+            return [self.queryset.filter(category=category) if category else self.queryset]
+        return super().get_conditional_querysets()
+
+    @cache_response(timeout=300)
+    def list(self, request, *args, **kwargs):
+        """Список активных партнеров (кэшируется для анонимных посетителей)."""
+        return super().list(request, *args, **kwargs)
+
     def create(self, request, *args, **kwargs):
         """Создание партнера с обработкой ошибок."""
         try:
@@ -213,7 +243,7 @@ class PartnerViewSet(viewsets.ModelViewSet):
         return Response(PartnerSerializer(partners, many=True).data)
 
 
-class MediaViewSet(viewsets.ModelViewSet):
+class MediaViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet для управления медиа файлами."""
     
     queryset = Media.objects.filter(is_active=True)
@@ -257,6 +287,72 @@ class MediaViewSet(viewsets.ModelViewSet):
         return Response(MediaSerializer(media, many=True, context={'request': request}).data)
 
 
+class HomeViewSet(viewsets.ViewSet):
+    """Все виджеты главной страницы одним запросом."""
+    
+    permission_classes = [permissions.AllowAny]
+    
+    def list(self, request):
+        """Активный сезон, матчи, таблица, бомбардиры, партнеры и медиа."""
+        data, timings, cache_status = get_home_data(request)
+        if settings.DEBUG:
+            data = dict(data)
+            data['_debug'] = {'cache': cache_status, 'timings_ms': timings}
+        return Response(data)
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """Единый поиск по игрокам, клубам, судьям и руководителям."""
+    
+    permission_classes = [permissions.AllowAny]
+    
+    def list(self, request):
+        """
+        ?q= - запрос (кириллица или латиница), ?type=player,club - типы объектов,
+        ?limit= - количество результатов.
+        """
+        query = request.query_params.get('q', '').strip()
+        if len(query) < getattr(settings, 'SEARCH_MIN_QUERY_LENGTH', 2):
+            return Response({'query': query, 'results': []})
+        
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind in SEARCH_MODELS]
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+        except ValueError:
+            limit = 20
+        
+        results = [
+            {'type': entry.kind, 'id': entry.object_id, 'title': entry.title, 'subtitle': entry.subtitle}
+            for entry in search(query, kinds=kinds or None, limit=limit)
+        ]
+        return Response({'query': query, 'results': results})
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Подсказки при вводе: каждое слово запроса - начало слова имени (индекс в памяти, без БД)."""
+        query = request.query_params.get('q', '').strip()
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind in SEARCH_MODELS]
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        return Response({'query': query, 'results': autocomplete(query, kinds=kinds or None, limit=limit)})
+
+
+class BatchViewSet(viewsets.ViewSet):
+    """Несколько GET-запросов к API одним HTTP-запросом."""
+    
+    # Права проверяет каждый подзапрос от имени текущего пользователя
+    permission_classes = [permissions.AllowAny]
+    
+    def create(self, request):
+        """
+        POST {"requests": ["/api/clubs/", "/api/seasons/active/"], "parallel": false}
+        -> [{"path": ..., "status": 200, "body": ...}, ...] в порядке запросов.
+        """
+        return batch_response(request)
+
+
 class HealthCheckViewSet(viewsets.ViewSet):
     """ViewSet для проверки здоровья системы."""
     
@@ -280,8 +376,6 @@ class HealthCheckViewSet(viewsets.ViewSet):
         except Exception as e:
             cache_status = f"error: {str(e)}"
         
-        from django.conf import settings
-        
         health_data = {
             'status': 'healthy' if db_status == 'ok' else 'degraded',
             'timestamp': str(django.utils.timezone.now()),
@@ -309,4 +403,9 @@ class HealthCheckViewSet(viewsets.ViewSet):
         except Exception:
             return Response({'status': 'not ready'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
+    @action(detail=False, methods=['get'])
+    def cache(self, request):
+        """Метрики кэша ответов: попадания, промахи, устаревшие ответы и пересчеты."""
+        return Response({'endpoints': get_cache_metrics()})
+
  
\ No newline at end of file
@@ -79,7 +79,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'django.middleware.cache.UpdateCacheMiddleware',
+    # Сжатие brotli/gzip - первым, чтобы обработать ответ последним
+    'core.middleware.CompressionMiddleware',
+    # Кэш страниц целиком не используется: он отдавал анонимный ответ
+    # авторизованным редакторам. Ответы кэшируются точечно через
+    # core.response_cache.cache_response с учетом роли клиента.
+    # ETag и 304 отдает core.conditional.ConditionalGetMixin без хеширования тела
     'corsheaders.middleware.CorsMiddleware',
 ] + ([
     'django.middleware.security.SecurityMiddleware',
@@ -90,7 +95,6 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.cache.FetchFromCacheMiddleware',
 ]
 
 # Дополнительная проверка: убеждаемся что SecurityMiddleware не активен при DEBUG
@@ -225,18 +229,47 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Хранение медиафайлов по SHA-256 содержимого (core.storage): одинаковые загрузки
+# занимают место один раз. Включается явно; после включения gc_media --adopt
+# переносит уже загруженные файлы, gc_media удаляет неиспользуемые
+MEDIA_CONTENT_ADDRESSED = config('MEDIA_CONTENT_ADDRESSED', default=False, cast=bool)
+MEDIA_BLOBS_DIR = 'blobs'
+MEDIA_GC_GRACE_HOURS = config('MEDIA_GC_GRACE_HOURS', default=24, cast=int)
+
+# Статика с хешем в именах и сжатыми копиями .gz/.br (core.staticfiles); после
+# включения нужен collectstatic. При DEBUG файлы берутся из STATICFILES_DIRS как есть
+STATIC_HASHED_STORAGE = config('STATIC_HASHED_STORAGE', default=not DEBUG, cast=bool)
+STATIC_BROTLI_QUALITY = 11
+
+STORAGES = {
+    'default': {
+        'BACKEND': (
+            'core.storage.ContentAddressedStorage' if MEDIA_CONTENT_ADDRESSED
+            else 'django.core.files.storage.FileSystemStorage'
+        ),
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'core.staticfiles.CompressedManifestStaticFilesStorage' if STATIC_HASHED_STORAGE
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        # Пользователь родительского запроса /api/batch/ (см. core.batch)
+        'core.batch.BatchUserAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.StandardPageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -244,15 +277,58 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ),
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        # orjson, если установлен, иначе стандартный JSONRenderer
+        'core.renderers.FastJSONRenderer',
     ),
     'DEFAULT_PARSER_CLASSES': (
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ),
+    # Лимиты для core.rate_limiting.SlidingWindowThrottle: 'запросов/[N]s|m|h|d'
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config('LOGIN_RATE_LIMIT', default='5/5m'),  # 5 попыток входа за 5 минут
+    },
 }
 
+# Пагинация (core.pagination): максимальный ?page_size= и лимит записей
+# для action'ов, которые без page/page_size/cursor отдают простой массив
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=100, cast=int)
+API_UNPAGINATED_LIMIT = config('API_UNPAGINATED_LIMIT', default=1000, cast=int)
+
+# Поиск (core.search): минимальная длина запроса и порог сходства pg_trgm (PostgreSQL)
+SEARCH_MIN_QUERY_LENGTH = 2
+SEARCH_TRIGRAM_THRESHOLD = config('SEARCH_TRIGRAM_THRESHOLD', default=0.3, cast=float)
+# Автодополнение (core.autocomplete): сколько изменений воркер применяет из журнала
+# в кэше (больше - перестраивает индекс) и сколько секунд хранится журнал
+AUTOCOMPLETE_MAX_CHANGES = 500
+AUTOCOMPLETE_CHANGE_TTL = 86400
+
+# Уменьшенные копии изображений (core.images): размеры {имя: (ширина, высота)}
+# по умолчанию thumb 160, card 480, full 1600; качество WebP/JPEG и время кэша путей
+# IMAGE_DERIVATIVE_SIZES = {'thumb': (160, 160), 'card': (480, 480), 'full': (1600, 1600)}
+IMAGE_DERIVATIVE_QUALITY = config('IMAGE_DERIVATIVE_QUALITY', default=82, cast=int)
+IMAGE_DERIVATIVE_CACHE_TIMEOUT = 86400
+# Где обрабатываются загрузки: 'thread' - пул потоков процесса (IMAGE_PROCESSING_WORKERS
+# потоков, до IMAGE_PROCESSING_QUEUE файлов в очереди), 'celery' - задача Celery,
+# 'sync' - сразу после коммита. Пока файл обрабатывается, отдается заглушка из static
+IMAGE_PROCESSING_BACKEND = config('IMAGE_PROCESSING_BACKEND', default='thread')
+IMAGE_PROCESSING_WORKERS = config('IMAGE_PROCESSING_WORKERS', default=2, cast=int)
+IMAGE_PROCESSING_QUEUE = config('IMAGE_PROCESSING_QUEUE', default=32, cast=int)
+IMAGE_PLACEHOLDER = 'images/player-silhouette.png'
+
+# Пакетные GET-запросы /api/batch/: максимум путей в пакете и потоков при "parallel": true
+BATCH_MAX_REQUESTS = config('BATCH_MAX_REQUESTS', default=20, cast=int)
+BATCH_MAX_WORKERS = config('BATCH_MAX_WORKERS', default=4, cast=int)
+
+# Ответы меньше этого размера (байт) не сжимаются: выигрыш меньше затрат CPU
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+
+# Сколько прокси (nginx, балансировщик) перед приложением дописывают X-Forwarded-For.
+# 0 - доверяем только REMOTE_ADDR
+RATE_LIMIT_TRUSTED_PROXIES = config('RATE_LIMIT_TRUSTED_PROXIES', default=0, cast=int)
+
 # JWT settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -424,10 +500,35 @@ if CACHE_BACKEND == 'locmem':
         }
     }
 
-# Cache settings for views
-CACHE_MIDDLEWARE_ALIAS = 'default'
-CACHE_MIDDLEWARE_SECONDS = 300  # 5 minutes
-CACHE_MIDDLEWARE_KEY_PREFIX = 'kgfl'
+# Кэш ответов API (core.response_cache): TTL в секундах по имени endpoint'а.
+# Число переопределяет soft TTL декоратора cache_response,
+# пара (soft, hard) - оба срока (устаревший ответ отдается до hard TTL).
+RESPONSE_CACHE_TIMEOUTS = {
+    # 'ClubViewSet.table': (60, 600),
+}
+# Кэш главной страницы /api/home/: (soft, hard) TTL в секундах и число медиа
+HOME_CACHE_TIMEOUTS = (300, 3600)
+HOME_MEDIA_LIMIT = config('HOME_MEDIA_LIMIT', default=12, cast=int)
+# SSE-поток live-матчей (matches.live): опрос канала в кэше (сек), heartbeat (сек),
+# время жизни событий канала (сек) и длительность одного подключения под WSGI/ASGI
+LIVE_STREAM_POLL_INTERVAL = config('LIVE_STREAM_POLL_INTERVAL', default=1.0, cast=float)
+LIVE_STREAM_HEARTBEAT = 15
+LIVE_EVENT_TTL = 600
+# Состояние идущего матча (счет, минута, события) в кэше, сек
+LIVE_STATE_TTL = 6 * 3600
+LIVE_STREAM_WSGI_DURATION = config('LIVE_STREAM_WSGI_DURATION', default=60, cast=int)
+# Под WSGI поток занимает воркер: не больше N потоков на процесс (0 - только под ASGI,
+# для gthread-воркеров можно поднять до части --threads)
+LIVE_STREAM_WSGI_MAX_STREAMS = config('LIVE_STREAM_WSGI_MAX_STREAMS', default=0, cast=int)
+# Канал событий в LocMemCache не виден другим процессам - без Redis поток отвечает 503.
+# В разработке (runserver, один процесс) достаточно локального кэша
+LIVE_STREAM_REQUIRE_REDIS = config('LIVE_STREAM_REQUIRE_REDIS', default=not DEBUG, cast=bool)
+LIVE_STREAM_ASGI_DURATION = config('LIVE_STREAM_ASGI_DURATION', default=3600, cast=int)
+# Максимальное время (сек) пересчета устаревшей записи одним процессом
+STALE_CACHE_LOCK_TIMEOUT = config('STALE_CACHE_LOCK_TIMEOUT', default=30, cast=int)
+# Сколько секунд запрос при пустом кэше ждет значение, которое считает другой
+# процесс; потом считает сам, не записывая результат в кэш
+STALE_CACHE_MISS_WAIT = config('STALE_CACHE_MISS_WAIT', default=2.0, cast=float)
 
 # Session/Security settings
 SESSION_COOKIE_AGE = 3600  # 1 hour
@@ -447,6 +548,21 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 
 # Media serving in development
 SERVE_MEDIA = config('SERVE_MEDIA', default=True, cast=bool)
+# Отдача файлов приложением (core.media): max-age для файлов без хеша в имени;
+# '' - файл отдает Django, 'x-accel' - nginx по X-Accel-Redirect (internal location
+# MEDIA_ACCEL_REDIRECT_PREFIX + MEDIA_URL), 'sendfile' - Apache/lighttpd по X-Sendfile
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+MEDIA_SERVE_OFFLOAD = config('MEDIA_SERVE_OFFLOAD', default='')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected'
+MEDIA_IMMUTABLE_PREFIXES = ('derivatives/', 'blobs/')
+
+# manage.py backup: по умолчанию инкрементальный режим (core.backups) - в архив
+# попадают только новые и измененные медиафайлы, остальные берутся из прошлых архивов
+BACKUP_INCREMENTAL = config('BACKUP_INCREMENTAL', default=False, cast=bool)
+# SQLite копируется через backup API шагами по BACKUP_SQLITE_PAGES страниц
+# с паузой BACKUP_SQLITE_SLEEP секунд, в которую приложение может писать в БД
+BACKUP_SQLITE_PAGES = config('BACKUP_SQLITE_PAGES', default=1024, cast=int)
+BACKUP_SQLITE_SLEEP = config('BACKUP_SQLITE_SLEEP', default=0.005, cast=float)
 
 # Sentry для мониторинга ошибок (опционально)
 SENTRY_DSN = config('SENTRY_DSN', default=None)
@@ -2,9 +2,9 @@
 URL configuration for KGFL project.
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from core.media import serve_media, serve_static
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -43,8 +43,11 @@ if getattr(settings, 'USE_API_DOCS', False):
 
 # Serve static/media files in development or if explicitly allowed in prod
 if settings.DEBUG or getattr(settings, 'SERVE_MEDIA', False):
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+    # core.media: Range, ETag, долгий кэш для файлов с хешем в имени, X-Accel-Redirect
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media),
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static),
+    ]
 
 # Customize admin site
 admin.site.site_header = settings.ADMIN_SITE_HEADER
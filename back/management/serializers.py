@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from core.absolute_urls import file_url
+from core.images import DerivativeURLField
 from .models import Manager
 
 
@@ -6,12 +8,13 @@ class ManagerSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Manager."""
     
     photo_url = serializers.SerializerMethodField()
+    photo_thumb_url = DerivativeURLField('photo')
     full_name = serializers.CharField(read_only=True)
 
     class Meta:
         model = Manager
         fields = [
-            'id', 'full_name', 'first_name', 'last_name', 'photo', 'photo_url', 'position',
+            'id', 'full_name', 'first_name', 'last_name', 'photo', 'photo_url', 'photo_thumb_url', 'position',
             'email', 'phone', 'order', 'is_active', 'notes'
         ]
         extra_kwargs = {
@@ -20,30 +23,21 @@ class ManagerSerializer(serializers.ModelSerializer):
         }
 
     def get_photo_url(self, obj):
-        if obj.photo and hasattr(obj.photo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.photo.url)
-            return obj.photo.url
-        return None
+        return file_url(obj.photo, self.context.get('request'))
 
 
 class ManagerListSerializer(serializers.ModelSerializer):
     """Сериализатор для списка руководителей."""
     
     photo_url = serializers.SerializerMethodField()
+    photo_thumb_url = DerivativeURLField('photo')
     full_name = serializers.CharField(read_only=True)
     
     class Meta:
         model = Manager
         fields = [
-            'id', 'full_name', 'first_name', 'last_name', 'photo_url', 'position', 'email', 'phone', 'notes', 'is_active'
+            'id', 'full_name', 'first_name', 'last_name', 'photo_url', 'photo_thumb_url', 'position', 'email', 'phone', 'notes', 'is_active'
         ]
     
     def get_photo_url(self, obj):
-        if obj.photo and hasattr(obj.photo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.photo.url)
-            return obj.photo.url
-        return None 
\ No newline at end of file
+        return file_url(obj.photo, self.context.get('request')) 
\ No newline at end of file
@@ -1,12 +1,13 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from core.pagination import ActionPaginationMixin
+from core.search import filter_by_search
 from .models import Manager
 from .serializers import ManagerSerializer, ManagerListSerializer
 
 
-class ManagerViewSet(viewsets.ModelViewSet):
+class ManagerViewSet(ActionPaginationMixin, viewsets.ModelViewSet):
     """ViewSet для управления руководителями."""
     
     queryset = Manager.objects.all()
@@ -27,15 +28,10 @@ class ManagerViewSet(viewsets.ModelViewSet):
         """Поиск руководителей."""
         query = request.GET.get('q', '')
         if query:
-            managers = self.queryset.filter(
-                Q(first_name__icontains=query) | 
-                Q(last_name__icontains=query) | 
-                Q(position__icontains=query)
-            )
+            managers = filter_by_search(self.queryset, 'manager', query)
         else:
             managers = self.queryset
-        serializer = self.get_serializer(managers, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(managers)
     
     @action(detail=False, methods=['get'])
     def by_position(self, request):
@@ -45,5 +41,4 @@ class ManagerViewSet(viewsets.ModelViewSet):
             managers = self.queryset.filter(position=position)
         else:
             managers = self.queryset
-        serializer = self.get_serializer(managers, many=True)
-        return Response(serializer.data) 
\ No newline at end of file
+        return self.paginated_response(managers) 
\ No newline at end of file
@@ -0,0 +1,368 @@
+"""
+Трансляция live-матчей через Server-Sent Events.
+
+Сигналы публикуют изменения счета, статуса и события матча (голы, карточки,
+замены) в канал в кэше: номер последнего события - версия пространства имен
+'matches:live', само событие лежит под ключом с этим номером. Поток SSE
+каждого зрителя опрашивает только кэш, поэтому число зрителей не влияет на
+нагрузку на БД. При подключении зритель получает снимок текущих live-матчей,
+а при переподключении с Last-Event-ID - пропущенные события.
+
+Пока матч идет, его счет, минута и список событий хранятся в кэше
+(get_state/update_state): live-endpoint'ы читают их без запросов к БД, а
+полный пересчет таблицы и статистики игроков выполняется один раз, когда
+матч переходит в статус finished (см. matches.signals).
+
+Под ASGI поток асинхронный и не занимает воркер. Под WSGI каждый зритель
+держит воркер (sync-воркер gunicorn - целиком) до LIVE_STREAM_WSGI_DURATION,
+поэтому таких потоков в процессе не больше LIVE_STREAM_WSGI_MAX_STREAMS
+(по умолчанию 0 - поток только под ASGI); остальным отвечает 503, и клиент
+опрашивает /api/matches/live/.
+
+Канал должен быть общим для всех процессов: события, опубликованные в одном
+воркере, в LocMemCache другого не видны. Поэтому при LIVE_STREAM_REQUIRE_REDIS
+поток открывается только с Redis в качестве кэша.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from core.cache_versions import bump_version, get_version
+
+LIVE_CHANNEL = 'matches:live'
+LIVE_SNAPSHOT_KEY = 'matches:live:snapshot'
+
+
+def _event_key(event_id):
+    return f'matches:live:event:{event_id}'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def publish(event, data):
+    """Публикует событие в канал и возвращает его номер."""
+    event_id = bump_version(LIVE_CHANNEL)
+    cache.set(_event_key(event_id), {'id': event_id, 'event': event, 'data': data}, _setting('LIVE_EVENT_TTL', 600))
+    if event in ('score', 'status'):
+        cache.delete(LIVE_SNAPSHOT_KEY)
+    return event_id
+
+
+def read_events(after_id):
+    """
+    События канала после after_id.
+
+    Returns:
+        (номер последнего прочитанного события, список событий) или
+        (текущий номер, None), если часть событий уже недоступна и клиенту
+        нужен новый снимок.
+    """
+    current = get_version(LIVE_CHANNEL)
+    if current <= after_id:
+        return after_id, []
+    if current - after_id > _setting('LIVE_STREAM_BACKLOG', 200):
+        return current, None
+
+    ids = range(after_id + 1, current + 1)
+    found = cache.get_many([_event_key(event_id) for event_id in ids])
+    events = []
+    for event_id in ids:
+        item = found.get(_event_key(event_id))
+        if item is None:
+            if any(_event_key(later) in found for later in range(event_id + 1, current + 1)):
+                # Событие вытеснено или истекло - восстановить порядок нельзя
+                return current, None
+            # Номер уже выдан, но событие еще записывается - дочитаем в следующий раз
+            break
+        events.append(item)
+    last_id = events[-1]['id'] if events else after_id
+    return last_id, events
+
+
+def _state_key(match_id):
+    return f'matches:live:state:{match_id}'
+
+
+def event_data(instance):
+    """Гол, карточка или замена в формате событий канала."""
+    from .models import Card, Goal
+
+    data = {'match': instance.match_id, 'id': instance.pk, 'minute': instance.minute, 'team': instance.team_id}
+    if isinstance(instance, Goal):
+        data.update(type='goal', goal_type=instance.goal_type, player=instance.scorer.full_name,
+                    assist=instance.assist.full_name if instance.assist_id else None)
+    elif isinstance(instance, Card):
+        data.update(type='card', card_type=instance.card_type, player=instance.player.full_name)
+    else:
+        data.update(type='substitution', player_in=instance.player_in.full_name,
+                    player_out=instance.player_out.full_name)
+    return data
+
+
+def build_state(match):
+    """Состояние live-матча из БД: счет, минута (по последнему событию) и события."""
+    from .models import Card, Goal, Substitution
+
+    events = [event_data(goal) for goal in Goal.objects.filter(match=match).select_related('scorer', 'assist')]
+    events += [event_data(card) for card in Card.objects.filter(match=match).select_related('player')]
+    events += [
+        event_data(substitution)
+        for substitution in Substitution.objects.filter(match=match).select_related('player_in', 'player_out')
+    ]
+    events.sort(key=lambda item: (item['minute'], item['id']))
+    state = match_score(match)
+    state['minute'] = events[-1]['minute'] if events else 0
+    state['events'] = events
+    return state
+
+
+def get_state(match_id):
+    """Состояние live-матча из кэша; при промахе строится из БД. None - матча нет."""
+    from .models import Match
+
+    state = cache.get(_state_key(match_id))
+    if state is None:
+        match = Match.objects.filter(pk=match_id).first()
+        if match is None:
+            return None
+        state = build_state(match)
+        if match.status == Match.Status.LIVE:
+            cache.set(_state_key(match_id), state, _setting('LIVE_STATE_TTL', 6 * 3600))
+    return state
+
+
+def update_state(match_id, **changes):
+    """
+    Обновляет состояние live-матча в кэше.
+
+    changes - поля счета/минуты и служебные ключи add_event / remove_event.
+    Состояние меняют только администраторы матча, поэтому чтение-изменение-запись
+    без блокировки; если состояния в кэше нет, оно построится из БД при чтении.
+    """
+    key = _state_key(match_id)
+    state = cache.get(key)
+    if state is None:
+        return None
+    added = changes.pop('add_event', None)
+    removed = changes.pop('remove_event', None)
+    state.update(changes)
+    if removed is not None:
+        state['events'] = [item for item in state['events'] if (item['type'], item['id']) != removed]
+    if added is not None:
+        state['events'] = [item for item in state['events'] if (item['type'], item['id']) != (added['type'], added['id'])]
+        state['events'].append(added)
+        state['events'].sort(key=lambda item: (item['minute'], item['id']))
+        state['minute'] = max(state.get('minute') or 0, added['minute'])
+    cache.set(key, state, _setting('LIVE_STATE_TTL', 6 * 3600))
+    return state
+
+
+def clear_state(match_id):
+    cache.delete(_state_key(match_id))
+
+
+def match_score(match):
+    """Счет и статус матча в формате событий канала."""
+    return {
+        'match': match.id,
+        'status': match.status,
+        'home_score': match.home_score,
+        'away_score': match.away_score,
+        'home_score_ht': match.home_score_ht,
+        'away_score_ht': match.away_score_ht,
+    }
+
+
+def build_snapshot():
+    from .models import Match
+
+    matches = list(Match.objects.filter(status=Match.Status.LIVE).select_related('home_team', 'away_team'))
+    states = cache.get_many([_state_key(match.id) for match in matches])
+    snapshot = []
+    for match in matches:
+        item = match_score(match)
+        item['minute'] = states.get(_state_key(match.id), {}).get('minute')
+        item['home_team'] = {'id': match.home_team_id, 'name': match.home_team.name if match.home_team else None}
+        item['away_team'] = {'id': match.away_team_id, 'name': match.away_team.name if match.away_team else None}
+        snapshot.append(item)
+    return snapshot
+
+
+def get_snapshot():
+    """Текущие live-матчи; строится из БД один раз после каждого изменения счета или статуса."""
+    snapshot = cache.get(LIVE_SNAPSHOT_KEY)
+    if snapshot is None:
+        snapshot = build_snapshot()
+        cache.set(LIVE_SNAPSHOT_KEY, snapshot, _setting('LIVE_EVENT_TTL', 600))
+    return snapshot
+
+
+def format_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+class LiveStream:
+    """Состояние потока одного зрителя: последний номер события и фильтр по матчу."""
+
+    def __init__(self, last_event_id=None, match_id=None):
+        self.last_id = last_event_id
+        self.match_id = match_id
+
+    def _wanted(self, data):
+        return self.match_id is None or data.get('match') == self.match_id
+
+    def _snapshot(self):
+        self.last_id = get_version(LIVE_CHANNEL)
+        matches = [item for item in get_snapshot() if self._wanted(item)]
+        return format_event('snapshot', matches, self.last_id)
+
+    def open(self):
+        """Первые сообщения потока: интервал переподключения и снимок (или пропущенные события)."""
+        chunks = [f"retry: {_setting('LIVE_STREAM_RETRY_MS', 3000)}\n\n".encode('utf-8')]
+        if self.last_id is None:
+            chunks.append(self._snapshot())
+        else:
+            chunks.extend(self.poll())
+        return chunks
+
+    def poll(self):
+        self.last_id, events = read_events(self.last_id)
+        if events is None:
+            return [self._snapshot()]
+        return [
+            format_event(item['event'], item['data'], item['id'])
+            for item in events if self._wanted(item['data'])
+        ]
+
+
+HEARTBEAT = b': ping\n\n'
+
+
+def stream_sync(stream, duration):
+    """Синхронный поток для WSGI."""
+    yield from stream.open()
+    interval = _setting('LIVE_STREAM_POLL_INTERVAL', 1.0)
+    heartbeat = _setting('LIVE_STREAM_HEARTBEAT', 15)
+    deadline = time.monotonic() + duration
+    last_sent = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        chunks = stream.poll()
+        if not chunks and time.monotonic() - last_sent >= heartbeat:
+            chunks = [HEARTBEAT]
+        if chunks:
+            last_sent = time.monotonic()
+            yield from chunks
+
+
+async def stream_async(stream, duration):
+    """Асинхронный поток для ASGI: опрос кэша выполняется вне event loop."""
+    open_stream = sync_to_async(stream.open, thread_sensitive=False)
+    poll = sync_to_async(stream.poll, thread_sensitive=False)
+    for chunk in await open_stream():
+        yield chunk
+    interval = _setting('LIVE_STREAM_POLL_INTERVAL', 1.0)
+    heartbeat = _setting('LIVE_STREAM_HEARTBEAT', 15)
+    deadline = time.monotonic() + duration
+    last_sent = time.monotonic()
+    while time.monotonic() < deadline:
+        await asyncio.sleep(interval)
+        chunks = await poll()
+        if not chunks and time.monotonic() - last_sent >= heartbeat:
+            chunks = [HEARTBEAT]
+        if chunks:
+            last_sent = time.monotonic()
+            for chunk in chunks:
+                yield chunk
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def uses_redis():
+    """Общий ли для процессов кэш канала (Redis)."""
+    return 'redis' in settings.CACHES['default']['BACKEND'].lower()
+
+
+_wsgi_lock = threading.Lock()
+_wsgi_streams = 0
+
+
+def _acquire_wsgi_slot():
+    global _wsgi_streams
+    with _wsgi_lock:
+        if _wsgi_streams >= _setting('LIVE_STREAM_WSGI_MAX_STREAMS', 0):
+            return False
+        _wsgi_streams += 1
+        return True
+
+
+def _release_wsgi_slot():
+    global _wsgi_streams
+    with _wsgi_lock:
+        _wsgi_streams -= 1
+
+
+class WSGIStreamSlot:
+    """
+    Содержимое WSGI-потока: освобождает слот, когда ответ закрывается -
+    и после чтения, и если поток так и не читали (отключение, /api/batch/).
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.released = False
+
+    def __iter__(self):
+        return self.chunks
+
+    def close(self):
+        self.chunks.close()
+        if not self.released:
+            self.released = True
+            _release_wsgi_slot()
+
+
+def stream_unavailable(message):
+    return JsonResponse({'error': message}, status=503)
+
+
+def live_stream_response(request):
+    """StreamingHttpResponse с потоком SSE (асинхронным под ASGI) или 503."""
+    if _setting('LIVE_STREAM_REQUIRE_REDIS', True) and not uses_redis():
+        return stream_unavailable('Поток live-матчей требует Redis, используйте /api/matches/live/')
+
+    last_event_id = parse_int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+    stream = LiveStream(last_event_id=last_event_id, match_id=parse_int(request.GET.get('match')))
+
+    if isinstance(request, ASGIRequest):
+        content = stream_async(stream, _setting('LIVE_STREAM_ASGI_DURATION', 3600))
+    else:
+        if not _acquire_wsgi_slot():
+            return stream_unavailable('Все потоки live-матчей заняты, используйте /api/matches/live/')
+        content = WSGIStreamSlot(stream_sync(stream, _setting('LIVE_STREAM_WSGI_DURATION', 60)))
+
+    response = StreamingHttpResponse(content, content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-19 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0016_alter_club_assistant_full_name_and_more'),
+        ('core', '0014_season_format_group'),
+        ('matches', '0014_match_group'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['-date', '-time', '-id'], name='match_date_time_id_idx'),
+        ),
+    ]
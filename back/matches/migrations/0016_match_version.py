@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0015_match_date_time_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия'),
+        ),
+    ]
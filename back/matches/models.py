@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F
 from django.utils.translation import gettext_lazy as _
 from clubs.models import Club
 from core.models import Season
@@ -170,10 +171,22 @@ class Match(models.Model):
         verbose_name=_('Дата обновления')
     )
     
+    # Номер версии для оптимистичной блокировки: увеличивается при каждом сохранении,
+    # правка с устаревшей версией отклоняется (MatchViewSet.update)
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Версия')
+    )
+    
     class Meta:
         verbose_name = _('Матч')
         verbose_name_plural = _('Матчи')
         ordering = ['-date', '-time']
+        indexes = [
+            # Ключ keyset-пагинации лент матчей (core.pagination.MatchCursorPagination)
+            models.Index(fields=['-date', '-time', '-id'], name='match_date_time_id_idx'),
+        ]
         # Убираем ограничение уникальности для тестирования
         # unique_together = ['home_team', 'away_team', 'season']
     
@@ -183,6 +196,18 @@ class Match(models.Model):
         date_str = str(self.date) if self.date else 'дата не указана'
         return f"{home} vs {away} ({date_str})"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Match, instance=self)):
+            # Версия увеличивается в БД, а не от значения в памяти: оно могло устареть
+            # (increment_score меняет версию в БД, не трогая этот экземпляр). UPDATE
+            # блокирует строку до конца транзакции, и сигналы post_save видят число
+            matches = Match.objects.filter(pk=self.pk)
+            if matches.update(version=F('version') + 1):
+                self.version = matches.values_list('version', flat=True).get()
+            super().save(*args, **kwargs)
+    
     @property
     def score_display(self):
         if self.home_score is not None and self.away_score is not None:
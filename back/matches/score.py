@@ -0,0 +1,103 @@
+"""
+Атомарное изменение счета матча.
+
+Гол увеличивает счет одним UPDATE ... SET home_score = home_score + 1, поэтому
+одновременные голы от нескольких операторов не затирают друг друга. update()
+не вызывает сигналы матча: вместо полного пересчета сезона таблица
+завершенного матча правится на разницу старого и нового результата, а кэши
+и трансляция обновляются явно.
+"""
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from clubs.models import ClubSeason
+from core.cache_versions import bump_version
+from core.home import bump_home_generation
+from core.response_cache import RESPONSE_CACHE_NAMESPACE
+
+from . import live
+from .models import Match
+
+SCORE_FIELDS = ('status', 'home_score', 'away_score', 'home_score_ht', 'away_score_ht', 'version', 'updated_at')
+
+
+def result_row(goals_for, goals_against):
+    """Вклад одного результата в строку таблицы; пустой счет не учитывается."""
+    if goals_for is None or goals_against is None:
+        return dict.fromkeys(('games', 'matches_played', 'wins', 'draws', 'losses', 'points',
+                              'goals_for', 'goals_against', 'goal_difference'), 0)
+    win, draw = goals_for > goals_against, goals_for == goals_against
+    return {
+        'games': 1,
+        'matches_played': 1,
+        'wins': int(win),
+        'draws': int(draw),
+        'losses': int(not win and not draw),
+        'points': 3 if win else int(draw),
+        'goals_for': goals_for,
+        'goals_against': goals_against,
+        'goal_difference': goals_for - goals_against,
+    }
+
+
+def apply_result_delta(match, old_score, new_score):
+    """
+    Правит строки таблицы обеих команд на разницу между старым и новым счетом.
+
+    old_score/new_score - пары (home_score, away_score). Позиции в таблице
+    пересчитываются, остальная статистика сезона не трогается.
+    """
+    from .signals import update_table_positions
+
+    sides = (
+        (match.home_team_id, old_score, new_score),
+        (match.away_team_id, old_score[::-1], new_score[::-1]),
+    )
+    for club_id, old, new in sides:
+        before, after = result_row(*old), result_row(*new)
+        delta = {field: F(field) + (after[field] - before[field]) for field in after if after[field] != before[field]}
+        if delta:
+            # update() не трогает auto_now, а от updated_at зависит ETag таблицы
+            ClubSeason.objects.filter(club_id=club_id, season_id=match.season_id).update(
+                **delta, updated_at=timezone.now()
+            )
+    update_table_positions(match.season)
+
+
+def _after_score_change(match):
+    bump_version(RESPONSE_CACHE_NAMESPACE)
+    bump_home_generation(match)
+    if match.status == Match.Status.LIVE:
+        score = live.match_score(match)
+        if live.update_state(match.pk, **score) is None:
+            live.get_state(match.pk)
+        live.publish('score', score)
+
+
+def increment_score(match, team_id):
+    """
+    Засчитывает гол команде team_id атомарным UPDATE и обновляет поля счета
+    и версию у match. Для завершенного матча сразу правит таблицу сезона.
+    """
+    field = 'home_score' if team_id == match.home_team_id else 'away_score'
+    with transaction.atomic():
+        Match.objects.filter(pk=match.pk).update(**{
+            field: Coalesce(F(field), Value(0)) + 1,
+            'version': F('version') + 1,
+            'updated_at': timezone.now(),
+        })
+        score = Match.objects.filter(pk=match.pk).values(*SCORE_FIELDS).get()
+        for name, value in score.items():
+            setattr(match, name, value)
+        
+        if match.status == Match.Status.FINISHED and match.season_id:
+            new_score = (match.home_score, match.away_score)
+            old_score = (
+                new_score[0] - (field == 'home_score'),
+                new_score[1] - (field == 'away_score'),
+            )
+            apply_result_delta(match, old_score, new_score)
+    _after_score_change(match)
+    return match
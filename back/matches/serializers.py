@@ -2,6 +2,8 @@ from rest_framework import serializers
 from .models import Match, Goal, Card, Substitution, Stadium, Assist
 from clubs.models import Club
 from core.models import Season
+from core.dynamic_fields import DynamicFieldsMixin
+from core.absolute_urls import absolute_url, file_url
 from datetime import datetime
 
 
@@ -320,9 +322,17 @@ class MatchCreateSerializer(serializers.ModelSerializer):
             pass
 
 
-class MatchSerializer(serializers.ModelSerializer):
+class MatchSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для модели Match."""
     
+    field_dependencies = {
+        'home_team_logo': ('home_team',),
+        'away_team_logo': ('away_team',),
+        'home_team': ('home_team',),
+        'away_team': ('away_team',),
+        'stadium_name': ('stadium_ref', 'stadium'),
+    }
+    
     home_team_name = serializers.CharField(source='home_team.name', read_only=True)
     away_team_name = serializers.CharField(source='away_team.name', read_only=True)
     home_team_logo = serializers.SerializerMethodField()
@@ -345,8 +355,9 @@ class MatchSerializer(serializers.ModelSerializer):
         if not logo:
             return None
         request = self.context.get('request')
-        url = logo.url if hasattr(logo, 'url') else str(logo)
-        return request.build_absolute_uri(url) if request else url
+        if hasattr(logo, 'url'):
+            return file_url(logo, request)
+        return absolute_url(str(logo), request)
 
     def get_home_team_logo(self, obj):
         return self._absolute_logo(getattr(obj.home_team, 'logo', None))
@@ -378,9 +389,17 @@ class MatchSerializer(serializers.ModelSerializer):
         return None
 
 
-class MatchListSerializer(serializers.ModelSerializer):
+class MatchListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для списка матчей."""
     
+    field_dependencies = {
+        'home_team_logo': ('home_team',),
+        'away_team_logo': ('away_team',),
+        'home_team': ('home_team',),
+        'away_team': ('away_team',),
+        'stadium_name': ('stadium_ref', 'stadium'),
+    }
+    
     home_team_name = serializers.CharField(source='home_team.name', read_only=True)
     away_team_name = serializers.CharField(source='away_team.name', read_only=True)
     season_name = serializers.CharField(source='season.name', read_only=True, allow_null=True)
@@ -404,8 +423,9 @@ class MatchListSerializer(serializers.ModelSerializer):
         if not logo:
             return None
         request = self.context.get('request')
-        url = logo.url if hasattr(logo, 'url') else str(logo)
-        return request.build_absolute_uri(url) if request else url
+        if hasattr(logo, 'url'):
+            return file_url(logo, request)
+        return absolute_url(str(logo), request)
 
     def get_home_team_logo(self, obj):
         return self._absolute_logo(getattr(obj.home_team, 'logo', None))
@@ -561,9 +581,18 @@ class SubstitutionSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class MatchDetailSerializer(serializers.ModelSerializer):
+class MatchDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для детальной информации о матче."""
     
+    field_dependencies = {
+        'home_team_logo': ('home_team',),
+        'away_team_logo': ('away_team',),
+        'home_team': ('home_team',),
+        'away_team': ('away_team',),
+        'home_team_players': ('home_team',),
+        'away_team_players': ('away_team',),
+    }
+    
     home_team_name = serializers.CharField(source='home_team.name', read_only=True)
     away_team_name = serializers.CharField(source='away_team.name', read_only=True)
     home_team_logo = serializers.SerializerMethodField()
@@ -586,16 +615,9 @@ class MatchDetailSerializer(serializers.ModelSerializer):
     def _players_basic(self, club):
         if not club:
             return []
-        from players.models import Player
-        players = Player.objects.filter(club=club, is_active=True).order_by('number', 'last_name')
-        return [
-            {
-                'id': p.id,
-                'full_name': p.full_name,
-                'number': p.number,
-            }
-            for p in players
-        ]
+        # Кэшированный снимок состава (сбрасывается сигналами Player/PlayerTransfer)
+        from players.roster import get_roster
+        return get_roster(club.id)
 
     def get_home_team_players(self, obj):
         return self._players_basic(obj.home_team)
@@ -607,8 +629,9 @@ class MatchDetailSerializer(serializers.ModelSerializer):
         if not logo:
             return None
         request = self.context.get('request')
-        url = logo.url if hasattr(logo, 'url') else str(logo)
-        return request.build_absolute_uri(url) if request else url
+        if hasattr(logo, 'url'):
+            return file_url(logo, request)
+        return absolute_url(str(logo), request)
 
     def _club_obj(self, club):
         if not club:
@@ -629,8 +652,9 @@ class MatchDetailSerializer(serializers.ModelSerializer):
         if not logo:
             return None
         request = self.context.get('request')
-        url = logo.url if hasattr(logo, 'url') else str(logo)
-        return request.build_absolute_uri(url) if request else url
+        if hasattr(logo, 'url'):
+            return file_url(logo, request)
+        return absolute_url(str(logo), request)
 
     def get_home_team_logo(self, obj):
         return self._absolute_logo(getattr(obj.home_team, 'logo', None))
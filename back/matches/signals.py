@@ -1,14 +1,19 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.db import models
 from django.db.models import Q
-from .models import Match, Assist
+from .models import Match, Assist, Goal, Card, Substitution
+from . import live
 from clubs.models import ClubSeason
 from core.models import Season
 
 
 def recalculate_season_stats(season):
-    """Полностью пересчитать статистику для сезона на основе всех матчей."""
+    """
+    Полностью пересчитать статистику для сезона на основе завершенных матчей.
+    
+    Счет идущих (live) матчей предварительный и в таблицу не попадает.
+    """
     try:
         
         # Сбрасываем статистику для всех команд в сезоне
@@ -42,7 +47,7 @@ def recalculate_season_stats(season):
             season=season,
             home_score__isnull=False,
             away_score__isnull=False,
-            status__in=['finished', 'live']
+            status=Match.Status.FINISHED
         )
         
         
@@ -165,7 +170,7 @@ def recalculate_player_stats_for_season(season):
             matches_count = Match.objects.filter(
                 Q(home_team=player.club) | Q(away_team=player.club),
                 season=season,
-                status__in=['finished', 'live'],
+                status=Match.Status.FINISHED,
                 home_score__isnull=False,
                 away_score__isnull=False
             ).count()
@@ -542,11 +547,26 @@ def update_table_positions(season):
         pass
 
 
+def _relevant_fields_changed(instance, previous):
+    """Изменились ли поля, от которых зависят таблица и статистика игроков."""
+    return any(
+        previous[field] != getattr(instance, field)
+        for field in ('status', 'home_score', 'away_score', 'season_id', 'home_team_id', 'away_team_id')
+    )
+
+
 @receiver(post_save, sender=Match)
 def handle_match_save(sender, instance, created, **kwargs):
     """
     Обрабатывает сохранение матча: создает ClubSeason и обновляет статистику.
+
+    Пока матч идет (status=live), счет предварительный: он хранится в состоянии
+    live-матча (matches.live), а таблица и статистика игроков пересчитываются
+    один раз, когда матч получает итоговый статус. Если завершенный матч
+    вернули в игру, его прежний итог убирается из таблицы до нового завершения.
     """
+    previous = getattr(instance, '_previous', None)
+    
     if instance.season and instance.home_team and instance.away_team:
         # Если счет сброшен (0:0), удаляем все события
         if instance.home_score == 0 and instance.away_score == 0:
@@ -554,7 +574,13 @@ def handle_match_save(sender, instance, created, **kwargs):
             Goal.objects.filter(match=instance).delete()
             Card.objects.filter(match=instance).delete()
             Assist.objects.filter(match=instance).delete()
-        
+    
+    if instance.status == Match.Status.LIVE:
+        if previous and previous['status'] == Match.Status.FINISHED and instance.season:
+            recalculate_season_stats(instance.season)
+        return
+    
+    if instance.season and instance.home_team and instance.away_team:
         # Создаем ClubSeason для домашней команды
         ClubSeason.objects.get_or_create(
             club=instance.home_team,
@@ -589,33 +615,28 @@ def handle_match_save(sender, instance, created, **kwargs):
             }
         )
         
-        # Если это обновление (не создание), проверяем, изменился ли сезон
-        if not created:
-            # Получаем старый сезон из базы данных, если матч уже существует
-            try:
-                old_match = Match.objects.get(pk=instance.pk)
-                old_season = old_match.season if hasattr(old_match, 'season') else None
-                
-                # Если сезон изменился, пересчитываем статистику для обоих сезонов
-                if old_season and old_season != instance.season:
+        # Для обновления сравниваем с состоянием до сохранения (см. remember_previous_state)
+        if not created and previous:
+            # Если сезон изменился, пересчитываем статистику для обоих сезонов
+            if previous['season_id'] and previous['season_id'] != instance.season_id:
+                old_season = Season.objects.filter(pk=previous['season_id']).first()
+                if old_season:
                     # Пересчитываем статистику для старого сезона (без этого матча)
                     recalculate_season_stats(old_season)
-                    # Пересчитываем статистику для нового сезона (с этим матчом)
-                    recalculate_season_stats(instance.season)
-                    return
-                
-                # Если счет изменился или статус изменился, пересчитываем статистику
-                if (old_match.home_score != instance.home_score or 
-                    old_match.away_score != instance.away_score or 
-                    old_match.status != instance.status):
-                    # Пересчитываем статистику для текущего сезона
-                    recalculate_season_stats(instance.season)
-                    return
-            except Match.DoesNotExist:
-                pass  # Матч не существует в БД, значит это создание
-        
-        # Обновляем статистику только для завершенных матчей
-        if instance.status in ['finished', 'live'] and instance.home_score is not None and instance.away_score is not None:
+                # Пересчитываем статистику для нового сезона (с этим матчом)
+                recalculate_season_stats(instance.season)
+                return
+            
+            # Изменились только описание, стадион и т.п. - статистика не меняется
+            if not _relevant_fields_changed(instance, previous):
+                return
+            
+            # Счет, статус или команды изменились (в том числе матч завершился)
+            recalculate_season_stats(instance.season)
+            return
+        
+        # Обновляем статистику только для сыгранных матчей
+        if instance.status == Match.Status.FINISHED and instance.home_score is not None and instance.away_score is not None:
             # Для нового матча просто пересчитываем статистику сезона
             recalculate_season_stats(instance.season)
 
@@ -636,3 +657,55 @@ def update_club_stats_on_match_delete(sender, instance, **kwargs):
 
 
 # Сигнал для ассистов перенесен в players/signals.py
+
+
+@receiver(pre_save, sender=Match)
+def remember_previous_state(sender, instance, **kwargs):
+    """Запоминает статус, счет, сезон и команды матча до сохранения."""
+    instance._previous = None
+    if instance.pk:
+        instance._previous = Match.objects.filter(pk=instance.pk).values(
+            'status', 'home_score', 'away_score', 'season_id', 'home_team_id', 'away_team_id'
+        ).first()
+
+
+@receiver(post_save, sender=Match)
+def publish_live_score(sender, instance, created, **kwargs):
+    """Обновляет состояние live-матча и публикует счет и статус в канал трансляции."""
+    previous = (getattr(instance, '_previous', None) or {}).get('status')
+    if instance.status != Match.Status.LIVE and previous != Match.Status.LIVE:
+        return
+    score = live.match_score(instance)
+    if instance.status == Match.Status.LIVE:
+        if live.update_state(instance.pk, **score) is None:
+            live.get_state(instance.pk)
+    else:
+        live.clear_state(instance.pk)
+    live.publish('status' if previous != instance.status else 'score', score)
+
+
+@receiver(post_save, sender=Goal)
+@receiver(post_save, sender=Card)
+@receiver(post_save, sender=Substitution)
+def publish_live_event(sender, instance, created, **kwargs):
+    """Добавляет гол, карточку или замену в состояние live-матча и публикует в канал."""
+    if instance.match.status == Match.Status.LIVE:
+        data = live.event_data(instance)
+        live.update_state(instance.match_id, add_event=data)
+        live.publish('event' if created else 'event_updated', data)
+
+
+@receiver(post_delete, sender=Goal)
+@receiver(post_delete, sender=Card)
+@receiver(post_delete, sender=Substitution)
+def publish_live_event_removed(sender, instance, **kwargs):
+    """Убирает событие из состояния live-матча и сообщает зрителям."""
+    status = Match.objects.filter(pk=instance.match_id).values_list('status', flat=True).first()
+    if status == Match.Status.LIVE:
+        event_type = sender.__name__.lower()
+        live.update_state(instance.match_id, remove_event=(event_type, instance.pk))
+        live.publish('event_removed', {
+            'match': instance.match_id,
+            'id': instance.pk,
+            'type': event_type,
+        })
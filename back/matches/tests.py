@@ -0,0 +1,433 @@
+"""
+Тесты для API матчей.
+"""
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from clubs.models import Club
+from core.models import Season
+from players.models import Player
+from .models import Card, Goal, Match, Substitution
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class MatchQueryCountTestCase(TestCase):
+    """Количество SQL-запросов не должно зависеть от числа матчей и событий."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.season = Season.objects.create(name='2025', is_active=True)
+        self.home = Club.objects.create(name='Дордой', city='Бишкек')
+        self.away = Club.objects.create(name='Абдыш-Ата', city='Кант')
+        self.home_players = [self._player(self.home, number) for number in range(1, 4)]
+        self.away_players = [self._player(self.away, number) for number in range(1, 4)]
+        self.match = self._match('2025-05-01')
+    
+    def _player(self, club, number):
+        return Player.objects.create(
+            first_name=f'Игрок{number}', last_name=club.name, club=club, season=self.season,
+            position='forward', date_of_birth='2000-01-01', number=number
+        )
+    
+    def _match(self, date):
+        return Match.objects.create(
+            home_team=self.home, away_team=self.away, season=self.season, date=date,
+            status='finished', home_score=0, away_score=0
+        )
+    
+    def _add_events(self, match, count):
+        for minute in range(count):
+            Goal.objects.create(
+                match=match, scorer=self.home_players[0], assist=self.home_players[1],
+                team=self.home, minute=minute + 1
+            )
+            Card.objects.create(match=match, player=self.away_players[0], team=self.away, minute=minute + 1)
+            Substitution.objects.create(
+                match=match, player_out=self.away_players[1], player_in=self.away_players[2],
+                team=self.away, minute=minute + 1
+            )
+    
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context)
+    
+    def test_list_does_not_load_events(self):
+        """Список матчей не загружает события и не делает запросов на каждую строку."""
+        self._add_events(self.match, 2)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/matches/')
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('matches_goal', sql)
+        self.assertNotIn('matches_card', sql)
+        
+        single = self._count_queries('/api/matches/')
+        for day in range(2, 6):
+            self._match(f'2025-05-0{day}')
+        self.assertEqual(self._count_queries('/api/matches/'), single)
+    
+    def test_feed_actions_constant_queries(self):
+        """by_club/by_status/latest не делают N+1 запросов."""
+        urls = [
+            f'/api/matches/by_club/?club_id={self.home.id}',
+            '/api/matches/by_status/?status=finished',
+            '/api/matches/latest/',
+        ]
+        before = [self._count_queries(url) for url in urls]
+        for day in range(2, 6):
+            self._match(f'2025-05-0{day}')
+        self.assertEqual([self._count_queries(url) for url in urls], before)
+    
+    def test_retrieve_constant_queries(self):
+        """Детальная страница загружает события с игроками без запросов на каждое событие."""
+        url = f'/api/matches/{self.match.id}/'
+        self._add_events(self.match, 1)
+        few = self._count_queries(url)
+        self._add_events(self.match, 4)
+        self.assertEqual(self._count_queries(url), few)
+        
+        data = self.client.get(url).json()
+        self.assertEqual(data['goals'][0]['scorer_name'], self.home_players[0].full_name)
+        self.assertEqual(len(data['home_team_players']), 3)
+
+
+class RosterSnapshotTestCase(TestCase):
+    """Тесты для кэшированных составов клубов."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.season = Season.objects.create(name='2025', is_active=True)
+        self.home = Club.objects.create(name='Дордой', city='Бишкек')
+        self.away = Club.objects.create(name='Абдыш-Ата', city='Кант')
+        self.player = Player.objects.create(
+            first_name='Иван', last_name='Петров', club=self.home, season=self.season,
+            position='forward', date_of_birth='2000-01-01', number=9
+        )
+        self.match = Match.objects.create(home_team=self.home, away_team=self.away, season=self.season)
+    
+    def test_roster_served_from_cache(self):
+        """Повторное чтение состава не обращается к таблице игроков."""
+        from players.roster import get_roster
+        self.assertEqual(get_roster(self.home.id), [{'id': self.player.id, 'full_name': 'Иван Петров', 'number': 9}])
+        with CaptureQueriesContext(connection) as context:
+            get_roster(self.home.id)
+        self.assertEqual(len(context), 0)
+    
+    def test_player_save_invalidates_roster(self):
+        """Изменение игрока сбрасывает составы старого и нового клуба."""
+        from players.roster import get_roster
+        get_roster(self.home.id)
+        get_roster(self.away.id)
+        self.player.club = self.away
+        self.player.save()
+        self.assertEqual(get_roster(self.home.id), [])
+        self.assertEqual([p['id'] for p in get_roster(self.away.id)], [self.player.id])
+    
+    def test_transfer_invalidates_roster(self):
+        """Подтвержденный трансфер переносит игрока в состав нового клуба."""
+        from players.models import PlayerTransfer
+        from players.roster import get_roster
+        get_roster(self.away.id)
+        PlayerTransfer.objects.create(
+            player=self.player, from_club=self.home, to_club=self.away,
+            transfer_date='2025-06-01', status='confirmed'
+        )
+        self.assertEqual([p['id'] for p in get_roster(self.away.id)], [self.player.id])
+    
+    def test_match_rosters_endpoint(self):
+        """Формы событий матча получают составы обеих команд."""
+        response = self.client.get(f'/api/matches/{self.match.id}/rosters/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['home_team'][0]['number'], 9)
+        self.assertEqual(response.data['away_team'], [])
+
+
+@override_settings(LIVE_STREAM_POLL_INTERVAL=0, LIVE_STREAM_WSGI_DURATION=5,
+                   LIVE_STREAM_REQUIRE_REDIS=False, LIVE_STREAM_WSGI_MAX_STREAMS=1)
+class LiveStreamTestCase(TestCase):
+    """SSE-поток live-матчей читает только канал в кэше."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.season = Season.objects.create(name='2025', is_active=True)
+        self.home = Club.objects.create(name='Дордой', city='Бишкек')
+        self.away = Club.objects.create(name='Абдыш-Ата', city='Кант')
+        self.player = Player.objects.create(
+            first_name='Иван', last_name='Петров', club=self.home, season=self.season,
+            position='forward', date_of_birth='2000-01-01', number=9
+        )
+        self.match = Match.objects.create(
+            home_team=self.home, away_team=self.away, season=self.season,
+            date='2025-05-01', status='live', home_score=0, away_score=0
+        )
+    
+    def _read(self, content):
+        """Следующее сообщение потока как (event, data)."""
+        import json
+        chunk = next(content).decode('utf-8')
+        fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines())
+        return fields.get('event'), json.loads(fields['data']) if 'data' in fields else None
+    
+    def test_snapshot_then_score_and_events(self):
+        """После снимка приходят счет и события матча."""
+        response = self.client.get('/api/matches/live/stream/')
+        self.addCleanup(response.close)
+        self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+        content = iter(response.streaming_content)
+        next(content)  # retry
+        event, data = self._read(content)
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual([item['match'] for item in data], [self.match.id])
+        
+        Goal.objects.create(match=self.match, scorer=self.player, team=self.home, minute=12)
+        self.match.home_score = 1
+        self.match.save()
+        event, data = self._read(content)
+        self.assertEqual((event, data['type'], data['player']), ('event', 'goal', 'Иван Петров'))
+        event, data = self._read(content)
+        self.assertEqual((event, data['home_score']), ('score', 1))
+    
+    def test_resume_from_last_event_id(self):
+        """При переподключении с Last-Event-ID приходят только пропущенные события."""
+        from matches.live import LIVE_CHANNEL
+        from core.cache_versions import get_version
+        last_id = get_version(LIVE_CHANNEL)
+        self.match.status = 'finished'
+        self.match.save()
+        response = self.client.get('/api/matches/live/stream/', HTTP_LAST_EVENT_ID=str(last_id))
+        self.addCleanup(response.close)
+        content = iter(response.streaming_content)
+        next(content)  # retry
+        event, data = self._read(content)
+        self.assertEqual((event, data['status']), ('status', 'finished'))
+    
+    def test_wsgi_streams_limited_per_process(self):
+        """Под WSGI потоков не больше LIVE_STREAM_WSGI_MAX_STREAMS; закрытие ответа освобождает слот."""
+        first = self.client.get('/api/matches/live/stream/')
+        self.assertEqual(self.client.get('/api/matches/live/stream/').status_code, 503)
+        first.close()
+        second = self.client.get('/api/matches/live/stream/')
+        self.assertEqual(second.status_code, 200)
+        second.close()
+        with override_settings(LIVE_STREAM_WSGI_MAX_STREAMS=0):
+            self.assertEqual(self.client.get('/api/matches/live/stream/').status_code, 503)
+    
+    @override_settings(LIVE_STREAM_REQUIRE_REDIS=True)
+    def test_requires_shared_cache(self):
+        """Без Redis события других процессов не видны - поток не открывается."""
+        response = self.client.get('/api/matches/live/stream/')
+        self.assertEqual(response.status_code, 503)
+    
+    def test_viewers_do_not_query_database(self):
+        """Снимок строится один раз, следующие зрители читают только кэш."""
+        from matches.live import LiveStream
+        LiveStream().open()
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(10):
+                stream = LiveStream()
+                stream.open()
+                stream.poll()
+        self.assertEqual(len(context), 0)
+
+
+class LiveMatchStateTestCase(TestCase):
+    """Идущий матч обновляет состояние в кэше, а статистику пересчитывает только по завершении."""
+    
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        ))
+        self.season = Season.objects.create(name='2025', is_active=True)
+        self.home = Club.objects.create(name='Дордой', city='Бишкек')
+        self.away = Club.objects.create(name='Абдыш-Ата', city='Кант')
+        self.player = Player.objects.create(
+            first_name='Иван', last_name='Петров', club=self.home, season=self.season,
+            position='forward', date_of_birth='2000-01-01', number=9
+        )
+        self.match = Match.objects.create(
+            home_team=self.home, away_team=self.away, season=self.season,
+            date='2025-05-01', status='live', home_score=0, away_score=0
+        )
+    
+    def test_season_recomputed_once_when_finished(self):
+        """Голы идущего матча не пересчитывают таблицу; завершение матча - один пересчет."""
+        from unittest import mock
+        with mock.patch('matches.signals.recalculate_season_stats') as recalculate:
+            for minute in (10, 20):
+                response = self.client.post(f'/api/matches/{self.match.id}/add_goal/', {
+                    'scorer': self.player.id, 'team': self.home.id, 'minute': minute,
+                }, format='json')
+                self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            recalculate.assert_not_called()
+            
+            self.match.refresh_from_db()
+            self.match.status = 'finished'
+            self.match.save()
+            recalculate.assert_called_once_with(self.match.season)
+            
+            # Правка описания не меняет результат - пересчета нет
+            self.match.description = 'Перенесен на другой стадион'
+            self.match.save()
+            recalculate.assert_called_once()
+    
+    def test_finished_match_returned_to_live_leaves_table(self):
+        """Завершенный матч, возвращенный в игру, не учитывается в таблице до нового завершения."""
+        from clubs.models import ClubSeason
+        self.match.refresh_from_db()
+        self.match.status = 'finished'
+        self.match.home_score = 2
+        self.match.save()
+        points = lambda: ClubSeason.objects.get(club=self.home, season=self.season).points
+        self.assertEqual(points(), 3)
+        
+        self.match.status = 'live'
+        self.match.save()
+        self.assertEqual(points(), 0)
+        
+        self.match.status = 'finished'
+        self.match.save()
+        self.assertEqual(points(), 3)
+    
+    def test_live_score_ignored_by_full_recalculation(self):
+        """Пересчет таблицы после завершения другого матча не учитывает счет идущего."""
+        from clubs.models import ClubSeason
+        self.match.refresh_from_db()
+        self.match.home_score = 1
+        self.match.save()
+        other = Club.objects.create(name='Алга', city='Бишкек')
+        Match.objects.create(
+            home_team=self.away, away_team=other, season=self.season,
+            date='2025-05-02', status='finished', home_score=0, away_score=2
+        )
+        home_rows = ClubSeason.objects.filter(club=self.home, season=self.season)
+        self.assertFalse(home_rows.exclude(points=0, matches_played=0).exists())
+        self.assertEqual(ClubSeason.objects.get(club=other, season=self.season).points, 3)
+    
+    def test_live_state_served_from_cache(self):
+        """Состояние идущего матча содержит счет, минуту и события и читается без БД."""
+        self.client.post(f'/api/matches/{self.match.id}/add_goal/', {
+            'scorer': self.player.id, 'team': self.home.id, 'minute': 33,
+        }, format='json')
+        self.client.post(f'/api/matches/{self.match.id}/live_minute/', {'minute': 40}, format='json')
+        
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/matches/{self.match.id}/live_state/')
+        self.assertEqual(len(context), 0)
+        self.assertEqual(response.data['home_score'], 1)
+        self.assertEqual(response.data['minute'], 40)
+        self.assertEqual([(item['type'], item['minute']) for item in response.data['events']], [('goal', 33)])
+    
+    def test_finished_match_clears_state(self):
+        """После завершения состояние строится из БД и больше не кэшируется."""
+        from django.core.cache import cache
+        from matches.live import get_state
+        get_state(self.match.id)
+        self.match.status = 'finished'
+        self.match.save()
+        self.assertIsNone(cache.get(f'matches:live:state:{self.match.id}'))
+        self.assertEqual(get_state(self.match.id)['status'], 'finished')
+
+
+class ScoreUpdateTestCase(TestCase):
+    """Голы меняют счет атомарно, устаревшие правки матча отклоняются."""
+    
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        ))
+        self.season = Season.objects.create(name='2025', is_active=True)
+        self.home = Club.objects.create(name='Дордой', city='Бишкек')
+        self.away = Club.objects.create(name='Абдыш-Ата', city='Кант')
+        self.player = Player.objects.create(
+            first_name='Иван', last_name='Петров', club=self.home, season=self.season,
+            position='forward', date_of_birth='2000-01-01', number=9
+        )
+        self.match = Match.objects.create(
+            home_team=self.home, away_team=self.away, season=self.season,
+            date='2025-05-01', status='finished', home_score=1, away_score=1
+        )
+    
+    def test_increments_from_stale_instances_are_not_lost(self):
+        """Два оператора с одинаковой копией матча засчитывают оба гола."""
+        from matches.score import increment_score
+        first, second = Match.objects.get(pk=self.match.pk), Match.objects.get(pk=self.match.pk)
+        increment_score(first, self.home.id)
+        increment_score(second, self.home.id)
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.home_score, self.match.away_score), (3, 1))
+        self.assertEqual(self.match.version, 2)
+    
+    def test_save_after_increment_gets_next_version(self):
+        """save() устаревшего экземпляра после гола не повторяет уже выданную версию."""
+        from matches.score import increment_score
+        stale = Match.objects.get(pk=self.match.pk)
+        increment_score(Match.objects.get(pk=self.match.pk), self.home.id)
+        stale.description = 'Перенесен'
+        stale.save()
+        self.assertEqual(stale.version, 2)
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.version, 2)
+    
+    def test_post_save_receivers_see_concrete_version(self):
+        """Сигналы post_save получают номер версии, а не выражение F()."""
+        from django.db.models.signals import post_save
+        versions = []
+        
+        def receiver(sender, instance, **kwargs):
+            versions.append(instance.version)
+        post_save.connect(receiver, sender=Match)
+        self.addCleanup(post_save.disconnect, receiver, sender=Match)
+        
+        start = self.match.version
+        self.match.description = 'Перенесен'
+        self.match.save()
+        self.match.save(update_fields=['description'])
+        self.assertEqual(versions, [start + 1, start + 2])
+    
+    def test_goal_in_finished_match_updates_table_by_delta(self):
+        """Гол в завершенном матче правит таблицу без полного пересчета сезона."""
+        from unittest import mock
+        from clubs.models import ClubSeason
+        with mock.patch('matches.signals.recalculate_season_stats') as recalculate:
+            response = self.client.post(f'/api/matches/{self.match.id}/add_goal/', {
+                'scorer': self.player.id, 'team': self.home.id, 'minute': 88,
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['home_score'], 2)
+        recalculate.assert_not_called()
+        
+        home = ClubSeason.objects.get(club=self.home, season=self.season)
+        away = ClubSeason.objects.get(club=self.away, season=self.season)
+        self.assertEqual((home.points, home.wins, home.draws, home.goals_for, home.position), (3, 1, 0, 2, 1))
+        self.assertEqual((away.points, away.losses, away.draws, away.goals_against, away.position), (0, 1, 0, 2, 2))
+    
+    def test_stale_version_rejected(self):
+        """Правка с устаревшей версией получает 409, с актуальной - проходит."""
+        version = self.match.version
+        Match.objects.get(pk=self.match.pk).save()
+        response = self.client.patch(f'/api/matches/{self.match.id}/', {
+            'attendance': 500, 'version': version,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['version'], version + 1)
+        
+        response = self.client.patch(f'/api/matches/{self.match.id}/', {
+            'attendance': 500, 'version': version + 1,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.attendance, self.match.version), (500, version + 2))
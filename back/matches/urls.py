@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import MatchViewSet, GoalViewSet, CardViewSet, SubstitutionViewSet, StadiumViewSet, AssistViewSet
+from .views import MatchViewSet, GoalViewSet, CardViewSet, SubstitutionViewSet, StadiumViewSet, AssistViewSet, live_stream
 
 router = DefaultRouter()
 router.register(r'stadiums', StadiumViewSet)
@@ -15,5 +15,7 @@ urlpatterns = [
     # Отдельные endpoints для latest и upcoming
     path('latest/', MatchViewSet.as_view({'get': 'latest'}), name='match-latest'),
     path('upcoming/', MatchViewSet.as_view({'get': 'upcoming'}), name='match-upcoming'),
+    # SSE-поток live-матчей (text/event-stream)
+    path('live/stream/', live_stream, name='match-live-stream'),
     path('', include(router.urls)),
 ] 
\ No newline at end of file
@@ -2,21 +2,74 @@ from rest_framework import viewsets, permissions, status
 import rest_framework.parsers
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from datetime import datetime, timedelta
 from .models import Match, Goal, Card, Substitution, Stadium, Assist
 from .serializers import (
     MatchSerializer, MatchListSerializer, MatchDetailSerializer, MatchCreateSerializer,
     GoalSerializer, CardSerializer, SubstitutionSerializer, StadiumSerializer, AssistSerializer
 )
+from core.conditional import ConditionalGetMixin
+from core.dynamic_fields import DynamicFieldsViewSetMixin
+from core.pagination import ActionPaginationMixin, MatchCursorPagination, StandardPageNumberPagination
+from core.response_cache import cache_response
+from django.views.decorators.http import require_GET
+from .live import live_stream_response
+from .score import increment_score
 
 
-class MatchViewSet(viewsets.ModelViewSet):
+# Связи, которые выводят сериализаторы матча в каждой строке списка
+MATCH_LIST_RELATIONS = ('home_team', 'away_team', 'season', 'group', 'stadium_ref')
+
+
+def latest_matches(queryset, limit=5):
+    """Последние завершенные матчи (и прошедшие, но не закрытые)."""
+    from datetime import date
+    
+    today = date.today()
+    return queryset.filter(
+        Q(status='finished') | 
+        Q(date__lt=today, status__in=['scheduled', 'live'])
+    ).order_by('-date', '-time')[:limit]
+
+
+def upcoming_matches(queryset, limit=5):
+    """Ближайшие матчи (scheduled, live или будущие по дате)."""
+    from datetime import date
+    
+    today = date.today()
+    return queryset.filter(
+        Q(status__in=['scheduled', 'live']) |
+        Q(date__gte=today, status='scheduled')
+    ).order_by('date', 'time')[:limit]
+
+
+class MatchViewSet(ConditionalGetMixin, DynamicFieldsViewSetMixin, ActionPaginationMixin, viewsets.ModelViewSet):
     """ViewSet для управления матчами."""
     
-    queryset = Match.objects.select_related('home_team', 'away_team', 'season', 'stadium_ref').prefetch_related('goals', 'cards', 'substitutions')
+    # События матча (goals/cards/substitutions) нужны только детальной странице,
+    # их prefetch добавляется в get_queryset для retrieve
+    queryset = Match.objects.select_related(*MATCH_LIST_RELATIONS)
     serializer_class = MatchSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = StandardPageNumberPagination
+    cursor_pagination_class = MatchCursorPagination
+    
+    @property
+    def paginator(self):
+        """
+        По умолчанию список постраничный (с count и ?ordering=). С ?cursor=
+        (пустой - первая страница) он листается курсором по (date, time, id);
+        явный ?ordering= важнее курсора.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if 'cursor' in params and 'ordering' not in params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -38,9 +91,17 @@ class MatchViewSet(viewsets.ModelViewSet):
         ]
 
     def get_queryset(self):
-        """Фильтрация матчей по сезону."""
+        """Фильтрация матчей по сезону и загрузка связей, нужных сериализатору action'а."""
         qs = super().get_queryset()
         
+        if self.action == 'retrieve':
+            # Составы команд берутся из кэша (players.roster), здесь только события
+            qs = qs.prefetch_related(
+                Prefetch('goals', queryset=Goal.objects.select_related('scorer', 'assist', 'team')),
+                Prefetch('cards', queryset=Card.objects.select_related('player', 'team')),
+                Prefetch('substitutions', queryset=Substitution.objects.select_related('player_in', 'player_out', 'team')),
+            )
+        
         # Фильтрация по сезону
         season_id = self.request.query_params.get('season')
         
@@ -56,39 +117,63 @@ class MatchViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
+    def get_conditional_querysets(self):
+        """Для детальной страницы учитываем события матча и составы команд."""
+        from clubs.models import Club
+        from players.models import Player
+        
+        querysets = super().get_conditional_querysets()
+        if self.action == 'retrieve' and querysets:
+            match_id = self.kwargs.get('pk')
+            teams = Match.objects.filter(pk=match_id).values('home_team_id', 'away_team_id')
+            querysets += [
+                (Goal.objects.filter(match_id=match_id), 'created_at'),
+                (Card.objects.filter(match_id=match_id), 'created_at'),
+                (Substitution.objects.filter(match_id=match_id), 'created_at'),
+                Player.objects.filter(Q(club__in=teams.values('home_team_id')) | Q(club__in=teams.values('away_team_id'))),
+            ]
+        if querysets:
+            # Название и логотип команд выводятся в каждой строке
+            matches = querysets[0]
+            querysets.append(Club.objects.filter(
+                Q(pk__in=matches.values('home_team_id')) | Q(pk__in=matches.values('away_team_id'))
+            ))
+        return querysets
+
     @action(detail=False, methods=['get'])
+    @cache_response(timeout=30)
     def latest(self, request):
         """Получить последние завершенные матчи."""
-        from django.utils import timezone
-        from datetime import date
-        
-        today = date.today()
-        
-        latest_matches = self.queryset.filter(
-            Q(status='finished') | 
-            Q(date__lt=today, status__in=['scheduled', 'live'])
-        ).order_by('-date', '-time')[:5]
-        
-        serializer = MatchListSerializer(latest_matches, many=True, context={'request': request})
+        matches = latest_matches(self.get_queryset())
+        serializer = MatchListSerializer(matches, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response(timeout=30)
     def upcoming(self, request):
         """Получить ближайшие матчи."""
-        from django.utils import timezone
-        from datetime import date
-        
-        today = date.today()
-        
-        # Получаем ближайшие 5 матчей (scheduled, live или будущие по дате)
-        upcoming_matches = self.queryset.filter(
-            Q(status__in=['scheduled', 'live']) |
-            Q(date__gte=today, status='scheduled')
-        ).order_by('date', 'time')[:5]
-        
-        serializer = MatchListSerializer(upcoming_matches, many=True, context={'request': request})
+        matches = upcoming_matches(self.get_queryset())
+        serializer = MatchListSerializer(matches, many=True, context={'request': request})
         return Response(serializer.data)
 
+    def update(self, request, *args, **kwargs):
+        """
+        Оптимистичная блокировка: если клиент передал version, а матч с тех пор
+        изменили (другой оператор, гол через add_goal), правка отклоняется с 409.
+        """
+        expected = request.data.get('version')
+        if expected in (None, ''):
+            return super().update(request, *args, **kwargs)
+        
+        with transaction.atomic():
+            current = Match.objects.select_for_update().filter(pk=kwargs.get('pk')).values_list('version', flat=True).first()
+            if current is not None and str(current) != str(expected):
+                return Response({
+                    'error': 'Матч уже изменен другим пользователем. Обновите данные и повторите.',
+                    'version': current,
+                }, status=status.HTTP_409_CONFLICT)
+            return super().update(request, *args, **kwargs)
+    
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
@@ -107,22 +192,20 @@ class MatchViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def live(self, request):
         """Получить матчи в прямом эфире."""
-        live_matches = self.queryset.filter(status='live')
-        serializer = self.get_serializer(live_matches, many=True)
-        return Response(serializer.data)
+        live_matches = self.get_queryset().filter(status='live')
+        return self.paginated_response(live_matches, pagination_class=MatchCursorPagination)
     
     @action(detail=False, methods=['get'])
     def by_club(self, request):
         """Получить матчи по клубу."""
         club_id = request.query_params.get('club_id')
         if club_id:
-            matches = self.queryset.filter(
+            matches = self.get_queryset().filter(
                 Q(home_team_id=club_id) | Q(away_team_id=club_id)
             ).order_by('-date', '-time')
         else:
-            matches = self.queryset
-        serializer = self.get_serializer(matches, many=True)
-        return Response(serializer.data)
+            matches = self.get_queryset()
+        return self.paginated_response(matches, pagination_class=MatchCursorPagination)
     
     @action(detail=False, methods=['get'])
     def by_date(self, request):
@@ -131,24 +214,59 @@ class MatchViewSet(viewsets.ModelViewSet):
         if date_str:
             try:
                 date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                matches = self.queryset.filter(date=date)
+                matches = self.get_queryset().filter(date=date)
             except ValueError:
                 return Response({'error': 'Неверный формат даты'}, status=status.HTTP_400_BAD_REQUEST)
         else:
-            matches = self.queryset
-        serializer = self.get_serializer(matches, many=True)
-        return Response(serializer.data)
+            matches = self.get_queryset()
+        return self.paginated_response(matches, pagination_class=MatchCursorPagination)
     
     @action(detail=False, methods=['get'])
     def by_status(self, request):
         """Получить матчи по статусу."""
         status_filter = request.query_params.get('status')
         if status_filter:
-            matches = self.queryset.filter(status=status_filter)
+            matches = self.get_queryset().filter(status=status_filter)
         else:
-            matches = self.queryset
-        serializer = self.get_serializer(matches, many=True)
-        return Response(serializer.data)
+            matches = self.get_queryset()
+        return self.paginated_response(matches, pagination_class=MatchCursorPagination)
+    
+    @action(detail=True, methods=['get'])
+    def live_state(self, request, pk=None):
+        """Счет, минута и события идущего матча из кэша (без запросов к БД)."""
+        from .live import get_state, parse_int
+        
+        match_id = parse_int(pk)
+        state = get_state(match_id) if match_id is not None else None
+        if state is None:
+            return Response({'error': 'Матч не найден'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(state)
+    
+    @action(detail=True, methods=['post'])
+    def live_minute(self, request, pk=None):
+        """Обновить текущую минуту идущего матча (только состояние в кэше)."""
+        from .live import get_state, parse_int, publish, update_state
+        
+        match = self.get_object()
+        minute = parse_int(request.data.get('minute'))
+        if match.status != Match.Status.LIVE or minute is None or minute < 0:
+            return Response({'error': 'Матч не идет или минута указана неверно'}, status=status.HTTP_400_BAD_REQUEST)
+        get_state(match.id)
+        state = update_state(match.id, minute=minute)
+        publish('minute', {'match': match.id, 'minute': minute})
+        return Response(state)
+    
+    @action(detail=True, methods=['get'])
+    def rosters(self, request, pk=None):
+        """Составы обеих команд для форм ввода событий матча."""
+        from players.roster import get_rosters
+        
+        match = self.get_object()
+        rosters = get_rosters([match.home_team_id, match.away_team_id])
+        return Response({
+            'home_team': rosters.get(match.home_team_id, []),
+            'away_team': rosters.get(match.away_team_id, []),
+        })
     
     @action(detail=True, methods=['get'])
     def goals(self, request, pk=None):
@@ -191,17 +309,16 @@ class MatchViewSet(viewsets.ModelViewSet):
         
         serializer = GoalSerializer(data=data)
         if serializer.is_valid():
-            goal = serializer.save()
-            # Обновляем счет матча
-            if goal.team == match.home_team:
-                match.home_score = (match.home_score or 0) + 1
-            else:
-                match.away_score = (match.away_score or 0) + 1
-            match.save()
+            goal = serializer.save(match=match)
+            # Счет увеличивается атомарно (UPDATE ... + 1), без сохранения всего матча
+            increment_score(match, goal.team_id)
             
             return Response({
                 'message': 'Гол добавлен',
-                'goal': serializer.data
+                'goal': serializer.data,
+                'home_score': match.home_score,
+                'away_score': match.away_score,
+                'version': match.version,
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -250,7 +367,7 @@ class MatchViewSet(viewsets.ModelViewSet):
         
         serializer = CardSerializer(data=data)
         if serializer.is_valid():
-            card = serializer.save()
+            card = serializer.save(match=match)
             return Response({
                 'message': 'Карточка добавлена',
                 'card': serializer.data
@@ -266,7 +383,7 @@ class MatchViewSet(viewsets.ModelViewSet):
         
         serializer = SubstitutionSerializer(data=data)
         if serializer.is_valid():
-            substitution = serializer.save()
+            substitution = serializer.save(match=match)
             return Response({
                 'message': 'Замена добавлена',
                 'substitution': serializer.data
@@ -274,6 +391,15 @@ class MatchViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@require_GET
+def live_stream(request):
+    """
+    SSE-поток live-матчей: снимок при подключении, затем счет, статус и события.
+    ?match=<id> - только один матч; Last-Event-ID - продолжить с пропущенных событий.
+    """
+    return live_stream_response(request)
+
+
 class GoalViewSet(viewsets.ModelViewSet):
     """ViewSet для управления голами."""
     
@@ -0,0 +1,60 @@
+"""
+Кэшированные составы клубов.
+
+Снимок состава - список активных игроков клуба (id, full_name, number)
+в порядке номеров. Используется детальной страницей матча, формами ввода
+событий матча и /api/clubs/{id}/roster/. Сбрасывается сигналами при
+изменении игроков и трансферов (players.signals).
+"""
+from django.core.cache import cache
+
+from .models import Player
+
+ROSTER_TIMEOUT = 60 * 60  # 1 час - страховка на случай массовых update() без сигналов
+
+
+def _key(club_id):
+    return f'players:roster:{club_id}'
+
+
+def get_rosters(club_ids):
+    """
+    Составы нескольких клубов: {club_id: [{'id', 'full_name', 'number'}, ...]}.
+    Отсутствующие в кэше составы загружаются одним запросом.
+    """
+    club_ids = [club_id for club_id in dict.fromkeys(club_ids) if club_id]
+    if not club_ids:
+        return {}
+
+    cached = cache.get_many([_key(club_id) for club_id in club_ids])
+    rosters = {club_id: cached[_key(club_id)] for club_id in club_ids if _key(club_id) in cached}
+
+    missing = [club_id for club_id in club_ids if club_id not in rosters]
+    if missing:
+        fresh = {club_id: [] for club_id in missing}
+        players = (
+            Player.objects.filter(club_id__in=missing, is_active=True)
+            .order_by('number', 'last_name')
+            .values('id', 'first_name', 'last_name', 'number', 'club_id')
+        )
+        for player in players:
+            fresh[player['club_id']].append({
+                'id': player['id'],
+                'full_name': f"{player['first_name']} {player['last_name']}",
+                'number': player['number'],
+            })
+        cache.set_many({_key(club_id): roster for club_id, roster in fresh.items()}, ROSTER_TIMEOUT)
+        rosters.update(fresh)
+    return rosters
+
+
+def get_roster(club_id):
+    """Состав одного клуба."""
+    return get_rosters([club_id]).get(club_id, [])
+
+
+def invalidate_rosters(*club_ids):
+    """Сбрасывает снимки составов указанных клубов."""
+    keys = [_key(club_id) for club_id in set(club_ids) if club_id]
+    if keys:
+        cache.delete_many(keys)
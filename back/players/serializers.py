@@ -2,6 +2,9 @@ from rest_framework import serializers
 from .models import Player, PlayerStats, PlayerTransfer
 from core.models import Season
 from clubs.models import Club
+from core.dynamic_fields import DynamicFieldsMixin
+from core.absolute_urls import absolute_url, file_url
+from core.images import DerivativeStatusField, DerivativeURLField
 
 
 class PlayerCreateSerializer(serializers.ModelSerializer):
@@ -80,13 +83,27 @@ class PlayerCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class PlayerSerializer(serializers.ModelSerializer):
+class PlayerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для модели Player."""
     
+    field_dependencies = {
+        'full_name': ('first_name', 'last_name'),
+        'club_name': ('club',),
+        'club_logo': ('club',),
+        'photo_url': ('photo',),
+        'goals_scored': ('stats',),
+        'assists': ('stats',),
+        'yellow_cards': ('stats',),
+        'red_cards': ('stats',),
+        'matches_played': ('stats',),
+    }
+    
     club_name = serializers.SerializerMethodField()
     club_logo = serializers.SerializerMethodField()
     season_name = serializers.CharField(source='season.name', read_only=True)
     photo_url = serializers.SerializerMethodField()
+    photo_thumb_url = DerivativeURLField('photo')
+    photo_status = DerivativeStatusField('photo')
     matches_played = serializers.SerializerMethodField()
     goals_scored = serializers.SerializerMethodField()
     assists = serializers.SerializerMethodField()
@@ -100,24 +117,16 @@ class PlayerSerializer(serializers.ModelSerializer):
         return 'Без клуба'
     
     def get_photo_url(self, obj):
-        if obj.photo and hasattr(obj.photo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.photo.url)
-            return obj.photo.url
-        # Возвращаем дефолтный URL силуэта если фото нет
         request = self.context.get('request')
-        if request:
-            return request.build_absolute_uri('/static/images/player-silhouette.svg')
-        return '/static/images/player-silhouette.svg'
+        if obj.photo:
+            return file_url(obj.photo, request)
+        # Возвращаем дефолтный URL силуэта если фото нет
+        return absolute_url('/static/images/player-silhouette.svg', request)
     
     def get_club_logo(self, obj):
         """Получить логотип клуба игрока."""
-        if obj.club and obj.club.logo:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.club.logo.url)
-            return obj.club.logo.url
+        if obj.club:
+            return file_url(obj.club.logo, self.context.get('request'))
         return None
     
     def get_goals_scored(self, obj):
@@ -173,7 +182,7 @@ class PlayerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Player
         fields = [
-            'id', 'first_name', 'last_name', 'full_name', 'photo', 'photo_url', 
+            'id', 'first_name', 'last_name', 'full_name', 'photo', 'photo_url', 'photo_thumb_url', 'photo_status',
             'position', 'number', 'club', 'club_name', 'club_logo', 'season', 'season_name',
             'date_of_birth', 'nationality', 'height', 'weight', 'phone', 'notes', 
             'status', 'is_active', 'goals_scored', 'assists', 'yellow_cards', 
@@ -188,12 +197,25 @@ class PlayerSerializer(serializers.ModelSerializer):
 
 
 
-class PlayerListSerializer(serializers.ModelSerializer):
+class PlayerListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для списка игроков."""
     
+    field_dependencies = {
+        'full_name': ('first_name', 'last_name'),
+        'club_name': ('club',),
+        'club_logo': ('club',),
+        'photo_url': ('photo',),
+        'goals_scored': ('stats',),
+        'assists': ('stats',),
+        'yellow_cards': ('stats',),
+        'red_cards': ('stats',),
+        'matches_played': ('stats',),
+    }
+    
     club_name = serializers.CharField(source='club.name', read_only=True)
     season_name = serializers.CharField(source='season.name', read_only=True)
     photo_url = serializers.SerializerMethodField()
+    photo_thumb_url = DerivativeURLField('photo')
     club_logo = serializers.SerializerMethodField()
     goals_scored = serializers.SerializerMethodField()
     assists = serializers.SerializerMethodField()
@@ -204,7 +226,7 @@ class PlayerListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Player
         fields = [
-            'id', 'first_name', 'last_name', 'photo', 'photo_url', 'position', 
+            'id', 'first_name', 'last_name', 'photo', 'photo_url', 'photo_thumb_url', 'position',
             'number', 'club', 'club_name', 'club_logo', 'season', 'season_name', 'date_of_birth', 'nationality', 
             'height', 'weight', 'phone', 'notes', 'status', 'is_active',
             'goals_scored', 'assists', 'yellow_cards', 'red_cards', 'matches_played'
@@ -259,33 +281,32 @@ class PlayerListSerializer(serializers.ModelSerializer):
             return 0
 
     def get_photo_url(self, obj):
-        if obj.photo and hasattr(obj.photo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.photo.url)
-            return obj.photo.url
-        # Возвращаем дефолтный URL силуэта если фото нет
         request = self.context.get('request')
-        if request:
-            return request.build_absolute_uri('/static/images/player-silhouette.svg')
-        return '/static/images/player-silhouette.svg'
+        if obj.photo:
+            return file_url(obj.photo, request)
+        # Возвращаем дефолтный URL силуэта если фото нет
+        return absolute_url('/static/images/player-silhouette.svg', request)
     
     def get_club_logo(self, obj):
-        if obj.club and obj.club.logo and hasattr(obj.club.logo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.club.logo.url)
-            return obj.club.logo.url
+        if obj.club:
+            return file_url(obj.club.logo, self.context.get('request'))
         return None
 
 
-class PlayerDetailSerializer(serializers.ModelSerializer):
+class PlayerDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для детальной информации об игроке."""
     
+    field_dependencies = {
+        'stats': ('stats', 'season'),
+        'photo_url': ('photo',),
+    }
+    
     club_name = serializers.CharField(source='club.name', read_only=True)
     season_name = serializers.CharField(source='season.name', read_only=True)
     stats = serializers.SerializerMethodField()
     photo_url = serializers.SerializerMethodField()
+    photo_thumb_url = DerivativeURLField('photo')
+    photo_status = DerivativeStatusField('photo')
     
     class Meta:
         model = Player
@@ -299,16 +320,11 @@ class PlayerDetailSerializer(serializers.ModelSerializer):
             return None
 
     def get_photo_url(self, obj):
-        if obj.photo and hasattr(obj.photo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.photo.url)
-            return obj.photo.url
-        # Возвращаем дефолтный URL силуэта если фото нет
         request = self.context.get('request')
-        if request:
-            return request.build_absolute_uri('/static/images/player-silhouette.svg')
-        return '/static/images/player-silhouette.svg'
+        if obj.photo:
+            return file_url(obj.photo, request)
+        # Возвращаем дефолтный URL силуэта если фото нет
+        return absolute_url('/static/images/player-silhouette.svg', request)
 
 
 class PlayerStatsSerializer(serializers.ModelSerializer):
@@ -327,11 +343,8 @@ class PlayerStatsSerializer(serializers.ModelSerializer):
     
     def get_photo_url(self, obj):
         """Получить URL фото игрока."""
-        if obj.player and obj.player.photo:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.player.photo.url)
-            return obj.player.photo.url
+        if obj.player:
+            return file_url(obj.player.photo, self.context.get('request'))
         return None
     
     def get_club(self, obj):
@@ -359,12 +372,7 @@ class ClubForTransferSerializer(serializers.ModelSerializer):
     logo_url = serializers.SerializerMethodField()
     
     def get_logo_url(self, obj):
-        if obj.logo and hasattr(obj.logo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.logo.url)
-            return obj.logo.url
-        return None
+        return file_url(obj.logo, self.context.get('request'))
     
     class Meta:
         model = Club
@@ -419,25 +427,14 @@ class TopScorerSerializer(serializers.ModelSerializer):
         club = getattr(obj.player, 'club', None)
         if not club:
             return None
-        logo_url = None
-        if getattr(club, 'logo', None):
-            request = self.context.get('request')
-            raw = club.logo.url
-            logo_url = request.build_absolute_uri(raw) if request else raw
         return {
             'id': club.id,
             'name': club.name,
-            'logo': logo_url,
+            'logo': file_url(getattr(club, 'logo', None), self.context.get('request')),
         }
     
     def get_photo_url(self, obj):
-        photo = getattr(obj.player, 'photo', None)
-        if photo and hasattr(photo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(photo.url)
-            return photo.url
-        return None
+        return file_url(getattr(obj.player, 'photo', None), self.context.get('request'))
     
     class Meta:
         model = PlayerStats
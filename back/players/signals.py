@@ -1,8 +1,11 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
+from django.db.models import F
+from django.utils import timezone
 from .models import Player, PlayerStats, PlayerTransfer
 from matches.models import Goal, Card, Substitution, Assist
 from core.models import Season
+from .roster import invalidate_rosters
 
 
 @receiver(post_save, sender=Goal)
@@ -29,8 +32,8 @@ def update_player_stats_on_goal(sender, instance, created, **kwargs):
                     'clean_sheets': 0,
                 }
             )
-            stats.goals += 1
-            stats.save()
+            # Атомарно: одновременные голы не затирают счетчик
+            PlayerStats.objects.filter(pk=stats.pk).update(goals=F('goals') + 1, updated_at=timezone.now())
         
         # Обновляем статистику ассистента, если есть
         if instance.assist:
@@ -48,8 +51,7 @@ def update_player_stats_on_goal(sender, instance, created, **kwargs):
                     'clean_sheets': 0,
                 }
             )
-            assist_stats.assists += 1
-            assist_stats.save()
+            PlayerStats.objects.filter(pk=assist_stats.pk).update(assists=F('assists') + 1, updated_at=timezone.now())
 
 
 @receiver(post_save, sender=Card)
@@ -77,11 +79,9 @@ def update_player_stats_on_card(sender, instance, created, **kwargs):
             )
             
             if instance.card_type == 'yellow':
-                stats.yellow_cards += 1
+                PlayerStats.objects.filter(pk=stats.pk).update(yellow_cards=F('yellow_cards') + 1, updated_at=timezone.now())
             elif instance.card_type in ['red', 'second_yellow']:
-                stats.red_cards += 1
-            
-            stats.save()
+                PlayerStats.objects.filter(pk=stats.pk).update(red_cards=F('red_cards') + 1, updated_at=timezone.now())
 
 
 @receiver(post_save, sender=Substitution)
@@ -220,3 +220,24 @@ def update_player_club_on_transfer(sender, instance, created, **kwargs):
     """Обновить команду игрока при подтверждении трансфера."""
     if instance.status == PlayerTransfer.TransferStatus.CONFIRMED:
         instance.apply_if_confirmed()
+
+
+@receiver(pre_save, sender=Player)
+def remember_player_club(sender, instance, **kwargs):
+    """Запоминает прежний клуб игрока, чтобы сбросить состав и старого клуба."""
+    if instance.pk:
+        instance._previous_club_id = (
+            Player.objects.filter(pk=instance.pk).values_list('club_id', flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Player)
+def invalidate_player_roster(sender, instance, **kwargs):
+    """Сбросить кэш составов при изменении или удалении игрока."""
+    invalidate_rosters(instance.club_id, getattr(instance, '_previous_club_id', None))
+
+
+@receiver([post_save, post_delete], sender=PlayerTransfer)
+def invalidate_transfer_rosters(sender, instance, **kwargs):
+    """Сбросить кэш составов обоих клубов трансфера."""
+    invalidate_rosters(instance.from_club_id, instance.to_club_id)
@@ -9,15 +9,48 @@ from .serializers import (
     PlayerStatsSerializer, TopScorerSerializer, PlayerCreateSerializer,
     PlayerTransferSerializer
 )
+from core.conditional import ConditionalGetMixin
+from core.dynamic_fields import DynamicFieldsViewSetMixin
+from core.pagination import ActionPaginationMixin
+from core.search import filter_by_search
+from core.response_cache import cache_response
 
 
-class PlayerViewSet(viewsets.ModelViewSet):
+def top_scorers_season_filter(season_id):
+    """
+    Фильтр сезона для бомбардиров: указанный сезон, иначе активный.
+
+    Если сезона с таким id или активного сезона нет, фильтра нет (все сезоны).
+    """
+    from core.models import Season
+    
+    if season_id:
+        try:
+            return {'season': Season.objects.get(id=season_id)}
+        except Season.DoesNotExist:
+            return {}
+    try:
+        return {'season': Season.objects.get(is_active=True)}
+    except Season.DoesNotExist:
+        return {}
+
+
+def top_scorers_queryset(season_filter, limit=10):
+    """Лучшие бомбардиры: статистика с голами, по убыванию голов и ассистов."""
+    return PlayerStats.objects.filter(
+        goals__gt=0,
+        **season_filter
+    ).select_related('player', 'player__club', 'season').order_by('-goals', '-assists')[:limit]
+
+
+class PlayerViewSet(ConditionalGetMixin, DynamicFieldsViewSetMixin, ActionPaginationMixin, viewsets.ModelViewSet):
     """ViewSet для управления игроками."""
     
     queryset = Player.objects.select_related('club', 'season').prefetch_related('stats', 'transfers')
     serializer_class = PlayerSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     parser_classes = [rest_framework.parsers.MultiPartParser, rest_framework.parsers.FormParser]
+    conditional_actions = ('list', 'retrieve', 'top_scorers')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -61,6 +94,29 @@ class PlayerViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
+    def get_conditional_querysets(self):
+        """Querysets, от которых зависят списки игроков и бомбардиров."""
+        from clubs.models import Club
+        
+        if self.action == 'top_scorers':
+            season_id = self.request.query_params.get('season')
+            if season_id and not season_id.isdigit():
+                return []
+            # Тот же сезон, что отдает action, включая откат на все сезоны
+            stats = PlayerStats.objects.filter(**top_scorers_season_filter(season_id))
+            # Имя, фото и клуб бомбардира берутся из Player/Club
+            return [
+                stats,
+                Player.objects.filter(pk__in=stats.values('player_id')),
+                Club.objects.filter(pk__in=stats.values('player__club_id')),
+            ]
+        
+        querysets = super().get_conditional_querysets()
+        if querysets:
+            # Голы/карточки в ответе считаются по PlayerStats
+            querysets.append(PlayerStats.objects.filter(player__in=querysets[0].values('pk')))
+        return querysets
+
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
@@ -80,15 +136,11 @@ class PlayerViewSet(viewsets.ModelViewSet):
         """Поиск игроков."""
         query = request.query_params.get('q', '')
         if query:
-            players = self.queryset.filter(
-                Q(first_name__icontains=query) | 
-                Q(last_name__icontains=query) | 
-                Q(club__name__icontains=query)
-            )
+            # Индекс core.search: имя, фамилия и клуб, с учетом транслитерации
+            players = filter_by_search(self.queryset, 'player', query)
         else:
             players = self.queryset.filter(is_active=True)
-        serializer = self.get_serializer(players, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(players)
     
     @action(detail=False, methods=['get'])
     def by_club(self, request):
@@ -98,8 +150,7 @@ class PlayerViewSet(viewsets.ModelViewSet):
             players = self.queryset.filter(club_id=club_id)
         else:
             players = self.queryset.filter(is_active=True)
-        serializer = self.get_serializer(players, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(players)
     
     @action(detail=False, methods=['get'])
     def by_position(self, request):
@@ -109,37 +160,16 @@ class PlayerViewSet(viewsets.ModelViewSet):
             players = self.queryset.filter(position=position)
         else:
             players = self.queryset.filter(is_active=True)
-        serializer = self.get_serializer(players, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(players)
     
     @action(detail=False, methods=['get'])
+    @cache_response(timeout=60, stale_timeout=600)
     def top_scorers(self, request):
         """Получить лучших бомбардиров."""
         limit = int(request.query_params.get('limit', 10))
-        from core.models import Season
-        
-        # Получаем сезон из query параметров, если указан
-        season_id = request.query_params.get('season')
-        if season_id:
-            try:
-                season = Season.objects.get(id=season_id)
-                season_filter = {'season': season}
-            except Season.DoesNotExist:
-                season_filter = {}
-        else:
-            # Если сезон не указан, используем активный сезон
-            try:
-                active_season = Season.objects.get(is_active=True)
-                season_filter = {'season': active_season}
-            except Season.DoesNotExist:
-                # Если активного сезона нет, не фильтруем по сезону (все сезоны)
-                season_filter = {}
+        season_filter = top_scorers_season_filter(request.query_params.get('season'))
         
-        top_scorers = PlayerStats.objects.filter(
-            goals__gt=0,
-            **season_filter
-        ).order_by('-goals', '-assists')[:limit]
-        serializer = TopScorerSerializer(top_scorers, many=True, context={'request': request})
+        serializer = TopScorerSerializer(top_scorers_queryset(season_filter, limit), many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
@@ -1,10 +1,14 @@
 from rest_framework import serializers
+from core.absolute_urls import file_url
+from core.images import DerivativeURLField
 from .models import Referee
 
 
 class RefereeSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Referee."""
     
+    photo_thumb_url = DerivativeURLField('photo')
+    
     class Meta:
         model = Referee
         fields = '__all__'
@@ -14,18 +18,14 @@ class RefereeListSerializer(serializers.ModelSerializer):
     """Сериализатор для списка судей."""
     
     photo_url = serializers.SerializerMethodField()
+    photo_thumb_url = DerivativeURLField('photo')
     
     class Meta:
         model = Referee
         fields = [
-            'id', 'first_name', 'last_name', 'photo', 'photo_url', 'category', 
+            'id', 'first_name', 'last_name', 'photo', 'photo_url', 'photo_thumb_url', 'category', 
             'region', 'experience_months', 'phone', 'nationality', 'is_active'
         ]
     
     def get_photo_url(self, obj):
-        if obj.photo:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.photo.url)
-            return obj.photo.url
-        return None 
\ No newline at end of file
+        return file_url(obj.photo, self.context.get('request')) 
\ No newline at end of file
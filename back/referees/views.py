@@ -1,12 +1,13 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from core.pagination import ActionPaginationMixin
+from core.search import filter_by_search
 from .models import Referee
 from .serializers import RefereeSerializer, RefereeListSerializer
 
 
-class RefereeViewSet(viewsets.ModelViewSet):
+class RefereeViewSet(ActionPaginationMixin, viewsets.ModelViewSet):
     """ViewSet для управления судьями."""
     
     queryset = Referee.objects.filter(is_active=True)
@@ -27,15 +28,10 @@ class RefereeViewSet(viewsets.ModelViewSet):
         """Поиск судей."""
         query = request.query_params.get('q', '')
         if query:
-            referees = self.queryset.filter(
-                Q(first_name__icontains=query) | 
-                Q(last_name__icontains=query) | 
-                Q(nationality__icontains=query)
-            )
+            referees = filter_by_search(self.queryset, 'referee', query)
         else:
             referees = self.queryset
-        serializer = self.get_serializer(referees, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(referees)
     
     @action(detail=False, methods=['get'])
     def by_category(self, request):
@@ -45,5 +41,4 @@ class RefereeViewSet(viewsets.ModelViewSet):
             referees = self.queryset.filter(category=category)
         else:
             referees = self.queryset
-        serializer = self.get_serializer(referees, many=True)
-        return Response(serializer.data) 
\ No newline at end of file
+        return self.paginated_response(referees) 
\ No newline at end of file